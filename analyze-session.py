@@ -1,62 +1,77 @@
 #!/usr/bin/env python3
 """
 Analyze ClauDEtour session logs to understand correction patterns
+
+Usage:
+    analyze-session.py [SESSION_ID|latest] [--log [HOST=]PATH ...]
+    analyze-session.py --follow [SESSION_ID|latest] [--log [HOST=]PATH ...]
+                                                      # live view, Ctrl-C to quit
+
+--log may be repeated; logs (files, ~/.claude_tour-style directories or `-`
+for stdin) are merged by timestamp on the fly, e.g. one per WSL box.
+--follow shows records as they are appended; with a session id it first
+reads that session's earlier records (rotated segments included).
 """
 import json
 import sys
-from pathlib import Path
-from collections import defaultdict
+import time
+from collections import Counter, defaultdict
 
-def analyze_session(session_id=None, log_file=None):
+from claudetour_blobs import inflate_record
+from claudetour_logs import (LogTail, iter_log, latest_session, live_files, pop_log_args, record_key,
+                             resource_report, scan_report)
+from claudetour_stats import RollingHistogram
+
+def analyze_session(session_id=None, log_sources=None):
     """Analyze a specific session or the latest one"""
     
-    if not log_file:
-        log_file = Path.home() / ".claude_tour" / "log.jsonl"
-    
     sessions = defaultdict(lambda: {
         "decisions": [],
         "executions": [],
         "corrections": 0,
         "rejections": 0,
         "errors": 0,
-        "duration_total_ms": 0
+        "duration_total_ms": 0,
+        "hosts": set()
     })
     
-    # Read all log entries
-    with open(log_file) as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                
-                # Skip debug entries for analysis
-                if entry.get("debug"):
-                    continue
-                    
-                sid = entry.get("session_id", "unknown")
-                
-                # Only analyze specific session if requested
-                if session_id and sid != session_id:
-                    continue
-                
-                if entry.get("type") == "decision":
-                    sessions[sid]["decisions"].append(entry)
-                    
-                    # Count corrections and rejections
-                    if entry.get("mode") == "rejected":
-                        sessions[sid]["rejections"] += 1
-                    elif entry.get("fixes"):
-                        sessions[sid]["corrections"] += 1
-                        
-                elif entry.get("type") == "execution":
-                    sessions[sid]["executions"].append(entry)
-                    
-                    # Track errors and timing
-                    if entry.get("returncode", 0) != 0:
-                        sessions[sid]["errors"] += 1
-                    sessions[sid]["duration_total_ms"] += entry.get("duration_ms", 0)
-                    
-            except json.JSONDecodeError:
-                pass
+    # Read all log entries (merged across --log sources if given); for a
+    # single session only the lines mentioning it are decoded
+    scan = {}
+    records = (iter_log(log_sources, session_id, ("decision", "execution"), scan)
+               if session_id else iter_log(log_sources))
+    for entry in records:
+        # Skip debug entries for analysis
+        if entry.get("debug"):
+            continue
+
+        sid = entry.get("session_id", "unknown")
+
+        # Only analyze specific session if requested
+        if session_id and sid != session_id:
+            continue
+        if "host" in entry:
+            sessions[sid]["hosts"].add(entry["host"])
+
+        if entry.get("type") == "decision":
+            entry = inflate_record(entry)
+            sessions[sid]["decisions"].append(entry)
+
+            # Count corrections and rejections
+            if entry.get("mode") == "rejected":
+                sessions[sid]["rejections"] += 1
+            elif entry.get("fixes"):
+                sessions[sid]["corrections"] += 1
+
+        elif entry.get("type") == "execution":
+            sessions[sid]["executions"].append(entry)
+
+            # Track errors and timing
+            if entry.get("returncode", 0) != 0:
+                sessions[sid]["errors"] += 1
+            sessions[sid]["duration_total_ms"] += entry.get("duration_ms", 0)
+    if scan:
+        print(scan_report(scan), file=sys.stderr)
     
     # Print analysis
     for sid, data in sessions.items():
@@ -67,6 +82,9 @@ def analyze_session(session_id=None, log_file=None):
         print(f"Session: {sid}")
         print(f"{'='*60}")
         
+        if data["hosts"]:
+            print(f"Hosts: {', '.join(sorted(data['hosts']))}")
+        
         print(f"\nSummary:")
         print(f"  Total commands: {len(data['decisions'])}")
         print(f"  Corrections applied: {data['corrections']}")
@@ -74,6 +92,12 @@ def analyze_session(session_id=None, log_file=None):
         print(f"  Execution errors: {data['errors']}")
         print(f"  Total execution time: {data['duration_total_ms']}ms")
         
+        commands = {d.get("id"): d.get("corr") or d.get("orig") or "" for d in data["decisions"]}
+        hogs = resource_report(data["executions"], commands)
+        if hogs:
+            print()
+            print("\n".join(hogs))
+        
         # Show common corrections
         corrections = defaultdict(int)
         for decision in data["decisions"]:
@@ -128,23 +152,144 @@ def analyze_session(session_id=None, log_file=None):
                     print(f"  Error: {e['stderr']}")
                 print()
 
+class LiveAggregate:
+    """Session counters maintained in O(1) per new record"""
+    def __init__(self):
+        self.commands = self.passthru = self.corrections = 0
+        self.edited = self.rejections = 0
+        self.executions = self.errors = 0
+        self.duration_total_ms = 0
+        self.fixes = Counter()
+        self.durations = RollingHistogram(500)
+        self.last_decision = None
+        self.last_error = None
+        self.session = {}
+
+    def add(self, entry):
+        if entry.get("debug"):
+            return
+        kind = entry.get("type")
+        if kind == "decision":
+            self.commands += 1
+            self.last_decision = entry
+            if entry.get("passthru"):
+                self.passthru += 1
+            if entry.get("mode") == "rejected":
+                self.rejections += 1
+            elif entry.get("fixes"):
+                self.corrections += 1
+            if entry.get("mode") == "edited":
+                self.edited += 1
+            for fix in entry.get("fixes", []):
+                self.fixes[fix] += 1
+        elif kind == "execution":
+            self.executions += 1
+            if entry.get("returncode", 0) != 0:
+                self.errors += 1
+                self.last_error = entry
+            if "duration_ms" in entry:
+                self.duration_total_ms += entry["duration_ms"]
+                self.durations.observe(entry["duration_ms"])
+        elif kind in ("session_start", "session_end"):
+            self.session[kind] = entry
+
+    def render(self, label):
+        pct = lambda q: self.durations.quantile(q)
+        fmt = lambda v: "-" if v is None else f"{v:.0f}"
+        error_rate = 100.0 * self.errors / self.executions if self.executions else 0.0
+        lines = [f"ClauDEtour live – {label}   (Ctrl-C to quit)"]
+        start = self.session.get("session_start")
+        if start:
+            lines.append(f"  Started {start.get('ts')} in {start.get('pwd')}")
+        end = self.session.get("session_end")
+        if end:
+            lines.append(f"  Ended {end.get('ts')} with exit code {end.get('exit_code')}")
+        lines += [
+            "",
+            f"  Commands: {self.commands}   passthru: {self.passthru}   corrected: {self.corrections}"
+            f"   edited: {self.edited}   rejected: {self.rejections}",
+            f"  Executions: {self.executions}   errors: {self.errors} ({error_rate:.1f}%)"
+            f"   total time: {self.duration_total_ms}ms",
+            f"  Duration p50/p90/p99 (last {len(self.durations.window)}): "
+            f"{fmt(pct(0.5))} / {fmt(pct(0.9))} / {fmt(pct(0.99))} ms",
+        ]
+        if self.fixes:
+            lines.append("")
+            lines.append("  Fixes:")
+            for fix, count in self.fixes.most_common(5):
+                lines.append(f"    {fix}: {count}")
+        if self.last_decision:
+            decision = inflate_record(self.last_decision)
+            lines.append("")
+            lines.append(f"  Last command: {str(decision.get('corr') or decision.get('orig'))[:100]}")
+        if self.last_error:
+            lines.append(f"  Last error: exit {self.last_error.get('returncode')} "
+                         f"{self.last_error.get('stderr', '').strip()[:100]}")
+        return "\n".join(lines)
+
+def follow_session(session_id=None, log_sources=None, refresh=1.0, rounds=None):
+    """Tail the logs and keep a live summary on screen
+
+    Starts at the end of the live logs; with `session_id` the session's
+    records so far are read first. `rounds` limits the refreshes (tests).
+    """
+    paths = [p for spec in (log_sources or [None]) for p in live_files(spec)]
+    if not paths:
+        print("--follow needs a log file or directory, not stdin", file=sys.stderr)
+        sys.exit(2)
+    tails = [LogTail(p, from_end=True) for p in paths]
+    pending = [entry for tail in tails for entry in tail.read_new()]   # opens them at EOF
+    agg = LiveAggregate()
+    seen = set()
+    if session_id:
+        for entry in iter_log(log_sources, session_id):
+            agg.add(entry)
+            seen.add(record_key(entry))
+        for sessions in dict.fromkeys(p.parent / "sessions" for p in paths):
+            tails.append(LogTail(sessions / f"{session_id}.jsonl"))
+
+    label = f"session {session_id}" if session_id else "all sessions"
+    dirty = True
+    try:
+        while True:
+            for entry in pending + [e for tail in tails for e in tail.read_new()]:
+                if session_id and entry.get("session_id") != session_id:
+                    continue
+                if seen and record_key(entry) in seen:
+                    seen.discard(record_key(entry))   # already read by the backfill
+                    continue
+                agg.add(entry)
+                dirty = True
+            pending = []
+            if dirty:
+                sys.stdout.write("\x1b[H\x1b[2J" + agg.render(label) + "\n")
+                sys.stdout.flush()
+                dirty = False
+            if rounds is not None:
+                rounds -= 1
+                if rounds <= 0:
+                    return agg
+            time.sleep(refresh)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        for tail in tails:
+            tail.close()
+    return agg
+
 if __name__ == "__main__":
-    session_id = sys.argv[1] if len(sys.argv) > 1 else None
+    args = sys.argv[1:]
+    log_sources = pop_log_args(args)
+    follow = "--follow" in args
+    if follow:
+        args.remove("--follow")
+    session_id = args[0] if args else None
     
     if session_id == "latest":
         # Find the latest session
-        log_file = Path.home() / ".claude_tour" / "log.jsonl"
-        latest_session = None
-        
-        with open(log_file) as f:
-            for line in f:
-                try:
-                    entry = json.loads(line)
-                    if "session_id" in entry:
-                        latest_session = entry["session_id"]
-                except:
-                    pass
-        
-        session_id = latest_session
+        session_id = latest_session(log_sources)
     
-    analyze_session(session_id)
\ No newline at end of file
+    if follow:
+        follow_session(session_id, log_sources)
+    else:
+        analyze_session(session_id, log_sources)
@@ -10,14 +10,30 @@ from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 
+from claudetour_blobs import inflate_record
+from claudetour_logs import iter_log, latest_session, pop_log_args, resource_report, scan_report
+from claudetour_recording import RecordingReader, is_recording
+
 def parse_transcript(transcript_file):
     """Parse key events from the transcript"""
+    try:
+        if is_recording(transcript_file):
+            reader = RecordingReader(transcript_file)
+            content = reader.clean_text()
+            reader.close()
+        else:
+            with open(transcript_file, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+    except Exception as e:
+        print(f"Error parsing transcript: {e}")
+        return []
+    return parse_transcript_text(content)
+
+def parse_transcript_text(content):
+    """Parse key events from transcript text"""
     events = []
     
     try:
-        with open(transcript_file, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-            
         # Look for bash commands in the transcript
         # Claude shows commands with a specific pattern
         lines = content.split('\n')
@@ -51,24 +67,14 @@ def parse_transcript(transcript_file):
         
     return events
 
-def analyze_unified_session(session_id=None):
+def analyze_unified_session(session_id=None, log_sources=None):
     """Analyze a session with both transcript and interceptor logs"""
     
     sessions_dir = Path.home() / ".claude_tour" / "sessions"
-    log_file = Path.home() / ".claude_tour" / "log.jsonl"
     
     if not session_id:
         # Find the latest session
-        if log_file.exists():
-            with open(log_file) as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line)
-                        if "session_id" in entry:
-                            session_id = entry["session_id"]
-                    except:
-                        pass
-        
+        session_id = latest_session(log_sources)
         if not session_id:
             print("No sessions found")
             return
@@ -78,11 +84,13 @@ def analyze_unified_session(session_id=None):
     print(f"{'='*80}")
     
     # Check for transcript and session files
+    recording_file = sessions_dir / f"{session_id}.rec"
     transcript_file = sessions_dir / f"{session_id}.transcript"
     timing_file = sessions_dir / f"{session_id}.timing"
     session_log = sessions_dir / f"{session_id}.jsonl"
     
     print(f"\nSession files:")
+    print(f"  Recording:  {'✓' if recording_file.exists() else '✗'} {recording_file}")
     print(f"  Transcript: {'✓' if transcript_file.exists() else '✗'} {transcript_file}")
     print(f"  Timing:     {'✓' if timing_file.exists() else '✗'} {timing_file}")
     print(f"  Session log: {'✓' if session_log.exists() else '✗'} {session_log}")
@@ -113,6 +121,10 @@ def analyze_unified_session(session_id=None):
         print(f"  Ended: {session_end.get('ts')}")
         print(f"  Exit code: {session_end.get('exit_code')}")
     
+    # Recordings from claude-record.py replace script(1) transcripts
+    if recording_file.exists():
+        transcript_file = recording_file
+    
     # Parse transcript for events
     if transcript_file.exists():
         print(f"\nTranscript analysis:")
@@ -142,34 +154,32 @@ def analyze_unified_session(session_id=None):
     rejections = 0
     errors = 0
     
-    with open(log_file) as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
+    scan = {}
+    for entry in iter_log(log_sources, session_id, ("decision", "execution"), scan):
+        if entry.get("type") == "decision":
+            entry = inflate_record(entry)
+            decisions.append(entry)
+            if entry.get("mode") == "rejected":
+                rejections += 1
+            elif entry.get("fixes"):
+                corrections += 1
                 
-                if entry.get("session_id") != session_id:
-                    continue
-                    
-                if entry.get("type") == "decision":
-                    decisions.append(entry)
-                    if entry.get("mode") == "rejected":
-                        rejections += 1
-                    elif entry.get("fixes"):
-                        corrections += 1
-                        
-                elif entry.get("type") == "execution":
-                    executions.append(entry)
-                    if entry.get("returncode", 0) != 0:
-                        errors += 1
-                        
-            except json.JSONDecodeError:
-                pass
+        elif entry.get("type") == "execution":
+            executions.append(entry)
+            if entry.get("returncode", 0) != 0:
+                errors += 1
     
     print(f"  Commands intercepted: {len(decisions)}")
     print(f"  Corrections applied: {corrections}")
     print(f"  Commands rejected: {rejections}")
     print(f"  Execution errors: {errors}")
     
+    commands = {d.get("id"): d.get("corr") or d.get("orig") or "" for d in decisions}
+    hogs = resource_report(executions, commands)
+    if hogs:
+        print()
+        print("\n".join(hogs))
+    
     # Show timeline of decisions with correlation
     if decisions:
         print(f"\nCommand timeline:")
@@ -199,7 +209,24 @@ def analyze_unified_session(session_id=None):
     print(f"\nCorrelation insights:")
     
     # Find commands in transcript that match intercepted commands
-    if transcript_file.exists() and decisions:
+    if transcript_file == recording_file and decisions:
+        # Random access: only decompress the chunks around each decision
+        reader = RecordingReader(recording_file)
+        started = reader.header.get("timestamp", 0)
+        matched = 0
+        for decision in decisions:
+            cmd = decision.get('orig', '')
+            try:
+                t = datetime.fromisoformat(decision['ts'].replace('Z', '+00:00')).timestamp() - started
+            except (KeyError, ValueError):
+                t = None
+            window = reader.clean_text(t - 60, t + 60) if t is not None else reader.clean_text()
+            if cmd in window:
+                matched += 1
+        reader.close()
+        
+        print(f"  Commands found in recording: {matched}/{len(decisions)}")
+    elif transcript_file.exists() and decisions:
         with open(transcript_file, 'r', encoding='utf-8', errors='replace') as f:
             transcript = f.read()
             
@@ -222,17 +249,21 @@ def analyze_unified_session(session_id=None):
                 
         print(f"  Total execution time: {total_exec_time}ms")
         
+    if scan:
+        print(scan_report(scan), file=sys.stderr)
     print(f"\nAnalysis complete.")
 
 def main():
-    if len(sys.argv) > 1:
-        session_id = sys.argv[1]
+    args = sys.argv[1:]
+    log_sources = pop_log_args(args)   # --log [HOST=]PATH, repeatable
+    if args:
+        session_id = args[0]
         if session_id == "latest":
             session_id = None
     else:
         session_id = None
         
-    analyze_unified_session(session_id)
+    analyze_unified_session(session_id, log_sources)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Record a Claude session for ClauDEtour
+
+Runs COMMAND under a pseudo-terminal (plain pipes when stdout is not a TTY),
+writes an indexed, compressed recording to ~/.claude_tour/sessions/<id>.rec
+and logs session_start / session_end to the session log and the main log.
+Replaces the `script -t` + jq pipeline of claude-wrapper.sh.
+
+Usage: claude-record.py [--session-id ID] -- COMMAND [ARGS...]
+"""
+import os, sys, json, pty, tty, fcntl, select, signal, socket, struct, termios, getpass, subprocess, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from claudetour import PATH_FIX, log
+from claudetour_paths import stale as paths_stale
+from claudetour_recording import RecordingWriter
+
+SESSIONS_DIR = Path.home() / ".claude_tour" / "sessions"
+
+def now_ts():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def log_entry(session_log: Path, entry: dict):
+    """Write to both the session file and the main log"""
+    with session_log.open("a") as fh:
+        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    log(entry)
+
+def terminal_size(fd):
+    try:
+        return os.get_terminal_size(fd)
+    except OSError:
+        return os.terminal_size((80, 24))
+
+def record_pty(argv, rec: RecordingWriter) -> int:
+    stdin, stdout = sys.stdin.fileno(), sys.stdout.fileno()
+    pid, master = pty.fork()
+    if pid == 0:
+        try:
+            os.execvp(argv[0], argv)
+        finally:
+            os._exit(127)
+
+    def resize():
+        size = terminal_size(stdin)
+        fcntl.ioctl(master, termios.TIOCSWINSZ,
+                    struct.pack("HHHH", size.lines, size.columns, 0, 0))
+        rec.event("r", f"{size.columns}x{size.lines}")
+    resize()
+    # The handler may run in the middle of a rec write, so it only wakes the
+    # loop below, which records the resize between writes
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    def on_winch(*_):
+        try:
+            os.write(wake_w, b"w")
+        except BlockingIOError:
+            pass   # a wakeup is already pending
+    signal.signal(signal.SIGWINCH, on_winch)
+
+    saved = termios.tcgetattr(stdin)
+    tty.setraw(stdin)
+    inputs = [master, stdin, wake_r]
+    try:
+        while True:
+            ready, _, _ = select.select(inputs, [], [])
+            if wake_r in ready:
+                os.read(wake_r, 4096)
+                resize()
+            if master in ready:
+                try:
+                    data = os.read(master, 65536)
+                except OSError:   # EIO once the child side is closed
+                    data = b""
+                if not data:
+                    break
+                os.write(stdout, data)
+                rec.output(data)
+            if stdin in ready:
+                data = os.read(stdin, 65536)
+                if not data:
+                    inputs.remove(stdin)
+                while data:
+                    data = data[os.write(master, data):]
+    finally:
+        termios.tcsetattr(stdin, termios.TCSAFLUSH, saved)
+        signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+        os.close(wake_r)
+        os.close(wake_w)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+def record_pipe(argv, rec: RecordingWriter) -> int:
+    proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    for chunk in iter(lambda: proc.stdout.read1(65536), b""):
+        sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+        rec.output(chunk)
+    return proc.wait()
+
+def main():
+    args = sys.argv[1:]
+    session_id = os.getenv("CLAUDETOUR_SESSION_ID")
+    if args[:1] == ["--session-id"]:
+        session_id, args = args[1], args[2:]
+    if args[:1] == ["--"]:
+        args = args[1:]
+    if not args:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    if not session_id:
+        session_id = f"{os.getpid()}_{int(time.time())}"
+    os.environ["CLAUDETOUR_SESSION_ID"] = session_id
+
+    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    session_log = SESSIONS_DIR / f"{session_id}.jsonl"
+    rec_path = SESSIONS_DIR / f"{session_id}.rec"
+    interactive = sys.stdin.isatty() and sys.stdout.isatty()
+    size = terminal_size(sys.stdout.fileno())
+
+    start_ts = now_ts()
+    log_entry(session_log, {
+        "type": "session_start", "session_id": session_id, "ts": start_ts,
+        "cmd": args[0], "args": args[1:], "pwd": os.getcwd(),
+        "user": getpass.getuser(), "hostname": socket.gethostname(),
+        "recording": str(rec_path),
+    })
+
+    # Bring the path index up to date in the background once it is older than
+    # CLAUDETOUR_PATH_MAX_AGE; commands only ever read it
+    if PATH_FIX and paths_stale():
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve().parent / "claudetour_paths.py"), "build"],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+    print(f"ClauDEtour wrapper active - Session: {session_id}", file=sys.stderr)
+    print(f"Logs: {SESSIONS_DIR}/{session_id}.*", file=sys.stderr)
+    print("", file=sys.stderr)
+
+    rec = RecordingWriter(rec_path, {
+        "version": 2, "width": size.columns, "height": size.lines,
+        "timestamp": int(time.time()), "session_id": session_id,
+        "command": " ".join(args),
+        "env": {k: os.environ[k] for k in ("SHELL", "TERM") if k in os.environ},
+    })
+    try:
+        exit_code = (record_pty if interactive else record_pipe)(args, rec)
+    finally:
+        rec.close()
+
+    end_ts = now_ts()
+    log_entry(session_log, {
+        "type": "session_end", "session_id": session_id, "ts": end_ts,
+        "exit_code": exit_code, "start_time": start_ts, "end_time": end_ts,
+        "recording": {"chunks": rec.n_chunks, "events": rec.n_events},
+    })
+
+    summary = {
+        "session_id": session_id, "recording": str(rec_path),
+        "session_log": str(session_log), "exit_code": exit_code,
+    }
+    print("", file=sys.stderr)
+    print("Session complete. Summary:", file=sys.stderr)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
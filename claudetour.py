@@ -7,13 +7,25 @@ Features
 • Automatic path / flag corrections (editable GUI)
 • GUI falls back to TTY prompt when no $DISPLAY
 • Auto-approve after N seconds to prevent tool time-outs
-• JSON-lines log of every decision for later learning
+• JSON-lines (or compact binary) log of every decision for later learning
 • Drop-in replacement for `bash -lc "CMD"` as used by Claude Code
 """
-import os, sys, json, re, shlex, time, threading, subprocess, tempfile
+import os, sys, json, re, array, fcntl, shlex, time, select, signal, termios, resource, threading, \
+    subprocess, tempfile
+from bisect import bisect_left
 from datetime import datetime, timezone
 from pathlib import Path
 
+import claudetour_binlog as binlog
+import claudetour_cache as cache
+import claudetour_metrics as metrics
+from claudetour_blobs import default_store, offload_record
+from claudetour_lexer import ShellSyntaxError, extract_eval, parse as parse_shell
+from claudetour_paths import fix_paths
+from claudetour_preflight import preflight
+
+STARTED = time.monotonic()   # for the interceptor overhead metric
+
 ###############################################################################
 # Config – edit here or export env-vars
 ###############################################################################
@@ -22,6 +34,17 @@ LOG_PATH         = Path(os.getenv("CLAUDETOUR_LOG",
                                    "~/.claude_tour/log.jsonl")).expanduser()
 REAL_BASH        = os.getenv("CLAUDETOUR_REAL_BASH", "/usr/bin/bash")   # adjust if needed
 GUI_ENABLED      = os.getenv("CLAUDETOUR_GUI", "1") == "1"
+LOG_ROTATE_MB    = float(os.getenv("CLAUDETOUR_LOG_ROTATE_MB", "0"))  # 0 = never rotate
+SEGMENT_DIR      = LOG_PATH.parent / "segments"   # rotated log segments
+LOG_FORMAT       = os.getenv("CLAUDETOUR_LOG_FORMAT", "jsonl")     # jsonl | binary
+BINARY_LOG       = LOG_PATH.with_suffix(".ctlog")                   # live log when binary
+LOG_LEVEL        = os.getenv("CLAUDETOUR_LOG_LEVEL", "info")       # debug: also log raw argv
+DEBUG_SAMPLE     = float(os.getenv("CLAUDETOUR_DEBUG_SAMPLE", "1"))  # fraction of calls at debug
+COMMAND_TIMEOUT  = float(os.getenv("CLAUDETOUR_TIMEOUT", "0"))     # seconds, 0 = no limit
+KILL_GRACE_SEC   = float(os.getenv("CLAUDETOUR_KILL_GRACE", "5"))  # SIGTERM → SIGKILL
+PIPE_DRAIN_SEC   = 0.25   # output still read after bash exits (background jobs)
+PATH_FIX         = os.getenv("CLAUDETOUR_PATH_FIX", "1") == "1"     # resolve missing paths
+PREFLIGHT        = os.getenv("CLAUDETOUR_PREFLIGHT", "1") == "1"    # flag missing paths
 
 # Regexes that go straight through (fast path)
 SAFE_PASSTHRU = [
@@ -31,10 +54,15 @@ SAFE_PASSTHRU = [
 ]
 
 # Known 1-liners we always fix automatically (editable)
+# Scope (optional 4th field) decides what text a rule sees:
+#   "command" – each simple command from its command word on; `^` anchors
+#               to command position, quoted text and heredocs are hidden
+#   "word"    – like "command", but also rewrites inside quoted arguments
+#   "line"    – the whole command line, quoted text and heredocs hidden
 FIX_RULES = [
-    # (pattern, replacement, description_for_log)
+    # (pattern, replacement, description_for_log[, scope])
     (r"/mnt/c/Users/.+?/ml_research", "/home/zerohimself/src/ml_research",
-     "Windows→Linux path canonicalisation"),
+     "Windows→Linux path canonicalisation", "word"),
     (r"^o3-pro\b", "cd /home/zerohimself/src/ml_research && ./ask_tools/ask o3_pro",
      "o3-pro command correction with cd"),
     (r"^\./ask_tools/ask o3_pro ([^-])", r"./ask_tools/ask o3_pro -f \1",
@@ -42,37 +70,210 @@ FIX_RULES = [
     (r"(^|\s)python(\s+[^\s]+\.py\b)",
      r"\1python3\2", "python→python3"),
     (r"\bnohup\s+([^&]+)$", r"nohup \1 &",
-     "forgotten ampersand after nohup"),
+     "forgotten ampersand after nohup", "line"),
+]
+
+# Per-command timeouts and rlimits (editable). Each regex is matched against
+# every simple command – command word and arguments, without assignments,
+# redirects or the `cd x &&` before it; the first entry matching any wins.
+#   timeout           – seconds before the command's process group is killed
+#   cpu               – CPU seconds per process (RLIMIT_CPU)
+#   as_mb / fsize_mb  – address space / largest file written, in MB
+#   nofile / nproc    – open files / processes
+# rlimits apply to each process of the command separately, not to the group.
+COMMAND_LIMITS = [
+    # (pattern, {"timeout": 600, "as_mb": 4096, ...})
+    # (r"^find\s+/(\s|$)", {"timeout": 120}),
 ]
 
+RLIMITS = {
+    "cpu":      (resource.RLIMIT_CPU, 1),
+    "as_mb":    (resource.RLIMIT_AS, 1 << 20),
+    "fsize_mb": (resource.RLIMIT_FSIZE, 1 << 20),
+    "nofile":   (resource.RLIMIT_NOFILE, 1),
+    "nproc":    (resource.RLIMIT_NPROC, 1),
+}
+
 ###############################################################################
 # Utilities
 ###############################################################################
+def live_log() -> Path:
+    return BINARY_LOG if LOG_FORMAT == "binary" else LOG_PATH
+
 def log(decision: dict):
     LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with LOG_PATH.open("a") as fh:
-        fh.write(json.dumps(decision, ensure_ascii=False) + "\n")
+    # large fields go to the blob store; "v" is the record schema version
+    decision = {"v": binlog.SCHEMA, **offload_record(decision)}
+    if LOG_FORMAT == "binary":
+        size = binlog.append(BINARY_LOG, decision)
+    else:
+        with LOG_PATH.open("a") as fh:
+            fh.write(json.dumps(decision, ensure_ascii=False) + "\n")
+            size = fh.tell()
+    if LOG_ROTATE_MB > 0 and size > LOG_ROTATE_MB * 1024 * 1024:
+        rotate_log()
 
-def apply_fixes(cmd: str):
+def rotate_log():
+    """Move the live log into SEGMENT_DIR; writers reopen it on next call"""
+    SEGMENT_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    live = live_log()
+    try:
+        os.replace(live, SEGMENT_DIR / f"log-{stamp}{live.suffix}")
+    except FileNotFoundError:
+        pass   # another process rotated first
+
+def log_segments():
+    """All log files that may still hold records, oldest first
+
+    Segments of both formats sort by their timestamp; the live log of the
+    format not in use (left over from a switch) comes before the current one.
+    """
+    segments = []
+    if SEGMENT_DIR.exists():
+        segments = sorted([*SEGMENT_DIR.glob("log-*.jsonl"), *SEGMENT_DIR.glob("log-*.ctlog")],
+                          key=lambda p: p.name)
+    live = live_log()
+    return segments + [BINARY_LOG if live == LOG_PATH else LOG_PATH, live]
+
+def _rules():
+    for pat, repl, note, *scope in FIX_RULES:
+        yield pat, repl, note, scope[0] if scope else "command"
+
+def _mask(text: str, start: int, end: int, opaque, starts=None):
+    """Replace opaque spans inside text[start:end] with \\x00N\\x00 markers"""
+    out, stash, pos = [], [], start
+    # `opaque` is sorted: jump to the first span of the range and stop after
+    # the last, so masking every segment of a long command stays linear
+    starts = starts if starts is not None else [o[0] for o in opaque]
+    for i in range(bisect_left(starts, start), len(opaque)):
+        o_start, o_end, kind = opaque[i]
+        if o_start >= end:
+            break
+        if o_start < pos or o_end > end:
+            continue
+        out.append(text[pos:o_start])
+        out.append(f"\x00{len(stash)}\x00")
+        stash.append((kind, text[o_start:o_end]))
+        pos = o_end
+    out.append(text[pos:end])
+    return "".join(out), stash
+
+def _unmask(text: str, stash):
+    return re.sub(r"\x00(\d+)\x00", lambda m: stash[int(m.group(1))][1], text)
+
+def _apply_fixes_raw(cmd: str):
+    """Regex rules over the raw string – used when the command does not lex"""
     fixed = cmd
     applied = []
-    for pat, repl, note in FIX_RULES:
+    for pat, repl, note, _ in _rules():
         new = re.sub(pat, repl, fixed)
         if new != fixed:
             applied.append(note)
             fixed = new
     return fixed, applied
 
+def apply_fixes(cmd: str):
+    """FIX_RULES, then resolve missing path arguments via the path index
+
+    Returns (fixed, applied, checked); `checked` is the preflight result for
+    `fixed` (None with PREFLIGHT off), so the paths are stat'ed only once.
+    """
+    fixed, applied = apply_rules(cmd)
+    # concurrent, time-boxed stats; paths that didn't answer count as present
+    checked = preflight(fixed) if PREFLIGHT else None
+    if PATH_FIX:
+        exists = os.path.exists
+        if checked is not None:
+            status = checked["status"]
+            exists = lambda p: status[p] is not False if p in status else os.path.exists(p)
+        fixed, resolved = fix_paths(fixed, exists=exists)
+        if resolved:
+            applied.append("path resolution (index)")
+            if PREFLIGHT:
+                checked = preflight(fixed)   # the resolved paths are new arguments
+    return fixed, applied, checked
+
+def apply_rules(cmd: str):
+    try:
+        parsed = parse_shell(cmd)
+    except ShellSyntaxError:
+        return _apply_fixes_raw(cmd)
+
+    applied = set()
+    pieces, pos = [], 0
+    starts = [o[0] for o in parsed.opaque]
+    for seg in parsed.segments:
+        start = seg.command_start
+        text, stash = _mask(cmd, start, seg.end, parsed.opaque, starts)
+        for pat, repl, note, scope in _rules():
+            if scope == "line":
+                continue
+            new = re.sub(pat, repl, text)
+            if scope == "word":
+                # quoted arguments only; comments, substitutions and heredocs stay as written
+                new_stash = [(kind, re.sub(pat, repl, raw) if kind == "quote" else raw)
+                             for kind, raw in stash]
+                if new_stash != stash:
+                    applied.add(note)
+                    stash = new_stash
+            if new != text:
+                applied.add(note)
+                text = new
+        pieces.append(cmd[pos:start])
+        pieces.append(_unmask(text, stash))
+        pos = seg.end
+    pieces.append(cmd[pos:])
+    fixed = "".join(pieces)
+
+    line_rules = [r for r in _rules() if r[3] == "line"]
+    if line_rules:
+        try:
+            parsed = parse_shell(fixed)
+        except ShellSyntaxError:
+            parsed = None
+        if parsed is not None:
+            text, stash = _mask(fixed, 0, len(fixed), parsed.opaque)
+            for pat, repl, note, _ in line_rules:
+                new = re.sub(pat, repl, text)
+                if new != text:
+                    applied.add(note)
+                    text = new
+            fixed = _unmask(text, stash)
+
+    return fixed, [note for _, _, note, _ in _rules() if note in applied]
+
+def record_decision_metrics(decision: dict, approval_ms: float = 0.0):
+    """Count the decision and time our own overhead up to this point"""
+    mode = decision["mode"] or "passthru"
+    metrics.inc("claudetour_decisions_total", {"mode": mode})
+    for fix in decision["fixes"]:
+        metrics.inc("claudetour_fixes_total", {"rule": fix})
+    if mode == "rejected":
+        metrics.inc("claudetour_rejections_total")
+    if not decision["passthru"]:
+        metrics.observe("claudetour_approval_wait_seconds", approval_ms)
+    overhead_ms = (time.monotonic() - STARTED) * 1000 - approval_ms
+    metrics.observe("claudetour_interceptor_overhead_seconds", overhead_ms)
+
 def safe_passthrough(cmd: str):
-    return any(re.search(pat, cmd) for pat in SAFE_PASSTHRU)
+    """SAFE_PASSTHRU match that needs no fixing – runs without asking
+
+    Most commands the path index can resolve (cat, ls, head, grep ...) are
+    passthrough ones, so a missing path the index finds sends the command
+    through apply_fixes and the dialog instead.
+    """
+    if not any(re.search(pat, cmd) for pat in SAFE_PASSTHRU):
+        return False
+    return not (PATH_FIX and fix_paths(cmd)[1])
 
 ###############################################################################
 # GUI helpers (Tkinter because it is baked into Python)
 ###############################################################################
-def gui_ask(original: str, corrected: str, auto_sec: int):
+def gui_ask(original: str, corrected: str, auto_sec: int, missing=()):
     # headless?
     if not GUI_ENABLED or "DISPLAY" not in os.environ:
-        return cli_ask(original, corrected, auto_sec)
+        return cli_ask(original, corrected, auto_sec, missing)
 
     import tkinter as tk
     from tkinter import scrolledtext
@@ -109,6 +310,10 @@ def gui_ask(original: str, corrected: str, auto_sec: int):
     # Select all text for easy replacement
     t2.tag_add("sel", "1.0", "end-1c")
 
+    if missing:
+        tk.Label(root, text="⚠ Not found: " + ", ".join(missing), fg="#b00020",
+                 anchor="w", justify="left", wraplength=600).pack(fill="x", padx=5)
+
     # Feedback field (optional)
     tk.Label(root, text="Feedback (optional):").pack(anchor="w", padx=5, pady=(10,0))
     feedback_text = scrolledtext.ScrolledText(root, height=2, width=80, font=("monospace", 9))
@@ -144,11 +349,13 @@ def gui_ask(original: str, corrected: str, auto_sec: int):
         mode = "edited" if edited != corrected else "accepted"
         return edited, mode, result["feedback"]
 
-def cli_ask(original: str, corrected: str, auto_sec: int):
+def cli_ask(original: str, corrected: str, auto_sec: int, missing=()):
     """TTY fallback when no GUI available"""
     print("ClauDEtour suggestion:")
     print(" ─ original : ", original)
     print(" ─ corrected: ", corrected)
+    if missing:
+        print(" ─ not found: ", ", ".join(missing))
     prompt = "[Enter]=accept  e=edit  n=reject"
     if auto_sec > 0:
         prompt += f" (auto in {auto_sec}s)"
@@ -180,22 +387,177 @@ def cli_ask(original: str, corrected: str, auto_sec: int):
 ###############################################################################
 # Core
 ###############################################################################
-def run_real_bash(cmdline: str, decision_id: str, session_id: str):
-    """Run command and capture output for logging"""
-    import subprocess
-    from datetime import datetime, timezone
-    
+def _pump(src, sink, writer, stats: dict, stop: int):
+    """Copy a child pipe to our own stream while compressing it into a blob
+
+    Runs until EOF or until `stop` (a pipe read end) becomes readable; then
+    what is already in the pipe is still read, so only output that jobs left
+    in the background write later is cut off. If our own reader goes away
+    (Claude closed its end), the blob is still filled.
+    """
+    head = bytearray()
+    lines = 0
+    last = b"\n"
+    fd = src.fileno()
+    forward = True
+
+    def take(chunk):
+        nonlocal lines, last, forward
+        if forward:
+            try:
+                sink.write(chunk)
+                sink.flush()
+            except OSError:
+                forward = False
+        writer.write(chunk)
+        lines += chunk.count(b"\n")
+        last = chunk[-1:]
+        if len(head) < 1000:
+            head.extend(chunk[:1000 - len(head)])
+
+    try:
+        while True:
+            ready, _, _ = select.select([fd, stop], [], [])
+            if stop in ready:
+                # drain what is in the pipe now – not what a live writer adds
+                pending = array.array("i", [0])
+                fcntl.ioctl(fd, termios.FIONREAD, pending)
+                remaining = pending[0]
+                while remaining > 0:
+                    chunk = os.read(fd, min(remaining, 65536))
+                    if not chunk:
+                        break
+                    take(chunk)
+                    remaining -= len(chunk)
+                break
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            take(chunk)
+    finally:
+        src.close()
+        stats["head"] = head.decode("utf-8", "replace")
+        stats["lines"] = lines + (last != b"\n")
+        if writer.size:
+            stats["ref"] = writer.close()
+        else:
+            writer.abort()
+            stats["ref"] = None
+
+def command_limits(cmdline: str) -> dict:
+    """Timeout and rlimits for a command: first COMMAND_LIMITS match, else defaults"""
+    try:
+        segments = [" ".join([seg.command.value] + [w.value for w in seg.args])
+                    for seg in parse_shell(cmdline).segments if seg.command is not None]
+    except ShellSyntaxError:
+        segments = [cmdline]
+    for pattern, limits in COMMAND_LIMITS:
+        if any(re.search(pattern, text) for text in segments):
+            return {"timeout": COMMAND_TIMEOUT, **limits}
+    return {"timeout": COMMAND_TIMEOUT}
+
+# Own process group, so the command can be killed as a whole
+SPAWN_GROUP = {"process_group": 0} if sys.version_info >= (3, 11) else {"start_new_session": True}
+
+def _child_setup(limits: dict):
+    """preexec_fn applying the rlimits, or None when there are none"""
+    if not any(key in limits for key in RLIMITS):
+        return None
+    def setup():
+        for key, (which, unit) in RLIMITS.items():
+            if key in limits:
+                value = int(limits[key] * unit)
+                _, hard = resource.getrlimit(which)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                resource.setrlimit(which, (value, value))
+    return setup
+
+def _kill_group(pgid: int, done: threading.Event, state: dict):
+    """Timeout, if bash itself is still running: SIGTERM its process group, then
+    SIGKILL what is left once bash exited or the grace period is over"""
+    try:
+        if done.is_set() or os.waitid(os.P_PID, pgid, os.WEXITED | os.WNOHANG | os.WNOWAIT):
+            return   # bash already exited; what it left in the background is not ours to time
+    except ChildProcessError:
+        return   # ... and was reaped already
+    state["timed_out"] = True
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+        done.wait(KILL_GRACE_SEC)
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+def _rusage_fields(ru) -> dict:
+    return {
+        "cpu_user_ms": int(ru.ru_utime * 1000),
+        "cpu_sys_ms": int(ru.ru_stime * 1000),
+        "max_rss_kb": ru.ru_maxrss,
+        "blk_in": ru.ru_inblock,
+        "blk_out": ru.ru_oublock,
+        "nvcsw": ru.ru_nvcsw,
+        "nivcsw": ru.ru_nivcsw,
+    }
+
+def run_real_bash(cmdline: str, decision_id: str, session_id: str, cache_probe: dict = None):
+    """Run command, stream its output through and capture it for logging"""
     start_time = datetime.now(timezone.utc)
+    limits = command_limits(cmdline)
     
-    # Run command and capture output
     proc = subprocess.Popen(
         [REAL_BASH, "-lc", cmdline],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True
+        preexec_fn=_child_setup(limits),
+        **SPAWN_GROUP,
     )
-    stdout, stderr = proc.communicate()
-    returncode = proc.returncode
+    # The child has its own process group, so signals aimed at us (Ctrl-C,
+    # Claude cancelling the tool call) have to be passed on explicitly
+    def forward(signum, _frame):
+        try:
+            os.killpg(proc.pid, signum)
+        except ProcessLookupError:
+            pass
+    previous = {sig: signal.signal(sig, forward) for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)}
+
+    done = threading.Event()
+    state = {"timed_out": False}
+    timer = None
+    if limits["timeout"] > 0:
+        timer = threading.Timer(limits["timeout"], _kill_group, (proc.pid, done, state))
+        timer.daemon = True
+        timer.start()
+    store = default_store()
+    out, err = {}, {}
+    stop_r, stop_w = os.pipe()
+    pumps = [
+        threading.Thread(target=_pump, args=(proc.stdout, sys.stdout.buffer, store.writer(), out, stop_r)),
+        threading.Thread(target=_pump, args=(proc.stderr, sys.stderr.buffer, store.writer(), err, stop_r)),
+    ]
+    for t in pumps:
+        t.start()
+    # The command is done when bash exits, not when the pipes close: jobs
+    # it left in the background may hold them open for much longer
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = returncode = os.waitstatus_to_exitcode(status)
+    done.set()
+    if timer:
+        timer.cancel()
+        if state["timed_out"]:
+            timer.join()   # let it SIGKILL what is left of the group
+    drain_until = time.monotonic() + PIPE_DRAIN_SEC
+    for t in pumps:
+        t.join(max(0.0, drain_until - time.monotonic()))
+    os.write(stop_w, b"x")
+    for t in pumps:
+        t.join()
+    os.close(stop_r)
+    os.close(stop_w)
+    for sig, handler in previous.items():
+        signal.signal(sig, handler)
+    if state["timed_out"]:
+        returncode = 124   # like timeout(1)
     
     end_time = datetime.now(timezone.utc)
     duration_ms = int((end_time - start_time).total_seconds() * 1000)
@@ -208,24 +570,39 @@ def run_real_bash(cmdline: str, decision_id: str, session_id: str):
         "decision_id": decision_id,
         "returncode": returncode,
         "duration_ms": duration_ms,
-        "stdout_lines": len(stdout.splitlines()) if stdout else 0,
-        "stderr_lines": len(stderr.splitlines()) if stderr else 0,
+        "stdout_lines": out["lines"],
+        "stderr_lines": err["lines"],
+        **_rusage_fields(rusage),
     }
+    if state["timed_out"]:
+        result["timed_out"] = True
+        result["timeout_sec"] = limits["timeout"]
+    if proc.returncode < 0:
+        result["signal"] = -proc.returncode
+    if len(limits) > 1:
+        result["limits"] = limits
+    # Full output lives in the blob store; keep a short head inline
+    if out["ref"]:
+        result["stdout_blob"] = out["ref"]
+    if err["ref"]:
+        result["stderr_blob"] = err["ref"]
     
     # Include actual output for errors or if there's important info
     if returncode != 0:
-        result["stdout"] = stdout[:1000]  # First 1000 chars
-        result["stderr"] = stderr[:1000]
-    elif stderr:
-        result["stderr"] = stderr[:500]  # Warnings/info
+        result["stdout"] = out["head"]  # First 1000 chars
+        result["stderr"] = err["head"]
+    elif err["head"]:
+        result["stderr"] = err["head"][:500]  # Warnings/info
     
     log(result)
-    
-    # Print output as normal
-    if stdout:
-        print(stdout, end='')
-    if stderr:
-        print(stderr, end='', file=sys.stderr)
+    if cache_probe is not None and not state["timed_out"]:
+        cache.store(cache_probe, returncode, out["ref"], err["ref"], decision_id)
+    metrics.observe("claudetour_command_duration_seconds", duration_ms)
+    if returncode != 0:
+        metrics.inc("claudetour_command_errors_total")
+    if state["timed_out"]:
+        metrics.inc("claudetour_command_timeouts_total")
+    metrics.observe("claudetour_command_cpu_seconds", result["cpu_user_ms"] + result["cpu_sys_ms"])
     
     return returncode
 
@@ -289,15 +666,18 @@ def main():
         claude_pid, claude_start = get_claude_session_info()
         session_id = f"{claude_pid}_{claude_start}"
     
-    # Debug: log what we received from Claude
-    debug_decision = {
-        "ts": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        "debug": True,
-        "session_id": session_id,
-        "argv": sys.argv,
-        "parent": parent_cmd if 'parent_cmd' in locals() else "unknown"
-    }
-    log(debug_decision)
+    # Debug: log what we received from Claude (CLAUDETOUR_LOG_LEVEL=debug, sampled)
+    if LOG_LEVEL == "debug":
+        import random
+        if random.random() < DEBUG_SAMPLE:
+            log({
+                "ts": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+                "type": "debug",
+                "debug": True,
+                "session_id": session_id,
+                "argv": sys.argv,
+                "parent": parent_cmd if 'parent_cmd' in locals() else "unknown"
+            })
     
     # Handle Claude's calling pattern: bash -c -l "eval 'command'..."
     cmd = None
@@ -311,11 +691,11 @@ def main():
             full_cmd = sys.argv[l_idx + 1]
             # Extract the actual command from the eval wrapper
             # Pattern: eval 'actual command' < /dev/null && pwd -P >| /tmp/...
-            import re
-            match = re.search(r"eval '([^']+)'", full_cmd)
-            if match:
-                cmd = match.group(1)
-            else:
+            try:
+                cmd = extract_eval(full_cmd)
+            except ShellSyntaxError:
+                cmd = None
+            if cmd is None:
                 cmd = full_cmd  # Fallback to full command
     
     # If no command detected, fall through to real bash
@@ -340,27 +720,49 @@ def main():
     if safe_passthrough(cmd):
         decision["passthru"] = True
         decision["corr"] = cmd
+        probe = cache.probe(cmd) if cache.CACHE_ENABLED else None
+        hit = cache.lookup(probe)
+        if hit and cache.replay(hit, default_store()):
+            decision["mode"] = "cache_hit"
+            decision["cached_from"] = hit["decision_id"]
+            decision["cache_age_sec"] = round(time.time() - hit["created"], 3)
+            log(decision)
+            record_decision_metrics(decision)
+            sys.exit(hit["returncode"])
         log(decision)
-        sys.exit(run_real_bash(cmd, decision_id, session_id))
+        record_decision_metrics(decision)
+        sys.exit(run_real_bash(cmd, decision_id, session_id, probe))
 
     # Apply automatic rules
-    corrected, fixes = apply_fixes(cmd)
+    corrected, fixes, checked = apply_fixes(cmd)
     decision["fixes"] = fixes
 
+    # Flag paths that don't exist (checked by apply_fixes, within the budget)
+    missing = []
+    if checked is not None:
+        missing = checked["missing"]
+        if missing:
+            decision["missing_paths"] = missing
+        if checked["unchecked"]:
+            decision["unchecked_paths"] = checked["unchecked"]
+
     # If nothing changed, still ask?
+    asked = time.monotonic()
     if corrected == cmd:
         # unknown / suspicious – ask anyway
-        corrected, mode, feedback = gui_ask(cmd, cmd, AUTO_APPROVE_SEC)
+        corrected, mode, feedback = gui_ask(cmd, cmd, AUTO_APPROVE_SEC, missing)
         decision["corr"], decision["mode"] = corrected, mode
     else:
-        corrected, mode, feedback = gui_ask(cmd, corrected, AUTO_APPROVE_SEC)
+        corrected, mode, feedback = gui_ask(cmd, corrected, AUTO_APPROVE_SEC, missing)
         decision["corr"], decision["mode"] = corrected, mode
+    approval_ms = (time.monotonic() - asked) * 1000
     
     # Log feedback if provided (for both accept and reject)
     if feedback:
         decision["feedback"] = feedback
 
     log(decision)
+    record_decision_metrics(decision, approval_ms)
     
     # If user rejected, print clear error message
     if mode == "rejected":
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Compact binary encoding of the ClauDEtour log
+
+The JSONL log repeats every key on every line and spells out every value
+as JSON text. A binary log (log.ctlog, CLAUDETOUR_LOG_FORMAT=binary)
+stores each record as a frame whose keys are small integer field ids –
+the table mapping ids to names is kept in the file header, so a file stays
+readable when FIELDS grows; keys not in the table are stored as strings –
+and whose values are in marshal format (version MARSHAL_VERSION): a C
+codec like json, but without text escaping and number formatting.
+marshal is not meant for untrusted data – a crafted file can crash the
+reader or yield objects no JSON record holds – so binary logs are for
+your own machines only; exchange logs with anyone else as JSONL
+(convert-log.py on the machine that wrote them).
+
+File layout (all integers little-endian):
+    MAGIC
+    u32 len  JSON header {"schema": N, "fields": [name, ...]}
+    FRAME    SYNC  u8 kind  u32 len  u16 shape_len  shape  values
+    ...
+
+`shape` is the JSON list of the record's field ids (or key strings),
+decoded once per distinct shape; `values` the marshalled list of its
+values. `kind` encodes the record type (KINDS). Every frame starts with
+SYNC, which UTF-8 text can't contain (0xFF/0xFE never occur in it), so a
+reader can find frames by byte search – SYNC+kind for a record type, the
+raw bytes of a string for a session – and locate the frame around a hit
+instead of walking every frame. A candidate frame only counts if its
+length lands exactly on the next SYNC (or the end). Frames are appended
+with a single write(), like JSONL lines.
+"""
+import os, json, marshal, struct, tempfile
+
+MAGIC   = b"CTLOG2\n"
+SCHEMA  = 1   # record schema version, also stored as "v" on every record
+
+# Field ids; append only – existing files carry their own copy of the table
+FIELDS = (
+    "v", "type", "id", "session_id", "ts", "decision_id", "debug",
+    "orig", "corr", "mode", "passthru", "fixes", "feedback",
+    "missing_paths", "unchecked_paths", "cached_from", "cache_age_sec",
+    "returncode", "duration_ms", "stdout_lines", "stderr_lines",
+    "cpu_user_ms", "cpu_sys_ms", "max_rss_kb", "blk_in", "blk_out", "nvcsw", "nivcsw",
+    "timed_out", "timeout_sec", "signal", "limits",
+    "stdout_blob", "stderr_blob", "stdout", "stderr", "status",
+    "argv", "parent", "host",
+)
+KINDS = {"decision": 1, "execution": 2, "debug": 3, "session_start": 4, "session_end": 5}   # 0: other
+MARSHAL_VERSION = 4
+
+_HEADER = struct.Struct("<I")
+SYNC = b"\xff\xfeCT"
+FRAME = struct.Struct("<4sBIH")   # SYNC, kind, len, shape_len
+_COMPACT = (",", ":")
+
+def is_binlog(head: bytes) -> bool:
+    return head.startswith(MAGIC)
+
+def header_bytes(fields=FIELDS) -> bytes:
+    head = json.dumps({"schema": SCHEMA, "fields": list(fields)}, separators=_COMPACT).encode()
+    return MAGIC + _HEADER.pack(len(head)) + head
+
+def needle(value: str) -> bytes:
+    """Bytes every frame holding the string `value` contains, for pre-filtering"""
+    return value.encode("utf-8", "surrogatepass")
+
+class Decoder:
+    """Turns frames of one file back into records, using that file's field table"""
+    def __init__(self, header: dict):
+        self.schema = header.get("schema", 1)
+        self.fields = header["fields"]
+        self.shapes = {}
+
+    def keys(self, shape: bytes) -> tuple:
+        keys = self.shapes.get(shape)
+        if keys is None:
+            keys = self.shapes[shape] = tuple(
+                self.fields[k] if isinstance(k, int) else k for k in json.loads(shape))
+        return keys
+
+    def decode(self, shape: bytes, values: bytes) -> dict:
+        return dict(zip(self.keys(shape), marshal.loads(values)))
+
+    def record(self, shape: bytes, values: bytes):
+        """decode(), but None for a garbled frame"""
+        try:
+            return self.decode(shape, values)
+        except (ValueError, IndexError, TypeError, EOFError):
+            return None
+
+def read_header(buf, pos: int = 0):
+    """(Decoder, offset of the first frame) from a buffer starting at `pos`"""
+    if bytes(buf[pos:pos + len(MAGIC)]) != MAGIC:
+        raise ValueError("not a ClauDEtour binary log")
+    pos += len(MAGIC)
+    length, = _HEADER.unpack_from(buf, pos)
+    pos += _HEADER.size
+    return Decoder(json.loads(bytes(buf[pos:pos + length]))), pos + length
+
+def read_header_from(fh, head: bytes = b""):
+    """Like read_header, for a file object positioned at its start
+
+    `head` holds bytes already read from the start (e.g. to sniff the format).
+    """
+    head += fh.read(len(MAGIC) + _HEADER.size - len(head))
+    if len(head) < len(MAGIC) + _HEADER.size or not is_binlog(head):
+        raise ValueError("not a ClauDEtour binary log")
+    length, = _HEADER.unpack_from(head, len(MAGIC))
+    return Decoder(json.loads(fh.read(length))), len(head) + length
+
+def iter_frames(buf, pos: int = 0, end: int = None):
+    """Yield (next_pos, kind, shape, values) for each complete frame in buf[pos:end]"""
+    end = len(buf) if end is None else end
+    while pos + FRAME.size <= end:
+        sync, kind, length, shape_len = FRAME.unpack_from(buf, pos)
+        start = pos + FRAME.size
+        stop = start + length
+        if sync != SYNC or stop > end:
+            return   # frame still being written (or garbage)
+        yield stop, kind, buf[start:start + shape_len], buf[start + shape_len:stop]
+        pos = stop
+
+def frame_at(buf, pos: int, end: int = None):
+    """(next_pos, kind, shape, values) if a whole frame starts at `pos` and
+    ends exactly at the next SYNC or at `end`, else None"""
+    end = len(buf) if end is None else end
+    if pos + FRAME.size > end:
+        return None
+    sync, kind, length, shape_len = FRAME.unpack_from(buf, pos)
+    start = pos + FRAME.size
+    stop = start + length
+    if sync != SYNC or shape_len > length or stop > end or \
+            (stop < end and buf[stop:stop + len(SYNC)] != SYNC):
+        return None
+    return stop, kind, buf[start:start + shape_len], buf[start + shape_len:stop]
+
+def search_frames(buf, pattern, pos: int, end: int = None):
+    """Yield the frames in buf[pos:end] (as frame_at) that contain `pattern`
+    (bytes or a compiled bytes regex), found by byte search; frames without
+    it are never looked at"""
+    end = len(buf) if end is None else end
+    if isinstance(pattern, bytes):
+        find = lambda start: buf.find(pattern, start, end)
+    else:
+        def find(start):
+            m = pattern.search(buf, start, end)
+            return m.start() if m else -1
+    hit = find(pos)
+    while hit >= 0:
+        # the SYNC the hit's frame starts with: the last one at or before it
+        # whose frame reaches past the hit
+        start = buf.rfind(SYNC, pos, hit + len(SYNC))
+        frame = None
+        while start >= 0:
+            frame = frame_at(buf, start, end)
+            if frame and frame[0] > hit:
+                break
+            frame = None
+            start = buf.rfind(SYNC, pos, start)
+        if frame is None:
+            hit = find(hit + 1)   # in garbage between frames
+            continue
+        yield frame
+        pos = frame[0]
+        hit = find(pos)
+
+def count_frames(buf, pos: int = 0) -> int:
+    """Number of frames from `pos` on, counted as SYNCs (C speed, in chunks)"""
+    step = 1 << 26
+    return sum(buf[i:i + step + len(SYNC) - 1].count(SYNC) for i in range(pos, len(buf), step))
+
+def iter_records(fh, decoder: Decoder, offset: int, chunk: int = 1 << 20):
+    """Yield (offset after the frame, record|None) for the frames from `offset` on
+
+    `fh` must be positioned at `offset` (it is only read, never seeked, so
+    pipes work). Stops at a frame that is still being written; undecodable
+    frames give None.
+    """
+    buf = b""
+    while True:
+        data = fh.read(chunk)
+        if not data:
+            return
+        buf += data
+        pos = 0
+        for pos, _, shape, values in iter_frames(buf):
+            yield offset + pos, decoder.record(shape, values)
+        offset += pos
+        buf = buf[pos:]
+
+def encode(record: dict, ids: dict, shapes: dict = None) -> bytes:
+    """One frame; `shapes` optionally caches encoded shapes by key tuple"""
+    keys = tuple(record)
+    shape = shapes.get(keys) if shapes is not None else None
+    if shape is None:
+        shape = json.dumps([ids.get(k, k) for k in keys], separators=_COMPACT).encode()
+        if shapes is not None:
+            shapes[keys] = shape
+    values = marshal.dumps(list(record.values()), MARSHAL_VERSION)
+    return FRAME.pack(SYNC, KINDS.get(record.get("type"), 0), len(shape) + len(values), len(shape)) \
+        + shape + values
+
+def _create(path):
+    """Create `path` holding just the header, atomically (no writer sees it half-made)"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".ctlog.")
+    try:
+        os.write(fd, header_bytes())
+        os.close(fd)
+        os.link(tmp, path)
+    except FileExistsError:
+        pass   # another process won
+    finally:
+        os.unlink(tmp)
+
+_OWN_HEADER = header_bytes()
+_OWN_IDS = {name: i for i, name in enumerate(FIELDS)}
+_formats = {}   # (st_dev, st_ino) -> (ids, shapes) of the files appended to
+
+def _format(fd: int, path: str):
+    """Field ids and a shape cache for the open log `fd`, cached per file
+
+    A file made with our FIELDS is recognised by its header bytes alone;
+    any other header (an older, shorter table) is parsed.
+    """
+    st = os.fstat(fd)
+    fmt = _formats.get((st.st_dev, st.st_ino))
+    if fmt is None:
+        head = os.pread(fd, len(_OWN_HEADER), 0)
+        if head == _OWN_HEADER:
+            fmt = (_OWN_IDS, {})
+        else:
+            if len(head) < len(MAGIC) + _HEADER.size or not is_binlog(head):
+                raise ValueError(f"{path} is not a ClauDEtour binary log")
+            length, = _HEADER.unpack_from(head, len(MAGIC))
+            fields = json.loads(os.pread(fd, length, len(MAGIC) + _HEADER.size))["fields"]
+            fmt = ({name: i for i, name in enumerate(fields)}, {})
+        _formats[st.st_dev, st.st_ino] = fmt
+    return fmt
+
+def append(path, record: dict) -> int:
+    """Append one record to the binary log at `path`; returns the file size"""
+    path = os.fspath(path)
+    while True:
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_APPEND)
+            break
+        except FileNotFoundError:
+            _create(path)   # new log, or rotated away just now
+    try:
+        os.write(fd, encode(record, *_format(fd, path)))
+        return os.lseek(fd, 0, os.SEEK_CUR)   # O_APPEND: the end of our frame
+    finally:
+        os.close(fd)
+
+class Writer:
+    """Write a new binary log to an open (binary) file object"""
+    def __init__(self, fh, fields=FIELDS):
+        self.fh = fh
+        self.ids = {name: i for i, name in enumerate(fields)}
+        self.shapes = {}
+        fh.write(header_bytes(fields))
+
+    def write(self, record: dict):
+        self.fh.write(encode(record, self.ids, self.shapes))
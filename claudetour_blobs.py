@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Content-addressed blob store for ClauDEtour logs
+
+Large log fields (commands, argv, captured output) are stored once under
+~/.claude_tour/blobs as zlib-compressed files named by the SHA-256 of their
+content. Log records keep only {"blob": <sha256>, "size": <bytes>}.
+
+Usage:
+    claudetour_blobs.py cat <sha256>            # print a blob
+    claudetour_blobs.py stats                   # count / size of the store
+    claudetour_blobs.py gc [--prune-days N] [--dry-run]
+"""
+import os, sys, re, time, zlib, hashlib, tempfile
+from pathlib import Path
+
+BLOB_DIR       = Path(os.getenv("CLAUDETOUR_BLOBS", "~/.claude_tour/blobs")).expanduser()
+BLOB_THRESHOLD = int(os.getenv("CLAUDETOUR_BLOB_THRESHOLD", "2048"))   # bytes
+GC_GRACE_SEC   = 3600   # never collect blobs younger than this (may be in flight)
+
+# Record fields that may be moved into the store
+BLOB_FIELDS = ("orig", "corr", "argv")
+
+# A ref's digest in a JSONL log, or in a binary log's marshalled values (a
+# short ASCII string of length 64: type byte z/Z, maybe with the ref flag)
+_REF_RE = re.compile(rb'"blob": ?"([0-9a-f]{64})"|[\x5a\x7a\xda\xfa]\x40([0-9a-f]{64})(?![0-9a-f])')
+
+def is_ref(value) -> bool:
+    return isinstance(value, dict) and "blob" in value and "size" in value
+
+class BlobWriter:
+    """Hash and compress a stream as it is written; close() returns the ref"""
+    def __init__(self, store: "BlobStore"):
+        self.store = store
+        self.sha = hashlib.sha256()
+        self.z = zlib.compressobj(6)
+        self.size = 0
+        tmp_dir = store.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=tmp_dir)
+        self.fh = os.fdopen(fd, "wb")
+        self.tmp = Path(name)
+
+    def write(self, data: bytes):
+        self.sha.update(data)
+        self.size += len(data)
+        self.fh.write(self.z.compress(data))
+
+    def close(self) -> dict:
+        self.fh.write(self.z.flush())
+        self.fh.close()
+        digest = self.sha.hexdigest()
+        final = self.store.path(digest)
+        if final.exists():
+            self.tmp.unlink()           # already stored – dedup
+            os.utime(final)             # refresh so gc grace period applies
+        else:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.tmp, final)
+        return {"blob": digest, "size": self.size}
+
+    def abort(self):
+        self.fh.close()
+        self.tmp.unlink(missing_ok=True)
+
+class BlobStore:
+    def __init__(self, root: Path = BLOB_DIR):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put(self, data) -> dict:
+        if isinstance(data, str):
+            data = data.encode("utf-8", "surrogateescape")
+        digest = hashlib.sha256(data).hexdigest()
+        final = self.path(digest)
+        if final.exists():
+            os.utime(final)
+            return {"blob": digest, "size": len(data)}
+        w = self.writer()
+        w.write(data)
+        return w.close()
+
+    def get(self, ref) -> bytes:
+        digest = ref["blob"] if is_ref(ref) else ref
+        return zlib.decompress(self.path(digest).read_bytes())
+
+    def get_text(self, ref) -> str:
+        return self.get(ref).decode("utf-8", "replace")
+
+    def iter_blobs(self):
+        if not self.root.exists():
+            return
+        for sub in self.root.iterdir():
+            if sub.name == "tmp" or not sub.is_dir():
+                continue
+            for f in sub.iterdir():
+                yield sub.name + f.name, f
+
+    def gc(self, roots, grace_sec: int = GC_GRACE_SEC, dry_run: bool = False):
+        """Delete blobs not referenced by any file in `roots`
+
+        References are found with a byte-level regex, so no record is decoded.
+        Returns (removed, kept, freed_bytes).
+        """
+        live = set()
+        for root in roots:
+            try:
+                with open(root, "rb") as fh:
+                    tail = b""
+                    for chunk in iter(lambda: fh.read(1 << 24), b""):
+                        # carry a tail so a ref split across chunks is still seen
+                        buf = tail + chunk
+                        live.update((j or b).decode() for j, b in _REF_RE.findall(buf))
+                        tail = buf[-80:]
+            except FileNotFoundError:
+                continue
+        cutoff = time.time() - grace_sec
+        removed = kept = freed = 0
+        for digest, f in list(self.iter_blobs()):
+            st = f.stat()
+            if digest in live or st.st_mtime > cutoff:
+                kept += 1
+                continue
+            removed += 1
+            freed += st.st_size
+            if not dry_run:
+                f.unlink()
+        tmp_dir = self.root / "tmp"
+        if tmp_dir.exists() and not dry_run:
+            for f in tmp_dir.iterdir():
+                if f.stat().st_mtime < cutoff:
+                    f.unlink()
+        return removed, kept, freed
+
+_default_store = None
+
+def default_store() -> BlobStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = BlobStore()
+    return _default_store
+
+def _offload(value, store: BlobStore):
+    if isinstance(value, str) and len(value) > BLOB_THRESHOLD:
+        return store.put(value)
+    return value
+
+def offload_record(record: dict, store: BlobStore = None) -> dict:
+    """Return a copy of `record` with oversized BLOB_FIELDS moved to the store"""
+    if BLOB_THRESHOLD <= 0:
+        return record
+    store = store or default_store()
+    out = None
+    for key in BLOB_FIELDS:
+        value = record.get(key)
+        if isinstance(value, list):
+            new = [_offload(v, store) for v in value]
+        else:
+            new = _offload(value, store)
+        if new != value:
+            out = out or dict(record)
+            out[key] = new
+    return out or record
+
+def _inflate(value, store: BlobStore):
+    if not is_ref(value):
+        return value
+    try:
+        return store.get_text(value)
+    except FileNotFoundError:
+        return f"<blob {value['blob'][:12]} missing, {value['size']} bytes>"
+
+def inflate_record(record: dict, store: BlobStore = None) -> dict:
+    """Replace blob refs in BLOB_FIELDS with their text (analyzer side)"""
+    out = None
+    for key in BLOB_FIELDS:
+        value = record.get(key)
+        if isinstance(value, list):
+            if any(is_ref(v) for v in value):
+                out = out or dict(record)
+                out[key] = [_inflate(v, store or default_store()) for v in value]
+        elif is_ref(value):
+            out = out or dict(record)
+            out[key] = _inflate(value, store or default_store())
+    return out or record
+
+def prune_segments(segment_dir: Path, days: float, dry_run: bool = False):
+    """Delete rotated log segments older than `days`"""
+    cutoff = time.time() - days * 86400
+    pruned = []
+    if segment_dir.exists():
+        for f in sorted(segment_dir.iterdir()):
+            if f.is_file() and f.stat().st_mtime < cutoff:
+                pruned.append(f)
+                if not dry_run:
+                    f.unlink()
+    return pruned
+
+def main():
+    args = sys.argv[1:]
+    store = default_store()
+    if not args or args[0] in ("-h", "--help"):
+        print(__doc__.strip())
+        return
+    cmd = args[0]
+    if cmd == "cat" and len(args) == 2:
+        sys.stdout.buffer.write(store.get(args[1]))
+    elif cmd == "stats":
+        count = size = 0
+        for _, f in store.iter_blobs():
+            count += 1
+            size += f.stat().st_size
+        print(f"{count} blobs, {size / 1024:.1f} KiB compressed in {store.root}")
+    elif cmd == "gc":
+        import claudetour
+        dry_run = "--dry-run" in args
+        if "--prune-days" in args:
+            days = float(args[args.index("--prune-days") + 1])
+            for f in prune_segments(claudetour.SEGMENT_DIR, days, dry_run):
+                print(f"{'would prune' if dry_run else 'pruned'} {f}")
+        from claudetour_cache import CACHE_INDEX
+        roots = claudetour.log_segments() + [CACHE_INDEX]   # cached outputs live here too
+        removed, kept, freed = store.gc(roots, dry_run=dry_run)
+        print(f"{'would remove' if dry_run else 'removed'} {removed} blobs "
+              f"({freed / 1024:.1f} KiB), kept {kept}")
+    else:
+        print(__doc__.strip())
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
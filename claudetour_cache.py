@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Opt-in output cache for read-only passthrough commands
+
+With CLAUDETOUR_CACHE=1, a command that takes the safe-passthrough path and
+is in CACHEABLE (`which`, `cat`, `head`, `tail`, plain `ls`, `pwd` – one
+simple command, no redirects or substitutions) is answered from the cache
+when the same command ran in the same directory within CACHE_TTL seconds
+and nothing it depends on changed. The entry remembers the stat (mtime,
+size, inode) of every path the command reads – the files for cat/head/tail,
+the listed directories for ls, the $PATH directories for which – taken
+before the command ran; any difference is a miss. Only regular files and
+directories can be tracked: anything under /proc, /sys or /dev, devices,
+FIFOs and stdin change without their stat changing, so commands reading
+them are never cached.
+
+Output is kept in the blob store, so ~/.claude_tour/cache.json only holds
+refs (and is passed to blob gc as a root). Entries are bounded in size and
+number and evicted least-recently-used first.
+
+Usage:
+    claudetour_cache.py stats
+    claudetour_cache.py clear
+"""
+import os, re, sys, json, stat, time, zlib, fcntl, hashlib, tempfile
+from pathlib import Path
+
+from claudetour_lexer import ShellSyntaxError, parse as parse_shell
+
+CACHE_ENABLED     = os.getenv("CLAUDETOUR_CACHE", "0") == "1"
+CACHE_INDEX       = Path(os.getenv("CLAUDETOUR_CACHE_INDEX", "~/.claude_tour/cache.json")).expanduser()
+CACHE_TTL         = float(os.getenv("CLAUDETOUR_CACHE_TTL", "60"))   # seconds
+CACHE_MAX_ENTRIES = 200
+CACHE_ENTRY_BYTES = 256 * 1024       # larger outputs are never cached
+CACHE_TOTAL_BYTES = 16 * 1024 * 1024
+
+# Flags that make ls show per-file metadata, modes or types (-F, -p,
+# colours) or recurse: the directory mtime would not catch those changes
+# (a chmod doesn't touch it), so such listings are not cached
+_LS_UNSAFE = re.compile(r"^-[^-]*[lsStTucRirhgonFpZ]|^--(?!color=(never|none|no)$)")
+# tail -f never ends; -F/--follow likewise
+_TAIL_FOLLOW = re.compile(r"^-[^-]*[fF]|^--(follow|retry)")
+# Options whose value is the next argument (`head -c 8`)
+_HEAD_VALUES = {"-n", "-c", "--lines", "--bytes"}
+_TAIL_VALUES = _HEAD_VALUES | {"-s", "--sleep-interval", "--pid", "--max-unchanged-stats"}
+_LS_VALUES = {"-w", "-I"}
+# Never tracked: their files change without their stat changing
+_VOLATILE = ("/proc", "/sys", "/dev")
+
+def _files(args, cwd, takes_value=()):
+    """Operands as absolute paths, skipping options and their values; None
+    if one of them is `-` (stdin)"""
+    paths, options, skip = [], True, False
+    for a in args:
+        if skip:
+            skip = False
+        elif options and a == "--":
+            options = False
+        elif options and a.startswith("-") and a != "-":
+            # -n, --lines, or a cluster ending in one (-qn)
+            skip = a in takes_value or (not a.startswith("--") and f"-{a[-1]}" in takes_value)
+        elif a == "-":
+            return None
+        else:
+            paths.append(os.path.join(cwd, os.path.expanduser(a)))
+    return paths
+
+def _which(args, cwd):
+    return [d for d in os.environ.get("PATH", "").split(":") if d]
+
+def _cat(args, cwd):
+    return _files(args, cwd, _HEAD_VALUES) or None   # no files: reads stdin
+
+def _tail(args, cwd):
+    if any(_TAIL_FOLLOW.match(a) for a in args):
+        return None
+    return _files(args, cwd, _TAIL_VALUES) or None
+
+def _ls(args, cwd):
+    if any(_LS_UNSAFE.match(a) for a in args):
+        return None
+    paths = _files(args, cwd, _LS_VALUES)
+    return None if paths is None else paths or [cwd]
+
+def _pwd(args, cwd):
+    return [cwd]
+
+# command -> function(args, cwd) returning the paths to track (None: don't cache).
+# `git status` is deliberately absent: its answer depends on file contents
+# and .git/index, which the mtime of the paths on the command line misses.
+CACHEABLE = {
+    "which": _which,
+    "cat": _cat,
+    "head": _cat,
+    "tail": _tail,
+    "ls": _ls,
+    "pwd": _pwd,
+}
+
+def _snapshot(paths):
+    """{path: [mtime, size, inode]} (None if missing), or None when a path is
+    not a regular file or directory outside _VOLATILE"""
+    out = {}
+    for p in paths:
+        real = os.path.realpath(p)
+        if any(real == v or real.startswith(v + "/") for v in _VOLATILE):
+            return None
+        try:
+            st = os.stat(real)
+        except OSError:
+            out[p] = None
+            continue
+        if not (stat.S_ISREG(st.st_mode) or stat.S_ISDIR(st.st_mode)):
+            return None
+        out[p] = [st.st_mtime_ns, st.st_size, st.st_ino]
+    return out
+
+def probe(cmd: str, cwd: str = None):
+    """Describe `cmd` for the cache: {"key", "tracked"}, or None if not cacheable"""
+    try:
+        parsed = parse_shell(cmd)
+    except ShellSyntaxError:
+        return None
+    if len(parsed.segments) != 1 or parsed.heredocs:
+        return None
+    if any(kind in ("subst", "heredoc") for _, _, kind in parsed.opaque):
+        return None
+    seg = parsed.segments[0]
+    command = seg.command
+    if command is None or seg.redirects or seg.op or seg.words[0] is not command:
+        return None   # assignments, redirects or `&` change what the command does
+    tracker = CACHEABLE.get(command.value)
+    if tracker is None:
+        return None
+    args = [w.value for w in seg.args]
+    if any(c in a for a in args for c in "*?[$`"):
+        return None
+    cwd = cwd or os.getcwd()
+    paths = tracker(args, cwd)
+    if paths is None:
+        return None
+    tracked = _snapshot(paths)
+    if tracked is None:
+        return None
+    env = os.environ.get("PATH", "") if command.value == "which" else ""
+    key = hashlib.sha256(json.dumps([cmd, cwd, env]).encode()).hexdigest()[:32]
+    return {"key": key, "tracked": tracked}
+
+class _Locked:
+    """Read-modify-write of the cache index under a file lock"""
+    def __enter__(self):
+        CACHE_INDEX.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = open(CACHE_INDEX.with_suffix(".lock"), "w")
+        fcntl.flock(self.lock, fcntl.LOCK_EX)
+        try:
+            self.entries = json.loads(CACHE_INDEX.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+        self.dirty = False
+        return self
+
+    def __exit__(self, *exc):
+        if self.dirty:
+            fd, tmp = tempfile.mkstemp(dir=CACHE_INDEX.parent, prefix=".cache.")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(self.entries, fh)   # default separators: blob gc greps for '"blob": "'
+            os.replace(tmp, CACHE_INDEX)
+        self.lock.close()
+
+def lookup(p: dict):
+    """The cached entry for a probe if it is fresh and nothing tracked changed"""
+    if p is None or not CACHE_INDEX.exists():
+        return None
+    with _Locked() as c:
+        entry = c.entries.get(p["key"])
+        if entry is None:
+            return None
+        if time.time() - entry["created"] > CACHE_TTL or entry["tracked"] != p["tracked"]:
+            del c.entries[p["key"]]
+            c.dirty = True
+            return None
+        entry["last_hit"] = time.time()
+        entry["hits"] = entry.get("hits", 0) + 1
+        c.dirty = True
+        return entry
+
+def store(p: dict, returncode: int, stdout_ref, stderr_ref, decision_id: str = None):
+    """Remember a successful run; evict expired, then least recently used entries"""
+    if p is None or returncode != 0:
+        return
+    size = sum(r["size"] for r in (stdout_ref, stderr_ref) if r)
+    if size > CACHE_ENTRY_BYTES:
+        return
+    now = time.time()
+    with _Locked() as c:
+        entries = {k: e for k, e in c.entries.items() if now - e["created"] <= CACHE_TTL}
+        entries[p["key"]] = {
+            "created": now, "last_hit": now, "hits": 0, "decision_id": decision_id,
+            "tracked": p["tracked"], "returncode": returncode,
+            "stdout": stdout_ref, "stderr": stderr_ref, "size": size,
+        }
+        by_age = sorted(entries, key=lambda k: entries[k]["last_hit"])
+        total = sum(e["size"] for e in entries.values())
+        while by_age and (len(entries) > CACHE_MAX_ENTRIES or total > CACHE_TOTAL_BYTES):
+            total -= entries.pop(by_age.pop(0))["size"]
+        c.entries = entries
+        c.dirty = True
+
+def replay(entry: dict, blob_store) -> bool:
+    """Write a cached entry's output to our stdout/stderr; False if a blob is gone"""
+    try:
+        out = blob_store.get(entry["stdout"]) if entry.get("stdout") else b""
+        err = blob_store.get(entry["stderr"]) if entry.get("stderr") else b""
+    except (OSError, zlib.error):
+        return False
+    sys.stdout.buffer.write(out)
+    sys.stdout.buffer.flush()
+    sys.stderr.buffer.write(err)
+    sys.stderr.buffer.flush()
+    return True
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["stats"]:
+        try:
+            entries = json.loads(CACHE_INDEX.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = {}
+        now = time.time()
+        fresh = [e for e in entries.values() if now - e["created"] <= CACHE_TTL]
+        print(f"{len(entries)} entries ({len(fresh)} fresh), "
+              f"{sum(e['hits'] for e in entries.values())} hits, "
+              f"{sum(e['size'] for e in entries.values()) / 1024:.1f} KiB of output; "
+              f"cache {'on' if CACHE_ENABLED else 'off (CLAUDETOUR_CACHE=1)'}")
+    elif args[:1] == ["clear"]:
+        with _Locked() as c:
+            c.entries = {}
+            c.dirty = True
+        print("Cache cleared")
+    else:
+        print(__doc__.strip())
+        sys.exit(0 if args[:1] in (["-h"], ["--help"]) else 1)
+
+if __name__ == "__main__":
+    main()
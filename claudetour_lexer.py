@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Shell lexer for ClauDEtour
+
+Splits a bash command line into simple commands (the segments between
+`|`, `&&`, `||`, `;`, `&` and newlines), words, redirections and heredoc
+bodies in a single left-to-right pass.  Quoted strings, substitutions,
+comments and heredoc bodies are reported as opaque spans so fix rules can
+leave them alone.
+
+This is deliberately a lexer, not a full bash parser: it only needs to know
+where each command starts and which text belongs to arguments.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+class ShellSyntaxError(ValueError):
+    """Raised for input bash itself would reject (unterminated quotes etc.)"""
+
+class Word(NamedTuple):
+    raw: str        # text as written, quotes included
+    value: str      # text after quote removal (substitutions left verbatim)
+    start: int
+    end: int
+
+class Redirect(NamedTuple):
+    op: str         # e.g. '>', '2>&', '<<-'
+    target: Word
+    start: int
+
+class Heredoc(NamedTuple):
+    delimiter: str
+    body: str
+    start: int      # offset of the first body line
+    end: int        # offset just past the delimiter line
+    expand: bool    # False when the delimiter was quoted
+
+class Segment(NamedTuple):
+    """One simple command"""
+    words: Tuple[Word, ...]
+    redirects: Tuple[Redirect, ...]
+    start: int
+    end: int
+    op: str         # operator that ended the segment ('' at end of input)
+
+    @property
+    def command(self) -> Optional[Word]:
+        """The word in command position (skips assignments and keywords)"""
+        for word in self.words:
+            if word.raw in RESERVED_WORDS or ASSIGNMENT.match(word.raw):
+                continue
+            return word
+        return None
+
+    @property
+    def command_start(self) -> int:
+        cmd = self.command
+        return cmd.start if cmd else self.start
+
+    @property
+    def args(self) -> Tuple[Word, ...]:
+        cmd = self.command
+        if cmd is None:
+            return ()
+        return self.words[self.words.index(cmd) + 1:]
+
+class ParsedCommand(NamedTuple):
+    text: str
+    segments: Tuple[Segment, ...]
+    heredocs: Tuple[Heredoc, ...]
+    opaque: Tuple[Tuple[int, int, str], ...]   # (start, end, kind), sorted
+
+    def pipelines(self):
+        """Group segments joined by `|` / `|&` into pipelines"""
+        groups, current = [], []
+        for seg in self.segments:
+            current.append(seg)
+            if seg.op not in ("|", "|&"):
+                groups.append(current)
+                current = []
+        if current:
+            groups.append(current)
+        return groups
+
+RESERVED_WORDS = {"!", "{", "}", "if", "then", "elif", "else", "fi", "do",
+                  "done", "while", "until", "time"}
+ASSIGNMENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\[[^\]]*\])?\+?=")
+
+# Runs of characters that need no special handling inside a word
+_PLAIN = re.compile(r"[^\s'\"\\$`|&;()<>]+")
+_DQ_PLAIN = re.compile(r'[^"\\$`]+')
+_OPERATOR = re.compile(r"&&|\|\||;;&?|;&|\|&|[|&;()]")
+_REDIRECT = re.compile(r"&>>?|\d*(?:<<<|<<-|<<|>>|>&|<&|<>|>\||>|<)")
+_BLANKS = re.compile(r"[^\S\n]*")   # any whitespace except newline
+_ANSI_C_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b",
+                   "e": "\x1b", "E": "\x1b", "f": "\f", "v": "\v",
+                   "\\": "\\", "'": "'", '"': '"', "?": "?"}
+
+class _Lexer:
+    def __init__(self, text: str):
+        self.s = text
+        self.n = len(text)
+        self.segments = []
+        self.heredocs = []
+        self.opaque = []
+        self.words = []
+        self.redirects = []
+        self.pending = []   # heredocs whose bodies start after the next newline
+
+    # -- words ---------------------------------------------------------------
+    def word(self, i: int) -> Tuple[Optional[Word], int]:
+        s, n = self.s, self.n
+        start = i
+        parts = []
+        while i < n:
+            m = _PLAIN.match(s, i)
+            if m:
+                parts.append(m.group())
+                i = m.end()
+                continue
+            c = s[i]
+            if c == "'":
+                j = s.find("'", i + 1)
+                if j < 0:
+                    raise ShellSyntaxError(f"unterminated single quote at {i}")
+                parts.append(s[i + 1:j])
+                self.opaque.append((i, j + 1, "quote"))
+                i = j + 1
+            elif c == '"':
+                j, value = self.double_quoted(i)
+                parts.append(value)
+                self.opaque.append((i, j, "quote"))
+                i = j
+            elif c == "\\":
+                if s.startswith("\\\n", i):
+                    i += 2   # line continuation
+                else:
+                    parts.append(s[i + 1:i + 2])
+                    i += 2
+            elif c == "$":
+                if s.startswith("$'", i):
+                    j, value = self.ansi_c_quoted(i)
+                    parts.append(value)
+                    self.opaque.append((i, j, "quote"))
+                elif s.startswith("$(", i) or s.startswith("${", i):
+                    j = self.skip_group(i + 1)
+                    parts.append(s[i:j])
+                    self.opaque.append((i, j, "subst"))
+                else:
+                    j = i + 1
+                    parts.append("$")
+                i = j
+            elif c == "`":
+                j = self.skip_backticks(i)
+                parts.append(s[i:j])
+                self.opaque.append((i, j, "subst"))
+                i = j
+            elif c in "<>" and s.startswith("(", i + 1) and i == start:
+                j = self.skip_group(i + 1)
+                parts.append(s[i:j])
+                self.opaque.append((i, j, "subst"))
+                i = j
+            else:
+                break
+        if i == start:
+            return None, i
+        return Word(s[start:i], "".join(parts), start, i), i
+
+    def double_quoted(self, i: int) -> Tuple[int, str]:
+        s, n = self.s, self.n
+        i += 1
+        parts = []
+        while i < n:
+            m = _DQ_PLAIN.match(s, i)
+            if m:
+                parts.append(m.group())
+                i = m.end()
+                continue
+            c = s[i]
+            if c == '"':
+                return i + 1, "".join(parts)
+            if c == "\\":
+                nxt = s[i + 1:i + 2]
+                if nxt == "\n":
+                    pass
+                elif nxt in ('"', "\\", "$", "`"):
+                    parts.append(nxt)
+                else:
+                    parts.append("\\" + nxt)
+                i += 2
+            elif c == "$" and (s.startswith("$(", i) or s.startswith("${", i)):
+                j = self.skip_group(i + 1)
+                parts.append(s[i:j])
+                i = j
+            elif c == "`":
+                j = self.skip_backticks(i)
+                parts.append(s[i:j])
+                i = j
+            else:
+                parts.append(c)
+                i += 1
+        raise ShellSyntaxError("unterminated double quote")
+
+    def ansi_c_quoted(self, i: int) -> Tuple[int, str]:
+        s, n = self.s, self.n
+        i += 2
+        parts = []
+        while i < n:
+            c = s[i]
+            if c == "'":
+                return i + 1, "".join(parts)
+            if c == "\\" and i + 1 < n:
+                parts.append(_ANSI_C_ESCAPES.get(s[i + 1], "\\" + s[i + 1]))
+                i += 2
+            else:
+                parts.append(c)
+                i += 1
+        raise ShellSyntaxError("unterminated $'...' quote")
+
+    def skip_group(self, i: int) -> int:
+        """Skip a balanced (...) or {...} starting at s[i]; return end offset"""
+        s, n = self.s, self.n
+        open_c = s[i]
+        close_c = ")" if open_c == "(" else "}"
+        depth = 0
+        while i < n:
+            c = s[i]
+            if c == open_c:
+                depth += 1
+            elif c == close_c:
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            elif c == "\\":
+                i += 1
+            elif c == "'":
+                j = s.find("'", i + 1)
+                if j < 0:
+                    break
+                i = j
+            elif c == '"':
+                i, _ = self.double_quoted(i)
+                continue
+            elif c == "`":
+                i = self.skip_backticks(i)
+                continue
+            i += 1
+        raise ShellSyntaxError(f"unterminated {open_c}{close_c} group")
+
+    def skip_backticks(self, i: int) -> int:
+        s = self.s
+        j = i + 1
+        while True:
+            j = s.find("`", j)
+            if j < 0:
+                raise ShellSyntaxError("unterminated backquote")
+            # an odd number of backslashes escapes the backtick
+            k = j
+            while k > i + 1 and s[k - 1] == "\\":
+                k -= 1
+            if (j - k) % 2 == 0:
+                return j + 1
+            j += 1
+
+    # -- structure -----------------------------------------------------------
+    def add_word(self, i: int) -> int:
+        word, j = self.word(i)
+        if word is None:
+            # never spin on a character no branch consumes
+            raise ShellSyntaxError(f"unexpected {self.s[i]!r} at {i}")
+        self.words.append(word)
+        return j
+
+    def end_segment(self, op: str):
+        if self.words or self.redirects:
+            tokens = [w.start for w in self.words] + [r.start for r in self.redirects]
+            ends = [w.end for w in self.words] + [r.target.end for r in self.redirects]
+            self.segments.append(Segment(tuple(self.words), tuple(self.redirects),
+                                         min(tokens), max(ends), op))
+        self.words = []
+        self.redirects = []
+
+    def read_heredocs(self, i: int) -> int:
+        s, n = self.s, self.n
+        for target, strip_tabs in self.pending:
+            delim = target.value
+            body_start = pos = i
+            while True:
+                j = s.find("\n", pos)
+                line = s[pos:n if j < 0 else j]
+                if (line.lstrip("\t") if strip_tabs else line) == delim:
+                    body_end = pos
+                    i = n if j < 0 else j + 1
+                    break
+                if j < 0:
+                    # bash accepts EOF as the delimiter with a warning
+                    body_end = i = n
+                    break
+                pos = j + 1
+            self.heredocs.append(Heredoc(delim, s[body_start:body_end], body_start,
+                                         i, target.raw == target.value))
+            self.opaque.append((body_start, i, "heredoc"))
+        self.pending = []
+        return i
+
+    def run(self) -> ParsedCommand:
+        s, n = self.s, self.n
+        i = 0
+        while i < n:
+            c = s[i]
+            if c == "\n":
+                self.end_segment("\n")
+                i = self.read_heredocs(i + 1) if self.pending else i + 1
+            elif c.isspace():
+                i += 1   # blanks, but also \r, \v and \f (CRLF-terminated commands)
+            elif c == "\\" and s.startswith("\\\n", i):
+                i += 2
+            elif c == "#":
+                j = s.find("\n", i)
+                j = n if j < 0 else j
+                self.opaque.append((i, j, "comment"))
+                i = j
+            elif c in "<>" and s.startswith("(", i + 1):
+                i = self.add_word(i)
+            elif _REDIRECT.match(s, i):
+                m = _REDIRECT.match(s, i)
+                op = m.group()
+                i = _BLANKS.match(s, m.end()).end()
+                target, i = self.word(i)
+                if target is None:
+                    raise ShellSyntaxError(f"missing target after {op!r}")
+                if op.endswith(("<<", "<<-")) and not op.endswith("<<<"):
+                    self.pending.append((target, op.endswith("-")))
+                self.redirects.append(Redirect(op, target, m.start()))
+            elif _OPERATOR.match(s, i):
+                m = _OPERATOR.match(s, i)
+                self.end_segment(m.group())
+                i = m.end()
+            else:
+                i = self.add_word(i)
+        self.end_segment("")
+        return ParsedCommand(s, tuple(self.segments), tuple(self.heredocs),
+                             tuple(sorted(self.opaque)))
+
+@lru_cache(maxsize=64)
+def parse(text: str) -> ParsedCommand:
+    """Lex `text` once; repeated lookups of the same command are free"""
+    return _Lexer(text).run()
+
+def extract_eval(full_cmd: str) -> Optional[str]:
+    """Return the payload of the first `eval ARGS...` in `full_cmd`
+
+    Claude Code wraps commands as `eval 'CMD' < /dev/null && pwd -P >| FILE`
+    with embedded quotes escaped shell-style ('\\'' and friends), so the
+    payload must be unquoted rather than cut out with a regex.
+    """
+    for seg in parse(full_cmd).segments:
+        cmd = seg.command
+        if cmd is not None and cmd.value == "eval":
+            return " ".join(w.value for w in seg.args)
+    return None
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Log reading helpers shared by the ClauDEtour analyzers
+
+Every reader accepts both the JSONL log and the binary encoding of
+claudetour_binlog; the format is sniffed from the first bytes of each file.
+"""
+import os, re, sys, json, mmap, heapq
+from collections import OrderedDict
+from itertools import chain
+from pathlib import Path
+
+from claudetour_binlog import (KINDS, MAGIC, SYNC, count_frames, frame_at, is_binlog, iter_frames,
+                              iter_records, needle, read_header, read_header_from, search_frames)
+
+DEFAULT_LOG = Path.home() / ".claude_tour" / "log.jsonl"
+DEFAULT_BINARY = DEFAULT_LOG.with_suffix(".ctlog")
+DEDUP_WINDOW = 100_000   # recent record keys remembered while merging
+REORDER_WINDOW = 1_000   # records per source held back to restore ts order
+
+def decode_line(line: bytes):
+    """Parse one JSONL line; None for blanks and garbage"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+def default_logs():
+    """Rotated segments, then the live log files that exist (JSONL and/or
+    binary), oldest first"""
+    if not DEFAULT_LOG.parent.is_dir():
+        return [DEFAULT_LOG]
+    return source_files(DEFAULT_LOG.parent) or [DEFAULT_LOG]
+
+def open_binlog(fh):
+    """(Decoder, offset of the first frame) if `fh` is a binary log, else None
+
+    `fh` is left at the first frame, or at the start for JSONL.
+    """
+    head = fh.read(len(MAGIC))
+    if is_binlog(head):
+        return read_header_from(fh, head)
+    fh.seek(0)
+    return None
+
+class LogTail:
+    """Incrementally read records appended to a log file (JSONL or binary)
+
+    Survives rotation (the path now names a different inode: the old file is
+    drained, then the new one is read from the start) and truncation (the
+    file shrank below our position: start over).
+    """
+    def __init__(self, path, from_end: bool = False):
+        self.path = Path(path)
+        self.from_end = from_end
+        self.fh = None
+        self.inode = None
+        self.decoder = None
+        self.buf = b""
+
+    def _open(self) -> bool:
+        try:
+            self.fh = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.inode = os.fstat(self.fh.fileno()).st_ino
+        binary = open_binlog(self.fh)
+        self.decoder = binary[0] if binary else None
+        if self.from_end:
+            self.fh.seek(0, os.SEEK_END)
+            self.from_end = False
+        self.buf = b""
+        return True
+
+    def read_new(self):
+        """Return the complete records appended since the last call"""
+        records = []
+        while True:
+            if self.fh is None and not self._open():
+                return records
+            chunk = self.fh.read(1 << 20)
+            if chunk and self.decoder:
+                self.buf += chunk
+                pos = 0
+                for pos, _, shape, values in iter_frames(self.buf):
+                    record = self.decoder.record(shape, values)
+                    if record is not None:
+                        records.append(record)
+                self.buf = self.buf[pos:]
+                continue
+            if chunk:
+                lines = (self.buf + chunk).split(b"\n")
+                self.buf = lines.pop()
+                records.extend(r for r in map(decode_line, lines) if r is not None)
+                continue
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                st = None
+            if st is None or st.st_ino != self.inode:
+                # rotated away – old file is drained, switch to the new one
+                self.close()
+                if st is None:
+                    return records
+                continue
+            if st.st_size < self.fh.tell():
+                # truncated in place – start over (and sniff the format again)
+                self.close()
+                continue
+            return records
+
+    def close(self):
+        if self.fh:
+            self.fh.close()
+        self.fh = None
+
+def _fingerprint(fh, offset: int, base: int = 0) -> str:
+    fh.seek(base)
+    head = fh.read(min(offset - base, 256))
+    fh.seek(offset)
+    return head.hex()
+
+def read_incremental(paths, checkpoints: dict):
+    """Yield records appended to `paths` since the last call
+
+    `checkpoints` (persisted by the caller) maps "dev:inode" to the offset
+    already consumed plus a fingerprint of the file head. Keying by inode
+    means a rotated segment keeps its offset under its new name; the
+    fingerprint catches truncation and inode reuse. Only whole lines are
+    consumed, so a record being written right now is picked up next time.
+    """
+    live = set()
+    for path in paths:
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            continue
+        with fh:
+            st = os.fstat(fh.fileno())
+            key = f"{st.st_dev}:{st.st_ino}"
+            live.add(key)
+            mark = checkpoints.get(key, {})
+            offset = mark.get("offset", 0)
+            binary = open_binlog(fh)
+            # binary logs all share one header: fingerprint the first frames instead
+            base = binary[1] if binary else 0
+            if offset > st.st_size or _fingerprint(fh, max(offset, base), base) != mark.get("head", ""):
+                offset = base
+            offset = max(offset, base)
+            fh.seek(offset)
+            if binary:
+                for offset, record in iter_records(fh, binary[0], offset):
+                    if record is not None:
+                        yield record
+            else:
+                for line in fh:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    record = decode_line(line)
+                    if record is not None:
+                        yield record
+            checkpoints[key] = {"offset": offset, "head": _fingerprint(fh, offset, base)}
+    for key in list(checkpoints):
+        if key not in live:
+            del checkpoints[key]
+
+###############################################################################
+# Memory-mapped scan with byte-level filter pushdown
+###############################################################################
+def _field_pattern(key: str, values) -> bytes:
+    alts = b"|".join(re.escape(json.dumps(v, ensure_ascii=False).encode()) for v in values)
+    return b'"' + key.encode() + b'":\\s*(?:' + alts + b")"
+
+def count_lines(mm) -> int:
+    step = 1 << 26
+    return sum(mm[i:i + step].count(b"\n") for i in range(0, len(mm), step))
+
+def _scan_binlog(mm, session_id, types, stats):
+    """scan_file for a binary log: frames are found by byte search
+
+    The raw bytes of the session id (or SYNC + the wanted kinds) are
+    searched for and only the frames around the hits are decoded; no other
+    frame is even walked over.
+    """
+    decoder, pos = read_header(mm)
+    kinds = {KINDS.get(t, 0) for t in types} if types else None
+    if session_id is not None:
+        pattern = needle(session_id)
+    else:
+        pattern = re.compile(re.escape(SYNC) + b"[" + re.escape(bytes(sorted(kinds))) + b"]")
+    decoded = 0
+    for _, kind, shape, values in search_frames(mm, pattern, pos):
+        if kinds is not None and kind not in kinds:
+            continue
+        decoded += 1
+        record = decoder.record(shape, values)
+        if record is None:
+            continue
+        if session_id is not None and record.get("session_id") != session_id:
+            continue
+        if types and record.get("type") not in types:
+            continue
+        yield record
+    if stats is not None:
+        stats["lines"] = stats.get("lines", 0) + count_frames(mm, pos)
+        stats["decoded"] = stats.get("decoded", 0) + decoded
+
+def scan_file(path, session_id=None, types=None, stats=None):
+    """Yield records of one log file that match `session_id` / `types`
+
+    The file is memory-mapped and searched for the raw bytes of
+    `"session_id": "<id>"` (or of the wanted `"type"` values); only lines
+    containing a hit are decoded. `stats`, if given, receives the total
+    line count and how many lines were actually decoded. Binary logs are
+    walked frame by frame instead (see _scan_binlog).
+    """
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if is_binlog(mm[:len(MAGIC)]):
+                yield from _scan_binlog(mm, session_id, types, stats)
+                return
+            if session_id is not None:
+                needle = re.compile(_field_pattern("session_id", [session_id]))
+                type_check = re.compile(_field_pattern("type", types)) if types else None
+            else:
+                needle = re.compile(_field_pattern("type", types))
+                type_check = None
+            decoded = 0
+            pos = 0
+            size = len(mm)
+            while True:
+                hit = needle.search(mm, pos)
+                if not hit:
+                    break
+                start = mm.rfind(b"\n", 0, hit.start()) + 1
+                end = mm.find(b"\n", hit.end())
+                end = size if end < 0 else end
+                pos = end + 1
+                line = mm[start:end]
+                if type_check and not type_check.search(line):
+                    continue
+                decoded += 1
+                record = decode_line(line)
+                if record is None:
+                    continue
+                if session_id is not None and record.get("session_id") != session_id:
+                    continue   # the bytes matched inside some other field
+                if types and record.get("type") not in types:
+                    continue
+                yield record
+            if stats is not None:
+                stats["lines"] = stats.get("lines", 0) + count_lines(mm)
+                stats["decoded"] = stats.get("decoded", 0) + decoded
+
+def scan_report(stats) -> str:
+    lines, decoded = stats.get("lines", 0), stats.get("decoded", 0)
+    skipped = 100.0 * (lines - decoded) / lines if lines else 0.0
+    return f"Log scan: decoded {decoded:,} of {lines:,} lines ({skipped:.1f}% skipped)"
+
+def latest_session_id(path=DEFAULT_LOG):
+    """session_id of the last record that has one, read from the end of the file"""
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if is_binlog(mm[:len(MAGIC)]):
+                return _latest_session_binlog(mm)
+            end = len(mm)
+            while True:
+                hit = mm.rfind(b'"session_id":', 0, end)
+                if hit < 0:
+                    return None
+                start = mm.rfind(b"\n", 0, hit) + 1
+                stop = mm.find(b"\n", hit)
+                record = decode_line(mm[start:len(mm) if stop < 0 else stop])
+                if record and "session_id" in record:
+                    return record["session_id"]
+                end = hit
+
+def _latest_session_binlog(mm):
+    """Walk back over the frames from the end; decode the last with a session_id"""
+    decoder, first = read_header(mm)
+    end = len(mm)
+    pos = mm.rfind(SYNC, first, end)
+    while pos >= 0:
+        frame = frame_at(mm, pos, end)
+        if frame:
+            try:
+                if "session_id" in decoder.keys(frame[2]):
+                    record = decoder.record(frame[2], frame[3])
+                    if record and record.get("session_id") is not None:
+                        return record["session_id"]
+            except (ValueError, IndexError):
+                pass
+            end = pos   # frames before this one end here
+        pos = mm.rfind(SYNC, first, pos)
+    return None
+
+###############################################################################
+# Execution summaries
+###############################################################################
+RESOURCES = (
+    ("CPU time", lambda e: e.get("cpu_user_ms", 0) + e.get("cpu_sys_ms", 0),
+     lambda v: f"{v / 1000:.1f}s"),
+    ("Peak memory", lambda e: e.get("max_rss_kb", 0),
+     lambda v: f"{v / 1024:.0f}MB"),
+    ("Block I/O", lambda e: e.get("blk_in", 0) + e.get("blk_out", 0),
+     lambda v: f"{v * 512 / 1048576:.1f}MB"),
+)
+
+def resource_report(executions, commands: dict, n: int = 5):
+    """Lines naming the heaviest executions by CPU, memory and disk I/O
+
+    `commands` maps decision ids to the command text that was run.
+    """
+    def label(e):
+        return (commands.get(e.get("decision_id")) or f"<{e.get('decision_id')}>")[:70]
+
+    executions = [e for e in executions if "cpu_user_ms" in e]
+    if not executions:
+        return []
+    out = ["Top resource consumers:"]
+    for title, value, fmt in RESOURCES:
+        top = sorted(executions, key=value, reverse=True)[:n]
+        top = [e for e in top if value(e) > 0]
+        if top:
+            out.append(f"  {title}:")
+            out.extend(f"    {fmt(value(e)):>8}  {label(e)}"
+                       for e in top)
+    timed_out = [e for e in executions if e.get("timed_out")]
+    if timed_out:
+        out.append(f"  Killed on timeout: {len(timed_out)}")
+        out.extend(f"    {e.get('timeout_sec', 0):>7g}s  {label(e)}"
+                   for e in timed_out[:n])
+    return out
+
+###############################################################################
+# Multi-source merge
+###############################################################################
+def source_files(path: Path):
+    """A log file, or a directory holding log.jsonl / log.ctlog and rotated segments"""
+    path = Path(path).expanduser()
+    if not path.is_dir():
+        return [path]
+    files = []
+    for pattern in ("segments/log-*", "log-*"):
+        files += sorted((p for suffix in (".jsonl", ".ctlog") for p in path.glob(pattern + suffix)),
+                        key=lambda p: p.name)
+    live = [path / name for name in ("log.jsonl", "log.ctlog") if (path / name).exists()]
+    return files + sorted(live, key=lambda p: p.stat().st_mtime)
+
+def live_files(spec: str = None):
+    """Live log files to follow for a --log spec (default: ~/.claude_tour)
+
+    A directory gives its log.jsonl and log.ctlog, whether they exist yet
+    or not; rotated segments are never written to again.
+    """
+    if spec is None:
+        return [DEFAULT_LOG, DEFAULT_BINARY]
+    host, sep, path = spec.partition("=")
+    if not sep or "/" in host:
+        path = spec
+    if path == "-":
+        return []
+    p = Path(path).expanduser()
+    return [p / "log.jsonl", p / "log.ctlog"] if p.is_dir() else [p]
+
+def parse_source(spec: str):
+    """'HOST=PATH' or 'PATH' (host label defaults to the file/dir name)"""
+    host, sep, path = spec.partition("=")
+    if not sep or "/" in host:
+        host, path = None, spec
+    if path == "-":
+        return host or "stdin", None
+    p = Path(path).expanduser()
+    return host or (p.name if p.is_dir() else p.stem), source_files(p)
+
+def iter_files(paths, session_id=None, types=None, stats=None):
+    for path in paths:
+        if session_id is not None or types:
+            yield from scan_file(path, session_id, types, stats)
+            continue
+        try:
+            with open(path, "rb") as fh:
+                binary = open_binlog(fh)
+                if binary:
+                    records = (r for _, r in iter_records(fh, *binary))
+                else:
+                    records = map(decode_line, fh)
+                for record in records:
+                    if record is not None:
+                        yield record
+        except FileNotFoundError:
+            continue
+
+def iter_stdin():
+    stdin = sys.stdin.buffer
+    head = stdin.read(len(MAGIC))
+    if is_binlog(head):
+        records = (r for _, r in iter_records(stdin, *read_header_from(stdin, head)))
+    else:
+        records = map(decode_line, chain([head + stdin.readline()], stdin))
+    for record in records:
+        if record is not None:
+            yield record
+
+_FRACTION = re.compile(r"(\.\d+)?(Z|[+-]\d\d:\d\d)?$")
+
+def ts_key(ts) -> str:
+    """Sortable form of our ISO timestamps (fraction padded to 6 digits)"""
+    if not ts:
+        return ""
+    m = _FRACTION.search(ts)
+    frac = (m.group(1) or ".")[1:].ljust(6, "0")[:6]
+    return f"{ts[:m.start()]}.{frac}"
+
+def record_key(record: dict, host: str = None):
+    """Identity used for de-duplication across copies of the same log
+
+    Decision ids are only 32 bits, so they are scoped to their session (or,
+    lacking one, the host) – bare ids from different sessions collide.
+    """
+    if record.get("id"):
+        return (record.get("session_id") or record.get("host") or host, record["id"])
+    return (record.get("type"), record.get("session_id"),
+            record.get("decision_id"), record.get("ts"), record.get("debug"))
+
+def _reorder(stream, window: int):
+    """Restore the order of a stream of (ts_key, ...) tuples that are out of
+    place by fewer than `window` items"""
+    held = []
+    for n, item in enumerate(stream):
+        heapq.heappush(held, (item[0], n, item))
+        if len(held) > window:
+            yield heapq.heappop(held)[2]
+    while held:
+        yield heapq.heappop(held)[2]
+
+def merge_sources(specs, dedup_window: int = DEDUP_WINDOW, session_id=None, types=None, stats=None):
+    """Streaming k-way merge of several logs by `ts`
+
+    Each source is read lazily. A log is only roughly in time order – a
+    decision is written after the approval wait, so later records can come
+    before it – and each source is re-sorted through a window of
+    REORDER_WINDOW records before merging. Memory stays bounded by that
+    window per source plus a fixed-size window of recently seen record keys
+    used to drop duplicates. Records get a `host` label naming their source
+    unless they already carry one.
+    """
+    def keyed(i, spec):
+        host, files = parse_source(spec)
+        if files is None:
+            records = (r for r in iter_stdin()
+                       if (session_id is None or r.get("session_id") == session_id)
+                       and (not types or r.get("type") in types))
+        else:
+            records = iter_files(files, session_id, types, stats)
+        for record in records:
+            yield ts_key(record.get("ts")), i, record, host
+
+    streams = [_reorder(keyed(i, spec), REORDER_WINDOW) for i, spec in enumerate(specs)]
+    recent = OrderedDict()
+    for _, _, record, host in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+        key = record_key(record, host)
+        if key in recent:
+            continue
+        recent[key] = None
+        if len(recent) > dedup_window:
+            recent.popitem(last=False)
+        record.setdefault("host", host)
+        yield record
+
+def latest_session(sources=None):
+    """Most recent session_id in the default log or in merged `sources`"""
+    if not sources:
+        return latest_session_id(default_logs()[-1])
+    latest = None
+    for record in merge_sources(sources):
+        latest = record.get("session_id", latest)
+    return latest
+
+def iter_log(sources=None, session_id=None, types=None, stats=None):
+    """Records from the default log, or merged from `sources` (see --log)
+
+    With `session_id` and/or `types` the files are scanned with byte-level
+    pre-filtering (scan_file) instead of decoding every line.
+    """
+    if not sources:
+        return iter_files(default_logs(), session_id, types, stats)
+    return merge_sources(sources, session_id=session_id, types=types, stats=stats)
+
+def pop_log_args(args):
+    """Remove every `--log SPEC` from an argv list and return the specs"""
+    sources = []
+    while "--log" in args:
+        i = args.index("--log")
+        if i + 1 == len(args):
+            print("--log needs an argument: --log [HOST=]PATH (or -)", file=sys.stderr)
+            sys.exit(2)
+        sources.append(args[i + 1])
+        del args[i:i + 2]
+    return sources
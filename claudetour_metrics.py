@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for ClauDEtour
+
+Every interceptor run is a separate process, so counters and histograms are
+accumulated in memory during the run and merged into a small JSON state file
+(~/.claude_tour/metrics.json) once at exit, under a file lock. From there
+they are exposed in Prometheus text format:
+
+  • textfile collector – set CLAUDETOUR_METRICS_TEXTFILE to a *.prom path
+    (e.g. node_exporter's --collector.textfile.directory); it is rewritten
+    atomically after every run
+  • HTTP – `claudetour_metrics.py serve [--port 9464]` on 127.0.0.1 only
+
+Usage:
+    claudetour_metrics.py dump                 # print the current exposition
+    claudetour_metrics.py serve [--port N]
+"""
+import os, sys, json, atexit, fcntl, tempfile
+from pathlib import Path
+
+from claudetour_stats import DURATION_BOUNDS_MS, Histogram
+
+METRICS_ENABLED  = os.getenv("CLAUDETOUR_METRICS", "1") == "1"
+METRICS_STATE    = Path(os.getenv("CLAUDETOUR_METRICS_STATE",
+                                  "~/.claude_tour/metrics.json")).expanduser()
+METRICS_TEXTFILE = os.getenv("CLAUDETOUR_METRICS_TEXTFILE", "")
+METRICS_PORT     = int(os.getenv("CLAUDETOUR_METRICS_PORT", "9464"))
+
+# name -> (type, help); histograms are observed in ms, exported in seconds
+METRICS = {
+    "claudetour_interceptor_overhead_seconds":
+        ("histogram", "Time spent in ClauDEtour itself, excluding approval wait and the command"),
+    "claudetour_approval_wait_seconds":
+        ("histogram", "Time spent waiting for the user to approve, edit or reject"),
+    "claudetour_command_duration_seconds":
+        ("histogram", "Wall-clock duration of executed commands"),
+    "claudetour_command_cpu_seconds":
+        ("histogram", "User plus system CPU time of executed commands"),
+    "claudetour_decisions_total":
+        ("counter", "Intercepted commands by decision mode"),
+    "claudetour_fixes_total":
+        ("counter", "Automatic fixes applied, by rule"),
+    "claudetour_rejections_total":
+        ("counter", "Commands rejected by the user"),
+    "claudetour_command_errors_total":
+        ("counter", "Executed commands that exited non-zero"),
+    "claudetour_command_timeouts_total":
+        ("counter", "Executed commands killed after exceeding their timeout"),
+}
+
+_pending = {"counters": [], "observations": []}
+_registered = False
+
+def _schedule_flush():
+    global _registered
+    if not _registered:
+        atexit.register(flush)
+        _registered = True
+
+def inc(name: str, labels: dict = None, n: float = 1):
+    if METRICS_ENABLED:
+        _pending["counters"].append((name, labels or {}, n))
+        _schedule_flush()
+
+def observe(name: str, value_ms: float):
+    if METRICS_ENABLED:
+        _pending["observations"].append((name, value_ms))
+        _schedule_flush()
+
+def _label_key(labels: dict) -> str:
+    return json.dumps(labels, sort_keys=True, ensure_ascii=False)
+
+def _load_state() -> dict:
+    try:
+        return json.loads(METRICS_STATE.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"counters": {}, "histograms": {}}
+
+def _atomic_write(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as fh:
+        fh.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+def flush():
+    """Merge this process' metrics into the state file (and textfile)"""
+    if not (_pending["counters"] or _pending["observations"]):
+        return
+    METRICS_STATE.parent.mkdir(parents=True, exist_ok=True)
+    with open(METRICS_STATE.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = _load_state()
+        for name, labels, n in _pending["counters"]:
+            series = state["counters"].setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + n
+        for name, value in _pending["observations"]:
+            raw = state["histograms"].get(name)
+            hist = Histogram.from_dict(raw) if raw else Histogram(DURATION_BOUNDS_MS)
+            hist.observe(value)
+            state["histograms"][name] = hist.to_dict()
+        _atomic_write(METRICS_STATE, json.dumps(state))
+        if METRICS_TEXTFILE:
+            _atomic_write(Path(METRICS_TEXTFILE).expanduser(), render(state))
+    _pending["counters"].clear()
+    _pending["observations"].clear()
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+def render(state: dict = None) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    state = state if state is not None else _load_state()
+    out = []
+    for name, (kind, help_text) in METRICS.items():
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            series = state["counters"].get(name, {})
+            if not series:
+                out.append(f"{name} 0")
+            for key, value in sorted(series.items()):
+                out.append(f"{name}{_labels(json.loads(key))} {value:g}")
+        else:
+            raw = state["histograms"].get(name)
+            hist = Histogram.from_dict(raw) if raw else Histogram(DURATION_BOUNDS_MS)
+            for bound, count in hist.cumulative():
+                le = bound if bound == "+Inf" else f"{bound / 1000:g}"
+                out.append(f'{name}_bucket{{le="{le}"}} {count}')
+            out.append(f"{name}_sum {hist.sum / 1000:g}")
+            out.append(f"{name}_count {hist.count}")
+    return "\n".join(out) + "\n"
+
+def serve(port: int = METRICS_PORT):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", port), Handler)
+    print(f"Serving ClauDEtour metrics on http://127.0.0.1:{port}/metrics", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["dump"]:
+        sys.stdout.write(render())
+    elif args[:1] == ["serve"]:
+        port = int(args[args.index("--port") + 1]) if "--port" in args else METRICS_PORT
+        serve(port)
+    else:
+        print(__doc__.strip())
+        sys.exit(0 if args[:1] in (["-h"], ["--help"]) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+Persistent path index for ClauDEtour's path resolution fix stage
+
+Two files under ~/.claude_tour:
+
+- paths.pickle – the builder's state: a directory tree of the configured
+  roots (CLAUDETOUR_PATH_ROOTS, plus every /mnt/<x> mount) where each
+  directory remembers its mtime. A refresh re-lists only directories whose
+  mtime changed. Only the background builder (`build`, `refresh`) loads,
+  refreshes and saves it.
+- paths.idx – what commands query, written next to it on every save. The
+  directories form a trie: each node is (parent, name), so a shared prefix
+  is stored once. A sorted basename table points at postings lists of the
+  nodes that contain each name. The file is mmap'd and binary-searched in
+  place, so a lookup reads a few pages and never rewrites anything.
+
+With the index, a path argument that does not exist – a Windows path
+(C:\\Users\\me\\src\\x.py, /mnt/c/...) or a partial one (src/x.py from the
+wrong directory) – is resolved to the single existing path whose trailing
+components match it. Only arguments of read-only commands (RESOLVE_COMMANDS)
+are rewritten, and at least two trailing components must match: `rm x.txt`
+or `python3 train.py` never silently turn into some other file. The index is
+only opened when a command actually has such an argument, and a lookup gives
+up after CLAUDETOUR_PATH_BUDGET_MS.
+
+Usage:
+    claudetour_paths.py build           # full walk, no time budget
+    claudetour_paths.py refresh         # one budgeted refresh step
+    claudetour_paths.py find PATH       # what PATH would resolve to
+    claudetour_paths.py stats
+"""
+import os, re, gc, sys, mmap, time, fcntl, bisect, pickle, struct, tempfile
+from array import array
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from claudetour_lexer import ShellSyntaxError, Word, parse as parse_shell
+
+PATH_INDEX     = Path(os.getenv("CLAUDETOUR_PATH_INDEX", "~/.claude_tour/paths.pickle")).expanduser()
+PATH_LOOKUP    = PATH_INDEX.with_suffix(".idx")
+PATH_ROOTS     = [Path(p).expanduser() for p in os.getenv("CLAUDETOUR_PATH_ROOTS", "~").split(":") if p]
+PATH_MOUNTS    = os.getenv("CLAUDETOUR_PATH_MOUNTS", "1") == "1"   # also index /mnt/<x> mounts
+MAX_DEPTH      = int(os.getenv("CLAUDETOUR_PATH_DEPTH", "8"))
+MOUNT_DEPTH    = int(os.getenv("CLAUDETOUR_PATH_MOUNT_DEPTH", "4"))   # for SLOW_FS mounts
+MAX_AGE        = float(os.getenv("CLAUDETOUR_PATH_MAX_AGE", "3600"))  # seconds before a rebuild
+TIME_BUDGET    = float(os.getenv("CLAUDETOUR_PATH_BUDGET_MS", "50")) / 1000
+
+# Never descended into
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv",
+             ".cache", ".npm", ".cargo", ".rustup", ".local", ".mypy_cache",
+             ".pytest_cache", ".tox", "site-packages", "dist-packages", ".claude_tour",
+             "AppData", "Windows", "Program Files", "Program Files (x86)", "ProgramData",
+             "$Recycle.Bin", "System Volume Information"}
+
+# Filesystems where every stat is a round trip (DrvFs under WSL, network shares)
+SLOW_FS = {"drvfs", "9p", "v9fs", "cifs", "smb3", "smbfs", "nfs", "nfs4", "fuse.sshfs",
+           "fuse.rclone", "davfs"}
+
+WINDOWS_PATH = re.compile(r"^([A-Za-z]):[\\/]")
+LOOKS_LIKE_FILE = re.compile(r"\w\.[A-Za-z0-9]{1,6}$")   # bare name with an extension
+
+# Commands whose (last) arguments are often paths that do not exist yet
+CREATES_ALL = {"mkdir", "touch", "tee"}
+CREATES_LAST = {"cp", "mv", "ln", "rsync", "scp", "install"}
+# Commands whose arguments are mostly text or patterns, not paths
+TEXT_COMMANDS = {"echo", "printf", "sed", "awk", "jq", "export"}
+# Commands whose first operand is a pattern, the rest are paths
+PATTERN_FIRST = {"grep", "egrep", "fgrep", "rg"}
+# The only commands whose path arguments fix_paths may rewrite: they read,
+# so pointing them at the wrong file can't destroy anything. A `cd` target
+# is only resolved when every command in the line is one of these, since
+# it moves all later commands to another directory.
+RESOLVE_COMMANDS = {"ls", "cat", "head", "tail", "less", "more", "wc", "file", "stat",
+                    "du", "tree", "diff", "cmp", "bat", "xxd", "hexdump", "md5sum", "sha256sum",
+                    "readlink", "realpath"} | PATTERN_FIRST
+
+def mount_roots():
+    """/mnt/<x> mount points from /proc/mounts (drvfs drives under WSL, shares...)
+    as (path, fstype)"""
+    roots = []
+    try:
+        with open("/proc/mounts") as fh:
+            for line in fh:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                point = re.sub(r"\\(\d{3})", lambda m: chr(int(m.group(1), 8)), fields[1])
+                if re.fullmatch(r"/mnt/[^/]+", point):
+                    roots.append((Path(point), fields[2]))
+    except OSError:
+        pass
+    return roots
+
+def configured_roots():
+    """{root: depth limit} – slow mounts are only indexed MOUNT_DEPTH deep"""
+    roots = {str(r): MAX_DEPTH for r in PATH_ROOTS}
+    for point, fstype in (mount_roots() if PATH_MOUNTS else []):
+        roots.setdefault(str(point), MOUNT_DEPTH if fstype in SLOW_FS else MAX_DEPTH)
+    return roots
+
+def stale(path: Path = PATH_LOOKUP) -> bool:
+    """Whether the lookup file is missing or older than MAX_AGE"""
+    try:
+        return time.time() - path.stat().st_mtime > MAX_AGE
+    except OSError:
+        return True
+
+STATE_VERSION = 3
+
+class PathIndex:
+    """Directory tree refreshed incrementally by mtime – the builder's side"""
+    def __init__(self, roots):
+        # {root: depth limit}; a plain list of roots gets MAX_DEPTH each
+        self.roots = dict(roots) if isinstance(roots, dict) else dict.fromkeys(roots, MAX_DEPTH)
+        self.dirs = {}        # dir -> (mtime, depth, names, subdirs)
+        self.queue = []       # (dir, depth) still to be listed
+        self.cursor = 0       # round-robin position for mtime checks
+        self.dirty = False
+        self._order = None
+
+    # -- maintenance ---------------------------------------------------------
+    def _list(self, path: str, depth: int):
+        try:
+            st = os.stat(path)
+            with os.scandir(path) as it:
+                entries = [(e.name, e.is_dir(follow_symlinks=False)) for e in it]
+        except OSError:
+            self._drop(path)
+            return
+        names = tuple(name for name, _ in entries)
+        subdirs = tuple(name for name, is_dir in entries
+                        if is_dir and name not in SKIP_DIRS)
+        old = self.dirs.get(path)
+        self.dirs[path] = (st.st_mtime, depth, names, subdirs)
+        if old:
+            for name in set(old[3]) - set(subdirs):
+                self._drop(os.path.join(path, name))
+        if depth < self._limit(path):
+            for name in subdirs:
+                child = os.path.join(path, name)
+                if child not in self.dirs:
+                    self.queue.append((child, depth + 1))
+        self.dirty = True
+        self._order = None
+
+    def _limit(self, path: str) -> int:
+        for root, limit in self.roots.items():
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return limit
+        return MAX_DEPTH
+
+    def _drop(self, path: str):
+        """Remove a directory and everything indexed below it"""
+        stack = [path]
+        while stack:
+            d = stack.pop()
+            entry = self.dirs.pop(d, None)
+            if entry:
+                stack.extend(os.path.join(d, name) for name in entry[3])
+                self.dirty = True
+                self._order = None
+
+    def refresh(self, budget: float = TIME_BUDGET) -> bool:
+        """List new directories, then re-list changed ones, until the budget is
+        spent (None = no limit). Returns True once a full pass completed."""
+        deadline = None if budget is None else time.monotonic() + budget
+        expired = lambda: deadline is not None and time.monotonic() > deadline
+        for root in self.roots:
+            if root not in self.dirs and all(q[0] != root for q in self.queue):
+                self.queue.append((root, 0))
+        checked = 0
+        while True:
+            while self.queue:
+                if expired():
+                    return False
+                path, depth = self.queue.pop()
+                if path not in self.dirs:
+                    self._list(path, depth)
+            if self._order is None:
+                self._order = sorted(self.dirs)
+            if checked >= len(self._order):
+                return True
+            if expired():
+                return False
+            if self.cursor >= len(self._order):
+                self.cursor = 0
+            self.check(self._order[self.cursor])
+            self.cursor += 1
+            checked += 1
+
+    def check(self, path: str):
+        """Re-list one directory if its mtime moved"""
+        entry = self.dirs.get(path)
+        if entry is None:
+            return
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._drop(path)
+            return
+        if mtime != entry[0]:
+            self._list(path, entry[1])
+
+    # -- persistence ---------------------------------------------------------
+    def encode(self) -> bytes:
+        """The compact lookup file (see PathLookup)"""
+        ids, nodes = {"/": 0}, [(NO_PARENT, 0)]
+        pool, offsets = bytearray(b"\0"), {b"": 0}   # u8 length-prefixed names
+        def intern(name: bytes) -> int:
+            off = offsets.get(name)
+            if off is None:
+                off = offsets[name] = len(pool)
+                pool.append(len(name))
+                pool.extend(name)
+            return off
+        def node(path: str) -> int:
+            missing = []
+            while path not in ids:
+                missing.append(path)
+                path = os.path.dirname(path)
+            parent = ids[path]
+            for p in reversed(missing):
+                name = os.fsencode(os.path.basename(p))
+                postings.setdefault(name, [])   # every node name is in the table
+                parent = ids[p] = len(nodes)
+                nodes.append((ids[os.path.dirname(p)], intern(name)))
+            return parent
+        postings = {}
+        for path in sorted(self.dirs):
+            i = node(path)
+            for name in self.dirs[path][2]:
+                postings.setdefault(os.fsencode(name), []).append(i)
+        names, flat = [], []
+        for name in sorted(postings):
+            names.append((intern(name), len(flat), len(postings[name])))
+            flat.extend(postings[name])
+        return b"".join((LOOKUP_MAGIC, struct.pack("<III", len(nodes), len(names), len(flat)),
+                         struct.pack(f"<{2 * len(nodes)}I", *(v for n in nodes for v in n)),
+                         struct.pack(f"<{3 * len(names)}I", *(v for n in names for v in n)),
+                         struct.pack(f"<{len(flat)}I", *flat), bytes(pool)))
+
+    def save(self, path: Path = PATH_INDEX, force: bool = False):
+        """Write the builder state and the lookup file next to it"""
+        if not (self.dirty or force):
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for target, data in ((path, pickle.dumps((STATE_VERSION, self.roots, self.dirs, self.queue, self.cursor),
+                                                 protocol=pickle.HIGHEST_PROTOCOL)),
+                             (path.with_suffix(".idx"), self.encode())):
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".paths.")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, target)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path = PATH_INDEX, roots=None):
+        roots = roots if roots is not None else configured_roots()
+        index = cls(roots)
+        gc.disable()   # the cyclic GC would otherwise run many times over these containers
+        try:
+            with open(path, "rb") as fh:
+                state = pickle.load(fh)
+            if state[0] == STATE_VERSION:
+                _, saved_roots, index.dirs, index.queue, index.cursor = state
+                for root, limit in saved_roots.items():
+                    if index.roots.get(root) != limit:   # no longer indexed, or to another depth
+                        index._drop(root)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            pass
+        finally:
+            gc.enable()
+        return index
+
+###############################################################################
+# Lookups on the compact index
+###############################################################################
+LOOKUP_MAGIC = b"CTPATH1\n"
+NO_PARENT = 0xFFFFFFFF
+_HEAD = struct.Struct("<III")      # nodes, names, postings
+_NODE = struct.Struct("<II")       # parent node, name offset
+_NAME = struct.Struct("<III")      # name offset, first posting, count
+
+class PathLookup:
+    """Read-only view of paths.idx, queried in place
+
+    Layout after the magic and the three counts: the trie nodes (node 0 is
+    "/"), the basename table sorted by name bytes, the u32 postings (nodes
+    containing each name) and the name pool. Nothing is parsed up front.
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        n_nodes, self.n_names, n_post = _HEAD.unpack_from(buf, len(LOOKUP_MAGIC))
+        self.nodes = len(LOOKUP_MAGIC) + _HEAD.size
+        self.names = self.nodes + n_nodes * _NODE.size
+        self.postings = self.names + self.n_names * _NAME.size
+        self.pool = self.postings + n_post * 4
+        tree = memoryview(buf)[self.nodes:self.names].cast("I")   # parent, name pairs
+        if sys.byteorder != "little":
+            tree = array("I", tree)
+            tree.byteswap()
+        self.tree = tree
+
+    @classmethod
+    def open(cls, path: Path = PATH_LOOKUP):
+        """The lookup file mapped into memory, or None if there is none yet"""
+        try:
+            with open(path, "rb") as fh:
+                buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):   # missing or empty
+            return None
+        if buf[:len(LOOKUP_MAGIC)] != LOOKUP_MAGIC:
+            return None
+        return cls(buf)
+
+    def _name(self, off: int) -> bytes:
+        start = self.pool + off
+        return self.buf[start + 1:start + 1 + self.buf[start]]
+
+    def _node(self, i: int):
+        return self.tree[2 * i], self.tree[2 * i + 1]
+
+    def path(self, i: int) -> str:
+        parts = []
+        while i:
+            i, off = self._node(i)
+            parts.append(self._name(off))
+        return "/" + os.fsdecode(b"/".join(reversed(parts)))
+
+    def _entry(self, name: str):
+        """(pool offset, first posting, count) of `name`, or None"""
+        key = os.fsencode(name)
+        names = _NameKeys(self)
+        k = bisect.bisect_left(names, key)
+        if k == self.n_names or names[k] != key:
+            return None
+        return _NAME.unpack_from(self.buf, self.names + k * _NAME.size)
+
+    def containing(self, name: str):
+        """Nodes of the directories that contain `name`"""
+        entry = self._entry(name)
+        if entry is None:
+            return ()
+        return struct.unpack_from(f"<{entry[2]}I", self.buf, self.postings + entry[1] * 4)
+
+    def candidates(self, parts, budget: float = TIME_BUDGET):
+        """Indexed paths whose trailing components best match `parts`
+
+        Returns (matched_components, [paths]) for the best score – at most two
+        paths, enough to tell a unique match – or (0, []) when the budget runs
+        out first, since a partial answer can't be unique.
+        """
+        deadline = time.monotonic() + budget
+        # Names are interned and every node name is in the table, so parents
+        # are compared by pool offset; None matches no node
+        wanted = [(self._entry(p) or (None,))[0] for p in reversed(parts[:-1])]
+        best, found, tree = 0, [], self.tree
+        for n, node in enumerate(self.containing(parts[-1])):
+            if n % 64 == 63 and time.monotonic() > deadline:
+                return 0, []
+            score, i = 1, node
+            for part in wanted:
+                if i == 0 or tree[2 * i + 1] != part:
+                    break
+                i = tree[2 * i]
+                score += 1
+            if score > best:
+                best, found = score, [node]
+            elif score == best:
+                found.append(node)
+        return best, [os.path.join(self.path(i), parts[-1]) for i in found[:2]]
+
+    def resolve(self, path: str):
+        """A unique existing path for a missing `path`, or None"""
+        windows = WINDOWS_PATH.match(path)
+        if windows:
+            rest = [p for p in re.split(r"[\\/]+", path[3:]) if p]
+            direct = os.path.join(f"/mnt/{windows.group(1).lower()}", *rest)
+            if os.path.exists(direct):
+                return direct
+            parts, need = rest, 2
+        elif path.startswith("/mnt/"):
+            parts, need = [p for p in path.split("/")[3:] if p], 2
+        else:
+            parts = [p for p in path.split("/") if p and p != "."]
+            need = len(parts)   # the whole partial path has to match
+        if len(parts) < 2 or ".." in parts:
+            return None   # a bare name matches too many unrelated files
+        score, found = self.candidates(parts)
+        if score < min(need, len(parts)) or len(found) != 1 or not os.path.exists(found[0]):
+            return None
+        return found[0]
+
+class _NameKeys:
+    """The sorted basename table as a sequence of bytes, for bisect"""
+    def __init__(self, lookup: PathLookup):
+        self.lookup = lookup
+
+    def __len__(self):
+        return self.lookup.n_names
+
+    def __getitem__(self, k: int) -> bytes:
+        lookup = self.lookup
+        return lookup._name(_NAME.unpack_from(lookup.buf, lookup.names + k * _NAME.size)[0])
+
+###############################################################################
+# Path arguments and the fix stage
+###############################################################################
+def _path_like(text: str) -> bool:
+    if not text or text.startswith("-") or "://" in text or any(c in text for c in "*?[$`"):
+        return False
+    return "/" in text or "\\" in text or bool(LOOKS_LIKE_FILE.search(text))
+
+def _quote(path: str, raw: str) -> str:
+    if re.fullmatch(r"[\w@%+=:,./-]+", path):
+        return path
+    if raw.startswith('"'):
+        return '"' + re.sub(r'(["\\$`])', r"\\\1", path) + '"'
+    return "'" + path.replace("'", "'\\''") + "'"
+
+class PathArg(NamedTuple):
+    command: str     # basename of the command word
+    word: Word
+    text: str        # the path as meant: quotes removed, Windows form kept
+    path: Optional[str]   # absolute path, None for Windows-style paths
+    creates: bool    # the command creates it – only its directory has to exist
+
+def path_args(cmd: str, cwd: str = None):
+    """Path-like arguments of every simple command in `cmd`
+
+    `cd` segments are followed so later relative arguments are taken
+    relative to the right directory. Quoted text and the arguments of
+    text/pattern commands (echo, grep, sed ...) are skipped.
+    """
+    try:
+        parsed = parse_shell(cmd)
+    except ShellSyntaxError:
+        return
+    cwd = cwd or os.getcwd()
+    for seg in parsed.segments:
+        command = seg.command
+        if command is None:
+            continue
+        args = list(seg.args)
+        name = os.path.basename(command.value)
+        if name in TEXT_COMMANDS:
+            continue
+        if name in PATTERN_FIRST and not any(w.value in ("-e", "-f") or w.value.startswith(("--regexp", "--file"))
+                                             for w in args):
+            operands = [i for i, w in enumerate(args) if not w.value.startswith("-")]
+            if operands:
+                del args[operands[0]]   # the pattern
+        if name == "cd":
+            target = args[0].value if args else "~"
+            new_cwd = os.path.join(cwd, os.path.expanduser(target))
+            if os.path.isdir(new_cwd):
+                cwd = os.path.normpath(new_cwd)
+                continue
+            args = args[:1]
+        if name == "mkdir" and any(w.value.startswith("-") and "p" in w.value for w in args):
+            continue   # mkdir -p creates the parents too
+        creating = set()
+        if name in CREATES_ALL:
+            creating = {w.start for w in args}
+        elif name in CREATES_LAST and args:
+            creating = {args[-1].start}
+        for r in seg.redirects:
+            if "<<" in r.op or r.op.endswith("&"):
+                continue
+            args.append(r.target)
+            if ">" in r.op:
+                creating.add(r.target.start)
+        for word in args:
+            raw = word.raw
+            windows = WINDOWS_PATH.match(raw.strip("'\""))
+            if raw[:1] in "'\"" and not windows:
+                continue   # quoted text is left alone unless it is a Windows path
+            text = raw.strip("'\"") if windows else word.value
+            if not _path_like(text) or text == "/dev/null":
+                continue
+            path = None if windows else os.path.normpath(os.path.join(cwd, os.path.expanduser(text)))
+            yield PathArg(name, word, text, path, word.start in creating)
+
+def _only_reads(cmd: str) -> bool:
+    """True if every simple command in `cmd` is `cd` or in RESOLVE_COMMANDS"""
+    try:
+        parsed = parse_shell(cmd)
+    except ShellSyntaxError:
+        return False
+    return all(seg.command is not None and
+               os.path.basename(seg.command.value) in RESOLVE_COMMANDS | {"cd"}
+               for seg in parsed.segments)
+
+def fix_paths(cmd: str, cwd: str = None, index: PathLookup = None, exists=os.path.exists):
+    """Rewrite missing path arguments of RESOLVE_COMMANDS (and of `cd` in a
+    read-only line) to the unique indexed path they match
+
+    Returns (new_cmd, [(old, new), ...]). `exists` lets the caller supply
+    existence results it already has (see claudetour_preflight).
+    """
+    edits, opened = [], index is not None
+    args = list(path_args(cmd, cwd))
+    cd_ok = any(a.command == "cd" for a in args) and _only_reads(cmd)
+    for arg in args:
+        if arg.command == "cd" and not cd_ok:
+            continue
+        if arg.command not in RESOLVE_COMMANDS | {"cd"} or arg.creates:
+            continue
+        if arg.path is not None and exists(arg.path):
+            continue
+        if not opened:
+            index, opened = PathLookup.open(), True
+        if index is None:
+            break   # never built – claude-record.py builds it in the background
+        found = index.resolve(os.path.expanduser(arg.text))
+        if found:
+            edits.append((arg.word, found))
+    out = cmd
+    for word, found in sorted(edits, key=lambda e: e[0].start, reverse=True):
+        out = out[:word.start] + _quote(found, word.raw) + out[word.end:]
+    return out, [(w.raw, f) for w, f in edits]
+
+def main():
+    args = sys.argv[1:]
+    cmd = args[0] if args else ""
+    if cmd == "build":
+        PATH_INDEX.parent.mkdir(parents=True, exist_ok=True)
+        lock = open(PATH_INDEX.with_suffix(".lock"), "a")
+        try:   # sessions starting together share one build
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print("Another build is running")
+            return
+        index = PathIndex.load()
+        started = time.monotonic()
+        index.refresh(None)
+        index.save(force=True)   # also marks the lookup file as fresh
+        print(f"Indexed {len(index.dirs)} directories in {time.monotonic() - started:.1f}s "
+              f"({', '.join(index.roots)})")
+    elif cmd == "refresh":
+        index = PathIndex.load()
+        done = index.refresh()
+        index.save()
+        print(f"{len(index.dirs)} directories, {len(index.queue)} queued"
+              f"{'' if done else ' (budget spent)'}")
+    elif cmd == "find" and len(args) == 2:
+        started = time.perf_counter()
+        lookup = PathLookup.open()
+        found = lookup.resolve(os.path.expanduser(args[1])) if lookup else None
+        print(f"{found or 'no unique match'}  ({(time.perf_counter() - started) * 1000:.2f} ms)")
+    elif cmd == "stats":
+        index = PathIndex.load()
+        lookup = PathLookup.open()
+        size = lambda p: p.stat().st_size / 1024 if p.exists() else 0
+        print(f"{len(index.dirs)} directories, {lookup.n_names if lookup else 0} names, "
+              f"{len(index.queue)} queued; state {size(PATH_INDEX):.1f} KiB, "
+              f"lookup {size(PATH_LOOKUP):.1f} KiB; roots: {', '.join(index.roots)}")
+    else:
+        print(__doc__.strip())
+        sys.exit(0 if cmd in ("-h", "--help") else 1)
+
+if __name__ == "__main__":
+    main()
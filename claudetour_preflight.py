@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Preflight checks of path arguments for ClauDEtour
+
+Before a command is shown for approval, the paths it names (see
+claudetour_paths.path_args) are stat'ed concurrently on daemon threads. The
+check has a hard time budget: paths on a slow mount (/mnt/c DrvFs, network
+shares) that don't answer in time are reported as unchecked instead of
+delaying the command. Results are cached briefly in
+~/.claude_tour/stat_cache.json, so repeated commands don't stat again.
+Positive results are kept longer than negative ones, because missing files
+tend to appear soon.
+"""
+import os, json, time, tempfile, threading
+from pathlib import Path
+
+from claudetour_paths import path_args
+
+PREFLIGHT_BUDGET = float(os.getenv("CLAUDETOUR_PREFLIGHT_MS", "30")) / 1000
+STAT_CACHE       = Path(os.getenv("CLAUDETOUR_STAT_CACHE", "~/.claude_tour/stat_cache.json")).expanduser()
+POSITIVE_TTL     = 300    # seconds an existing path is trusted
+NEGATIVE_TTL     = 10     # seconds a missing path is trusted
+CACHE_ENTRIES    = 5000
+MAX_THREADS      = 8
+
+def _load_cache() -> dict:
+    try:
+        return json.loads(STAT_CACHE.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_cache(cache: dict):
+    now = time.time()
+    live = {p: v for p, v in cache.items()
+            if now - v[1] < (POSITIVE_TTL if v[0] else NEGATIVE_TTL)}
+    if len(live) > CACHE_ENTRIES:
+        live = dict(sorted(live.items(), key=lambda kv: kv[1][1])[-CACHE_ENTRIES:])
+    STAT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=STAT_CACHE.parent, prefix=".stat_cache.")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(live, fh)
+    os.replace(tmp, STAT_CACHE)
+
+def stat_paths(paths, budget: float = PREFLIGHT_BUDGET) -> dict:
+    """path -> True (exists) / False (missing) / None (no answer within budget)"""
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    now = time.time()
+    cache = _load_cache()
+    results, todo = {}, []
+    for p in paths:
+        hit = cache.get(p)
+        if hit and now - hit[1] < (POSITIVE_TTL if hit[0] else NEGATIVE_TTL):
+            results[p] = hit[0]
+        else:
+            todo.append(p)
+    if not todo:
+        return results
+
+    lock = threading.Lock()
+    finished = threading.Event()
+    answered = {}
+
+    def worker(batch):
+        for p in batch:
+            ok = os.path.exists(p)
+            with lock:
+                answered[p] = ok
+                if len(answered) == len(todo):
+                    finished.set()
+
+    # daemon threads: a stat stuck on a dead mount must not keep us alive
+    n = min(MAX_THREADS, len(todo))
+    for i in range(n):
+        threading.Thread(target=worker, args=(todo[i::n],), daemon=True).start()
+    finished.wait(budget)
+    with lock:
+        answered = dict(answered)
+
+    for p in todo:
+        results[p] = answered.get(p)
+        if p in answered:
+            cache[p] = [answered[p], now]
+    if answered:
+        try:
+            _save_cache(cache)
+        except OSError:
+            pass
+    return results
+
+def preflight(cmd: str, cwd: str = None, budget: float = PREFLIGHT_BUDGET) -> dict:
+    """Check the path arguments of `cmd`
+
+    Returns {"missing": [...], "unchecked": [...], "status": {path: bool|None}}.
+    For arguments the command creates, only the directory has to exist.
+    Windows-style paths always count as missing: bash can't use them.
+    """
+    targets, missing, unchecked = [], [], []
+    for arg in path_args(cmd, cwd):
+        if arg.path is None:
+            missing.append(arg.text)
+        elif arg.creates:
+            targets.append((os.path.dirname(arg.path), (os.path.dirname(arg.text) or ".") + "/"))
+        else:
+            targets.append((arg.path, arg.text))
+    status = stat_paths([path for path, _ in targets], budget)
+    for path, text in targets:
+        if status[path] is False:
+            missing.append(text)
+        elif status[path] is None:
+            unchecked.append(text)
+    return {"missing": list(dict.fromkeys(missing)),
+            "unchecked": list(dict.fromkeys(unchecked)), "status": status}
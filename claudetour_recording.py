@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Indexed session recordings for ClauDEtour
+
+A recording (<session>.rec) is an asciicast-v2 style event stream
+([t, "o", data], [t, "r", "COLSxROWS"], ...) split into zlib-compressed
+chunks. Each chunk also carries the ANSI-cleaned text of its output, so
+readers never have to re-clean the raw terminal stream.
+
+File layout (all integers little-endian):
+    MAGIC
+    HEAD  u32 len  JSON header (asciicast v2 header + session_id)
+    CHNK  u32 len  <ddIII t0 t1 events n_events_z n_clean_z> events_z clean_z
+    ...
+    INDX  u32 len  JSON {"prev": offset|-1, "chunks": [[offset, t0, t1, n], ...]}
+    ...
+    TRLR  u32 8    i64 offset of the last INDX
+
+An index block is written every INDEX_EVERY chunks, and a trailer on close.
+A recording cut short by a crash still reads fine; the reader then walks the
+block headers instead of following the index chain.
+"""
+import io, os, re, json, time, zlib, struct, codecs
+from bisect import bisect_right
+from pathlib import Path
+
+MAGIC       = b"CTREC1\n"
+CHUNK_BYTES = 64 * 1024    # flush a chunk after this much output ...
+CHUNK_SEC   = 5.0          # ... or after this many seconds
+INDEX_EVERY = 16           # chunks between index blocks
+
+_BLOCK = struct.Struct("<4sI")
+_CHUNK = struct.Struct("<ddIII")
+_TRAILER = struct.Struct("<q")
+
+def clean_ansi(text):
+    """Remove ANSI escape sequences and clean up control characters"""
+
+    # Remove various ANSI escape sequences
+    patterns = [
+        r'\x1b\[[0-9;]*[mGKHF]',  # Color and cursor movement
+        r'\x1b\[[0-9;]*[A-Za-z]',  # Other escape sequences
+        r'\x1b\]0;[^\x07]*\x07',   # Terminal title
+        r'\x1b[>=]',               # Terminal mode
+        r'\x1b\[\?[0-9;]*[hl]',    # Terminal settings
+        r'\x1b\[[0-9;]*J',         # Clear screen
+        r'\x1b\[[0-9;]*K',         # Clear line
+        r'\x08+',                  # Backspaces
+    ]
+
+    for pattern in patterns:
+        text = re.sub(pattern, '', text)
+
+    # Handle carriage returns (often used for progress bars)
+    # Terminal line endings are \r\n; those are not rewrites, so fold them first.
+    # Split by \n, then for each line, only keep the last \r-delimited part
+    text = text.replace('\r\n', '\n')
+    lines = text.split('\n')
+    cleaned_lines = []
+
+    for line in lines:
+        if '\r' in line:
+            # Keep only the last segment after \r (final state of the line)
+            parts = line.split('\r')
+            line = parts[-1]
+        cleaned_lines.append(line)
+
+    text = '\n'.join(cleaned_lines)
+
+    # Remove null bytes and other control chars (except newline and tab)
+    text = ''.join(char for char in text
+                   if ord(char) >= 32 or char in '\n\t')
+
+    return text
+
+class IncrementalCleaner:
+    """Feed raw terminal text, get back cleaned *complete* lines
+
+    Only whole lines are cleaned, so escape sequences and \\r rewrites never
+    straddle two calls.
+    """
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, text: str) -> str:
+        self.pending += text
+        cut = self.pending.rfind("\n")
+        if cut < 0:
+            return ""
+        done, self.pending = self.pending[:cut + 1], self.pending[cut + 1:]
+        return clean_ansi(done)
+
+    def flush(self) -> str:
+        done, self.pending = self.pending, ""
+        return clean_ansi(done)
+
+class RecordingWriter:
+    def __init__(self, path, header: dict):
+        self.path = Path(path)
+        self.fh = open(self.path, "wb")
+        self.fh.write(MAGIC)
+        self._block(b"HEAD", json.dumps(header, ensure_ascii=False).encode())
+        self.start = time.monotonic()
+        self.decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.cleaner = IncrementalCleaner()
+        self.events = []
+        self.clean = []
+        self.size = 0
+        self.t0 = None
+        self.unindexed = []     # chunks written since the last index block
+        self.last_index = -1
+        self.n_chunks = 0
+        self.n_events = 0
+
+    def _block(self, tag: bytes, payload: bytes) -> int:
+        offset = self.fh.tell()
+        self.fh.write(_BLOCK.pack(tag, len(payload)))
+        self.fh.write(payload)
+        return offset
+
+    def now(self) -> float:
+        return round(time.monotonic() - self.start, 6)
+
+    def event(self, kind: str, data: str, t: float = None):
+        t = self.now() if t is None else t
+        if self.t0 is None:
+            self.t0 = t
+        self.events.append(json.dumps([t, kind, data], ensure_ascii=False))
+        self.size += len(data)
+        if kind == "o":
+            self.clean.append(self.cleaner.feed(data))
+        if self.size >= CHUNK_BYTES or t - self.t0 >= CHUNK_SEC:
+            self.flush_chunk(t)
+
+    def output(self, data: bytes):
+        """Record raw bytes written to the terminal"""
+        text = self.decoder.decode(data)
+        if text:
+            self.event("o", text)
+
+    def flush_chunk(self, t1: float = None):
+        if not self.events:
+            return
+        t1 = self.now() if t1 is None else t1
+        events_z = zlib.compress("\n".join(self.events).encode(), 6)
+        clean_z = zlib.compress("".join(self.clean).encode(), 6)
+        meta = _CHUNK.pack(self.t0, t1, len(self.events), len(events_z), len(clean_z))
+        offset = self._block(b"CHNK", meta + events_z + clean_z)
+        self.unindexed.append([offset, self.t0, t1, len(self.events)])
+        self.n_chunks += 1
+        self.n_events += len(self.events)
+        self.events, self.clean, self.size, self.t0 = [], [], 0, None
+        if len(self.unindexed) >= INDEX_EVERY:
+            self.flush_index()
+        self.fh.flush()
+
+    def flush_index(self):
+        if not self.unindexed:
+            return
+        payload = json.dumps({"prev": self.last_index, "chunks": self.unindexed})
+        self.last_index = self._block(b"INDX", payload.encode())
+        self.unindexed = []
+
+    def close(self):
+        tail = self.decoder.decode(b"", final=True)
+        if tail:
+            self.event("o", tail)
+        rest = self.cleaner.flush()
+        if rest:
+            self.clean.append(rest)
+            if not self.events:     # keep the cleaned tail even with no new event
+                self.events.append(json.dumps([self.now(), "m", ""]))
+                self.t0 = self.now()
+        self.flush_chunk()
+        self.flush_index()
+        self._block(b"TRLR", _TRAILER.pack(self.last_index))
+        self.fh.close()
+
+class RecordingReader:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fh = open(self.path, "rb")
+        if self.fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a ClauDEtour recording")
+        tag, length = _BLOCK.unpack(self.fh.read(_BLOCK.size))
+        self.header = json.loads(self.fh.read(length))
+        self.chunks = self._load_index() or self._scan()
+        self._starts = [c[1] for c in self.chunks]
+
+    def _load_index(self):
+        size = self.fh.seek(0, io.SEEK_END)
+        tail = _BLOCK.size + _TRAILER.size
+        if size < tail:
+            return None
+        self.fh.seek(size - tail)
+        tag, _ = _BLOCK.unpack(self.fh.read(_BLOCK.size))
+        if tag != b"TRLR":
+            return None
+        offset, = _TRAILER.unpack(self.fh.read(_TRAILER.size))
+        groups = []
+        while offset >= 0:
+            self.fh.seek(offset)
+            tag, length = _BLOCK.unpack(self.fh.read(_BLOCK.size))
+            index = json.loads(self.fh.read(length))
+            groups.append(index["chunks"])
+            offset = index["prev"]
+        return [c for group in reversed(groups) for c in group]
+
+    def _scan(self):
+        """Walk block headers (no decompression) – used when the trailer is missing"""
+        chunks = []
+        eof = self.fh.seek(0, io.SEEK_END)
+        offset = len(MAGIC)
+        while offset + _BLOCK.size <= eof:
+            self.fh.seek(offset)
+            tag, length = _BLOCK.unpack(self.fh.read(_BLOCK.size))
+            if offset + _BLOCK.size + length > eof:
+                break   # block cut short by a crash
+            if tag == b"CHNK":
+                t0, t1, n, _, _ = _CHUNK.unpack(self.fh.read(_CHUNK.size))
+                chunks.append([offset, t0, t1, n])
+            offset += _BLOCK.size + length
+        return chunks
+
+    def _read_chunk(self, entry):
+        self.fh.seek(entry[0] + _BLOCK.size)
+        t0, t1, n, events_len, clean_len = _CHUNK.unpack(self.fh.read(_CHUNK.size))
+        events_z = self.fh.read(events_len)
+        clean_z = self.fh.read(clean_len)
+        return events_z, clean_z
+
+    def _select(self, start=None, end=None):
+        lo = 0 if start is None else max(bisect_right(self._starts, start) - 1, 0)
+        for entry in self.chunks[lo:]:
+            if end is not None and entry[1] > end:
+                break
+            if start is not None and entry[2] < start:
+                continue
+            yield entry
+
+    @property
+    def duration(self) -> float:
+        return self.chunks[-1][2] if self.chunks else 0.0
+
+    def events(self, start: float = None, end: float = None):
+        """Yield [t, kind, data] events, decompressing only the chunks needed"""
+        for entry in self._select(start, end):
+            events_z, _ = self._read_chunk(entry)
+            for line in zlib.decompress(events_z).decode().split("\n"):
+                event = json.loads(line)
+                if (start is None or event[0] >= start) and (end is None or event[0] <= end):
+                    yield event
+
+    def clean_text(self, start: float = None, end: float = None) -> str:
+        """Cleaned output of the chunks overlapping [start, end] seconds"""
+        return "".join(zlib.decompress(self._read_chunk(e)[1]).decode()
+                       for e in self._select(start, end))
+
+    def close(self):
+        self.fh.close()
+
+def is_recording(path) -> bool:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
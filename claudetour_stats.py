@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Small streaming statistics for ClauDEtour
+
+Fixed-bucket histograms: O(log buckets) to record a value, percentile
+estimates from the buckets, mergeable and cheap to serialise.
+RollingHistogram keeps one over a sliding window of recent values.
+"""
+from bisect import bisect_left
+from collections import deque
+
+# Coarse 1-2-5 buckets (milliseconds) – used for Prometheus `le` labels
+DURATION_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000,
+                      10000, 30000, 60000, 120000, 300000, 600000)
+
+# Fine buckets, factor 2**(1/4) apart (~9% error), 1 ms .. ~4.6 h – for percentiles
+FINE_BOUNDS_MS = tuple(round(2 ** (i / 4), 3) for i in range(4 * 24))
+
+class Histogram:
+    def __init__(self, bounds=DURATION_BOUNDS_MS, counts=None, total=0.0):
+        self.bounds = tuple(bounds)
+        self.counts = list(counts) if counts else [0] * (len(self.bounds) + 1)
+        self.sum = total
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value, n: int = 1):
+        self.counts[bisect_left(self.bounds, value)] += n
+        self.sum += value * n
+
+    def remove(self, value):
+        self.observe(value, -1)
+
+    def quantile(self, q: float):
+        """Estimate the q-quantile by interpolating inside its bucket"""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c > 0 and seen + c >= rank:
+                lo = self.bounds[i - 1] if i > 0 else 0
+                hi = self.bounds[i] if i < len(self.bounds) else self.bounds[-1] * 2
+                return lo + (hi - lo) * max(rank - seen, 0) / c
+            seen += c
+        return self.bounds[-1]
+
+    def merge(self, other: "Histogram"):
+        if other.bounds != self.bounds:
+            raise ValueError("cannot merge histograms with different bounds")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+
+    def cumulative(self):
+        """(upper_bound, cumulative_count) pairs, '+Inf' last – Prometheus style"""
+        out, running = [], 0
+        for bound, c in zip(self.bounds + ("+Inf",), self.counts):
+            running += c
+            out.append((bound, running))
+        return out
+
+    def to_dict(self) -> dict:
+        return {"bounds": list(self.bounds), "counts": self.counts, "sum": self.sum}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Histogram":
+        return cls(d["bounds"], d["counts"], d.get("sum", 0.0))
+
+class RollingHistogram:
+    """Histogram over the last `size` values – O(1) amortised per update"""
+    def __init__(self, size: int = 500, bounds=FINE_BOUNDS_MS):
+        self.window = deque()
+        self.size = size
+        self.hist = Histogram(bounds)
+
+    def observe(self, value):
+        if len(self.window) >= self.size:
+            self.hist.remove(self.window.popleft())
+        self.window.append(value)
+        self.hist.observe(value)
+
+    def quantile(self, q: float):
+        return self.hist.quantile(q)
@@ -2,48 +2,15 @@
 """
 Clean ANSI escape sequences from script transcript files
 Can be used standalone or integrated into the wrapper
+
+Recordings made by claude-record.py (.rec) already hold cleaned text per
+chunk, so they are read directly – optionally only a time window of them.
 """
 import sys
 import re
 from pathlib import Path
 
-def clean_ansi(text):
-    """Remove ANSI escape sequences and clean up control characters"""
-    
-    # Remove various ANSI escape sequences
-    patterns = [
-        r'\x1b\[[0-9;]*[mGKHF]',  # Color and cursor movement
-        r'\x1b\[[0-9;]*[A-Za-z]',  # Other escape sequences
-        r'\x1b\]0;[^\x07]*\x07',   # Terminal title
-        r'\x1b[>=]',               # Terminal mode
-        r'\x1b\[\?[0-9;]*[hl]',    # Terminal settings
-        r'\x1b\[[0-9;]*J',         # Clear screen
-        r'\x1b\[[0-9;]*K',         # Clear line
-        r'\x08+',                  # Backspaces
-    ]
-    
-    for pattern in patterns:
-        text = re.sub(pattern, '', text)
-    
-    # Handle carriage returns (often used for progress bars)
-    # Split by \n, then for each line, only keep the last \r-delimited part
-    lines = text.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        if '\r' in line:
-            # Keep only the last segment after \r (final state of the line)
-            parts = line.split('\r')
-            line = parts[-1]
-        cleaned_lines.append(line)
-    
-    text = '\n'.join(cleaned_lines)
-    
-    # Remove null bytes and other control chars (except newline and tab)
-    text = ''.join(char for char in text 
-                   if ord(char) >= 32 or char in '\n\t')
-    
-    return text
+from claudetour_recording import RecordingReader, clean_ansi, is_recording
 
 def extract_claude_session(text):
     """Extract key Claude session information"""
@@ -76,7 +43,7 @@ def extract_claude_session(text):
         'clean_text': text
     }
 
-def process_transcript(input_file, output_file=None):
+def process_transcript(input_file, output_file=None, start=None, end=None):
     """Process a transcript file"""
     
     input_path = Path(input_file)
@@ -84,19 +51,25 @@ def process_transcript(input_file, output_file=None):
         print(f"Error: {input_file} not found")
         return
     
-    # Read the raw transcript
-    with open(input_path, 'rb') as f:
-        raw_content = f.read()
-    
-    # Try to decode with error handling
-    try:
-        text = raw_content.decode('utf-8')
-    except UnicodeDecodeError:
-        # Fallback to latin-1 which accepts all bytes
-        text = raw_content.decode('latin-1')
-    
-    # Clean the text
-    cleaned = clean_ansi(text)
+    if is_recording(input_path):
+        # Cleaned when recorded – just read the chunks in the window
+        reader = RecordingReader(input_path)
+        cleaned = reader.clean_text(start, end)
+        reader.close()
+    else:
+        # Read the raw transcript
+        with open(input_path, 'rb') as f:
+            raw_content = f.read()
+        
+        # Try to decode with error handling
+        try:
+            text = raw_content.decode('utf-8')
+        except UnicodeDecodeError:
+            # Fallback to latin-1 which accepts all bytes
+            text = raw_content.decode('latin-1')
+        
+        # Clean the text
+        cleaned = clean_ansi(text)
     
     # Extract session info
     session_info = extract_claude_session(cleaned)
@@ -128,16 +101,28 @@ def process_transcript(input_file, output_file=None):
             print(f"  - {event}")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: clean-transcript.py <transcript_file> [output_file]")
+    args = sys.argv[1:]
+    start = end = None
+    if "--from" in args:
+        i = args.index("--from")
+        start = float(args[i + 1])
+        del args[i:i + 2]
+    if "--to" in args:
+        i = args.index("--to")
+        end = float(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) < 1:
+        print("Usage: clean-transcript.py <transcript_file|recording.rec> [output_file] [--from SEC] [--to SEC]")
         print("\nThis tool removes ANSI escape sequences from script transcripts")
         print("If output_file is not specified, creates .clean.log version")
+        print("--from/--to select a time window (seconds) of a .rec recording")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    input_file = args[0]
+    output_file = args[1] if len(args) > 1 else None
     
-    process_transcript(input_file, output_file)
+    process_transcript(input_file, output_file, start, end)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Convert ClauDEtour logs between JSONL and the compact binary encoding
+
+The input is a log file of either format, a ~/.claude_tour directory (live
+log plus rotated segments, in order) or `-` for stdin. Without --to the
+output is the other format than that of the (first) input file; stdin
+defaults to JSONL output, so binary logs can be piped into any tool.
+
+Usage:
+    convert-log.py [--to jsonl|binary] INPUT [-o OUTPUT]
+
+Examples:
+    convert-log.py ~/.claude_tour/log.ctlog | ./analyze-session.py --log - SESSION_ID
+    convert-log.py ~/.claude_tour/log.jsonl -o ~/.claude_tour/log.ctlog
+"""
+import sys
+import json
+from pathlib import Path
+
+from claudetour_binlog import MAGIC, Writer, is_binlog
+from claudetour_logs import iter_files, iter_stdin, source_files
+
+def main():
+    args = sys.argv[1:]
+    output = target = None
+    if "-o" in args:
+        i = args.index("-o")
+        if i + 1 == len(args):
+            print("-o needs an argument", file=sys.stderr)
+            sys.exit(2)
+        output = args[i + 1]
+        del args[i:i + 2]
+    if "--to" in args:
+        i = args.index("--to")
+        if i + 1 == len(args):
+            print("--to needs an argument: jsonl or binary", file=sys.stderr)
+            sys.exit(2)
+        target = args[i + 1]
+        del args[i:i + 2]
+    if len(args) != 1 or args[0] in ("-h", "--help") or target not in (None, "jsonl", "binary"):
+        print(__doc__.strip())
+        sys.exit(0 if args[:1] in (["-h"], ["--help"]) else 1)
+
+    if args[0] == "-":
+        records = iter_stdin()
+        target = target or "jsonl"
+    else:
+        files = source_files(args[0])
+        if not files or not files[0].exists():
+            sys.exit(f"No log at {args[0]}")
+        if output and any(f.resolve() == Path(output).expanduser().resolve() for f in files):
+            sys.exit("OUTPUT must not be one of the input files")
+        if target is None:
+            with open(files[0], "rb") as fh:
+                target = "jsonl" if is_binlog(fh.read(len(MAGIC))) else "binary"
+        records = iter_files(files)
+
+    if target == "binary":
+        if output is None and sys.stdout.isatty():
+            sys.exit("Refusing to write a binary log to the terminal; use -o OUTPUT")
+        out = open(output, "wb") if output else sys.stdout.buffer
+        writer = Writer(out)
+        write = writer.write
+    else:
+        out = open(output, "w", encoding="utf-8") if output else sys.stdout
+        write = lambda record: out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    count = 0
+    try:
+        for record in records:
+            write(record)
+            count += 1
+        out.flush()
+    except BrokenPipeError:
+        sys.exit(0)
+    finally:
+        if output:
+            out.close()
+    print(f"Converted {count} records to {target}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Export ClauDEtour decisions as columnar training data
+
+Joins each decision with its execution record (and the feedback stored on
+the decision) and writes NumPy .npz parts to ~/.claude_tour/training/.
+Every run reads only the log records added since the last one and writes
+one new part; decisions still waiting for their execution are kept in the
+export state until it arrives (or PENDING_SEC later).
+
+Columns, one row per decision:
+    decision_id, session_id, orig, corr, feedback      unicode strings
+    ts                                                 datetime64[us] (UTC)
+    mode                                               int8 code into mode_names
+    passthru, has_execution, timed_out                 bool
+    returncode, duration_ms, cpu_ms, max_rss_kb        int32/float32 (-1 / NaN if none)
+    orig_tokens, corr_tokens + *_offsets               hashed lexer tokens, CSR layout
+    fixes + fix_offsets                                codes into fix_names, CSR layout
+
+Tokens are the command words, flags, operators and argument shapes from
+claudetour_lexer, hashed with CRC32 into 2**HASH_BITS buckets, so ids are
+stable across runs and machines.
+
+Usage:
+    export-training.py [update]      # export new records (default)
+    export-training.py rebuild       # start over from the logs on disk
+    export-training.py info          # rows / columns of the exported parts
+"""
+import os, re, sys, json, zlib, tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from claudetour import log_segments
+from claudetour_blobs import inflate_record
+from claudetour_lexer import ShellSyntaxError, parse as parse_shell
+from claudetour_logs import read_incremental
+
+EXPORT_DIR  = Path(os.getenv("CLAUDETOUR_TRAINING", "~/.claude_tour/training")).expanduser()
+HASH_BITS   = 18
+PENDING_SEC = 86400   # export a decision without execution after this long
+BATCH_ROWS  = 50_000  # rows per .npz part at most
+
+# Mode codes; append only ("cache_hit" comes from the output cache). Parts
+# carry their own mode_names, so load_parts can remap older orders.
+MODES = ("passthru", "accepted", "edited", "rejected", "unknown", "cache_hit")
+
+def require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        sys.exit("export-training.py needs NumPy: pip install numpy")
+    return numpy
+
+###############################################################################
+# State
+###############################################################################
+def empty_state():
+    return {"version": 1, "files": {}, "pending": {}, "fix_names": [], "next_part": 0}
+
+def load_state():
+    try:
+        return json.loads((EXPORT_DIR / "state.json").read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return empty_state()
+
+def save_state(state):
+    fd, tmp = tempfile.mkstemp(dir=EXPORT_DIR, prefix=".state.")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, EXPORT_DIR / "state.json")
+
+###############################################################################
+# Join
+###############################################################################
+def _epoch(ts: str) -> float:
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+def join_records(records, pending: dict):
+    """Yield (decision, execution|None) rows; unmatched decisions stay in `pending`"""
+    newest = 0.0
+    for entry in records:
+        if entry.get("debug"):
+            continue
+        kind = entry.get("type")
+        if kind == "decision" and entry.get("id"):
+            entry = inflate_record(entry)
+            pending[entry["id"]] = {k: entry.get(k) for k in
+                                    ("id", "session_id", "ts", "orig", "corr", "mode",
+                                     "passthru", "fixes", "feedback")}
+            newest = max(newest, _epoch(entry.get("ts")))
+            if entry.get("mode") == "cache_hit":   # answered from the cache, no execution follows
+                yield pending.pop(entry["id"]), None
+        elif kind == "execution":
+            decision = pending.pop(entry.get("decision_id"), None)
+            if decision is not None:
+                # a rejection logs a stub execution; nothing actually ran
+                yield decision, None if entry.get("status") == "rejected" else entry
+            newest = max(newest, _epoch(entry.get("ts")))
+    for did in [d for d, rec in pending.items() if newest - _epoch(rec.get("ts")) > PENDING_SEC]:
+        yield pending.pop(did), None
+
+###############################################################################
+# Featurisation
+###############################################################################
+_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+_ISO = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{1,6})?)(?:Z|[+-]00:00)?$")
+_EPOCH = "1970-01-01T00:00:00"
+
+def utc_iso(ts) -> str:
+    """Naive UTC ISO form of a record timestamp, as datetime64 parses it"""
+    m = _ISO.match(ts or "")
+    if m:
+        return m.group(1)   # our own "...Z" form: no parsing needed
+    try:
+        parsed = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return _EPOCH
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+def command_tokens(cmd: str):
+    """Lexer tokens: command words, flags, operators and argument shapes"""
+    if not isinstance(cmd, str) or not cmd:
+        return []
+    try:
+        parsed = parse_shell(cmd)
+    except ShellSyntaxError:
+        return ["<unparsed>"] + cmd.split()[:1]
+    tokens = []
+    for seg in parsed.segments:
+        command = seg.command
+        if command is not None:
+            tokens.append("cmd:" + os.path.basename(command.value))
+        for word in seg.args:
+            value = word.value
+            if value.startswith("-"):
+                tokens.append("flag:" + value.split("=", 1)[0])
+            elif "/" in value:
+                tokens.append("arg:path" + (":abs" if value.startswith("/") else ""))
+                tokens.append("ext:" + os.path.splitext(value)[1])
+            elif _NUMBER.match(value):
+                tokens.append("arg:num")
+            else:
+                tokens.append("arg:" + value.lower()[:32])
+        for redirect in seg.redirects:
+            tokens.append("redir:" + redirect.op)
+        if seg.op:
+            tokens.append("op:" + seg.op)
+    if parsed.heredocs:
+        tokens.append("heredoc")
+    return tokens
+
+def _hashed_csr(np, token_lists):
+    """Flatten token lists and hash them; each distinct token is hashed once"""
+    lengths = np.fromiter((len(t) for t in token_lists), dtype=np.int64, count=len(token_lists))
+    offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if not offsets[-1]:
+        return np.zeros(0, dtype=np.uint32), offsets
+    flat = np.array([t for tokens in token_lists for t in tokens], dtype=str)
+    uniques, inverse = np.unique(flat, return_inverse=True)
+    mask = (1 << HASH_BITS) - 1
+    codes = np.fromiter((zlib.crc32(u.encode()) & mask for u in uniques),
+                        dtype=np.uint32, count=len(uniques))
+    return codes[inverse], offsets
+
+def featurize(np, rows, state) -> dict:
+    """Turn joined (decision, execution) rows into column arrays in one batch"""
+    fix_names = state["fix_names"]
+    for d, _ in rows:
+        for fix in d.get("fixes") or []:
+            if fix not in fix_names:
+                fix_names.append(fix)
+    fix_code = {name: i for i, name in enumerate(fix_names)}
+
+    decisions = [d for d, _ in rows]
+    executions = [e or {} for _, e in rows]
+
+    def strings(values):
+        return np.array([v if isinstance(v, str) else "" for v in values], dtype=str)
+
+    cols = {
+        "decision_id": strings(d.get("id") for d in decisions),
+        "session_id": strings(d.get("session_id") for d in decisions),
+        "orig": strings(d.get("orig") for d in decisions),
+        "corr": strings(d.get("corr") for d in decisions),
+        "feedback": strings(d.get("feedback") for d in decisions),
+        "passthru": np.array([bool(d.get("passthru")) for d in decisions], dtype=bool),
+        "has_execution": np.array([bool(e) for e in executions], dtype=bool),
+        "timed_out": np.array([bool(e.get("timed_out")) for e in executions], dtype=bool),
+    }
+    # ISO timestamps parse in one go once the zone suffix is dropped
+    cols["ts"] = np.array([utc_iso(d.get("ts")) for d in decisions], dtype="datetime64[us]")
+    names = np.array(MODES)
+    modes = strings(d.get("mode") or ("passthru" if d.get("passthru") else "unknown") for d in decisions)
+    order = np.argsort(names)
+    pos = np.searchsorted(names, modes, sorter=order)
+    pos = order[np.clip(pos, 0, len(names) - 1)]
+    cols["mode"] = np.where(names[pos] == modes, pos, MODES.index("unknown")).astype(np.int8)
+
+    def numbers(key, dtype, missing):
+        return np.array([missing if e.get(key) is None else e[key] for e in executions], dtype=dtype)
+    cols["returncode"] = numbers("returncode", np.int32, -1)
+    cols["duration_ms"] = numbers("duration_ms", np.float32, np.nan)
+    cols["cpu_ms"] = numbers("cpu_user_ms", np.float32, np.nan) + numbers("cpu_sys_ms", np.float32, np.nan)
+    cols["max_rss_kb"] = numbers("max_rss_kb", np.float32, np.nan)
+
+    cols["orig_tokens"], cols["orig_offsets"] = _hashed_csr(np, [command_tokens(d.get("orig")) for d in decisions])
+    cols["corr_tokens"], cols["corr_offsets"] = _hashed_csr(np, [command_tokens(d.get("corr")) for d in decisions])
+    fixes = [[fix_code[f] for f in d.get("fixes") or []] for d in decisions]
+    cols["fix_offsets"] = np.zeros(len(fixes) + 1, dtype=np.int64)
+    np.cumsum([len(f) for f in fixes], out=cols["fix_offsets"][1:])
+    cols["fixes"] = np.array([f for fs in fixes for f in fs], dtype=np.int16)
+
+    cols["mode_names"] = names
+    cols["fix_names"] = np.array(fix_names or [""], dtype=str)
+    cols["hash_bits"] = np.array(HASH_BITS)
+    return cols
+
+###############################################################################
+# Export
+###############################################################################
+def write_part(np, cols, state) -> Path:
+    path = EXPORT_DIR / f"part-{state['next_part']:05d}.npz"
+    fd, tmp = tempfile.mkstemp(dir=EXPORT_DIR, prefix=".part.", suffix=".npz")
+    with os.fdopen(fd, "wb") as fh:
+        np.savez_compressed(fh, **cols)
+    os.replace(tmp, path)
+    state["next_part"] += 1
+    return path
+
+def update(state) -> int:
+    np = require_numpy()
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    exported = 0
+    rows = []
+    for row in join_records(read_incremental(log_segments(), state["files"]), state["pending"]):
+        rows.append(row)
+        if len(rows) >= BATCH_ROWS:
+            write_part(np, featurize(np, rows, state), state)
+            exported += len(rows)
+            rows = []
+    if rows:
+        write_part(np, featurize(np, rows, state), state)
+        exported += len(rows)
+    save_state(state)
+    return exported
+
+def load_parts(directory: Path = EXPORT_DIR) -> dict:
+    """Concatenate all parts into one set of columns (CSR offsets rebased)"""
+    np = require_numpy()
+    parts = [np.load(p) for p in sorted(directory.glob("part-*.npz"))]
+    if not parts:
+        return {}
+    out = {}
+    mode_names = list(MODES)
+    for p in parts:
+        mode_names += [n for n in p["mode_names"].tolist() if n not in mode_names]
+    for key in parts[0].files:
+        if key == "mode":
+            out[key] = np.concatenate([
+                np.array([mode_names.index(n) for n in p["mode_names"].tolist()], dtype=np.int8)[p[key]]
+                for p in parts])
+        elif key == "mode_names":
+            out[key] = np.array(mode_names)
+        elif key in ("fix_names", "hash_bits"):
+            out[key] = parts[-1][key]   # vocabularies only ever grow
+        elif key.endswith("_offsets"):
+            chunks, base = [np.zeros(1, dtype=np.int64)], 0
+            for p in parts:
+                chunks.append(p[key][1:] + base)
+                base += p[key][-1]
+            out[key] = np.concatenate(chunks)
+        else:
+            out[key] = np.concatenate([p[key] for p in parts])
+    return out
+
+def main():
+    args = sys.argv[1:]
+    cmd = args[0] if args else "update"
+    if cmd == "update":
+        state = load_state()
+        print(f"Exported {update(state)} rows ({len(state['pending'])} decisions pending) to {EXPORT_DIR}")
+    elif cmd == "rebuild":
+        for part in EXPORT_DIR.glob("part-*.npz"):
+            part.unlink()
+        state = empty_state()
+        print(f"Exported {update(state)} rows ({len(state['pending'])} decisions pending) to {EXPORT_DIR}")
+    elif cmd == "info":
+        cols = load_parts()
+        if not cols:
+            print(f"No parts in {EXPORT_DIR} yet")
+            return
+        print(f"{len(cols['decision_id'])} rows")
+        for key, value in cols.items():
+            print(f"  {key:<14} {str(value.dtype):<14} {value.shape}")
+    else:
+        print(__doc__.strip())
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Merge ClauDEtour logs from several machines into one time-ordered stream
+
+Each source is a log file, a copied ~/.claude_tour directory (log.jsonl plus
+rotated segments) or `-` for stdin, optionally labelled HOST=PATH. Sources
+are merged by `ts` in a streaming k-way merge with constant memory (each
+source is re-sorted through a small window first, since decisions are
+written after the approval wait), records are de-duplicated by session and
+`id` and tagged with a `host` field.
+
+Usage:
+    merge-logs.py [HOST=]PATH ... [-o OUTPUT]
+
+Examples:
+    merge-logs.py box1=~/wsl1/.claude_tour box2=~/wsl2/log.jsonl -o merged.jsonl
+    merge-logs.py box1=a.jsonl box2=b.jsonl | ./analyze-session.py --log - SESSION_ID
+"""
+import sys
+import json
+
+from claudetour_logs import merge_sources
+
+def main():
+    args = sys.argv[1:]
+    output = None
+    if "-o" in args:
+        i = args.index("-o")
+        if i + 1 == len(args):
+            print("-o needs an argument", file=sys.stderr)
+            sys.exit(2)
+        output = args[i + 1]
+        del args[i:i + 2]
+    if not args or args[0] in ("-h", "--help"):
+        print(__doc__.strip())
+        sys.exit(0 if args else 1)
+
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    count = 0
+    try:
+        for record in merge_sources(args):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    except BrokenPipeError:
+        sys.exit(0)
+    finally:
+        if output:
+            out.close()
+    print(f"Merged {count} records from {len(args)} sources", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Daily rollups of ClauDEtour logs for long-horizon trends
+
+Folds new log records into ~/.claude_tour/rollups.json: per-day counts by
+mode, fix frequency, errors, duration sums and duration histograms, plus
+per-rule totals. Sessions are tracked while active; once a session has
+been idle for SESSION_IDLE_DAYS it is folded into the "closed_sessions"
+totals of the day it started and dropped, so the store stays O(days).
+Only records appended since the last run are read, so trend reports cost
+O(days), and rotated segments can be deleted afterwards without losing
+history.
+
+Usage:
+    rollup-logs.py [update]            # fold in new records (default)
+    rollup-logs.py report [--days N]   # daily trend table, last N days (30)
+    rollup-logs.py rebuild             # start over from the logs still on disk
+"""
+import os
+import sys
+import json
+import tempfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from claudetour import log_segments
+from claudetour_logs import read_incremental
+from claudetour_stats import FINE_BOUNDS_MS, Histogram
+
+ROLLUP_PATH = Path(os.getenv("CLAUDETOUR_ROLLUPS", "~/.claude_tour/rollups.json")).expanduser()
+# A session with no record for this long (before the newest one) is closed;
+# a later record with its id counts as a new session
+SESSION_IDLE_DAYS = float(os.getenv("CLAUDETOUR_ROLLUP_SESSION_DAYS", "7"))
+
+SESSION_COUNTERS = ("decisions", "corrections", "rejections", "executions", "errors", "duration_ms")
+
+def empty_state():
+    return {"version": 1, "files": {}, "days": {}, "rules": {}, "sessions": {}}
+
+def load_state():
+    """Load the store; duration histograms come back as Histogram objects"""
+    try:
+        state = json.loads(ROLLUP_PATH.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return empty_state()
+    for day in state["days"].values():
+        day["durations"] = Histogram.from_dict(day["durations"])
+    return state
+
+def save_state(state):
+    ROLLUP_PATH.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ROLLUP_PATH.parent, prefix=".rollups.")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(state, fh, ensure_ascii=False, separators=(",", ":"),
+                  default=lambda h: h.to_dict())
+    os.replace(tmp, ROLLUP_PATH)
+
+def new_day():
+    return {"decisions": 0, "modes": {}, "passthru": 0, "corrections": 0,
+            "rejections": 0, "fixes": {}, "executions": 0, "errors": 0,
+            "duration_ms": 0, "durations": Histogram(FINE_BOUNDS_MS),
+            "sessions": 0, "closed_sessions": new_session_totals()}
+
+def new_session(ts):
+    return {"first": ts, "last": ts, **dict.fromkeys(SESSION_COUNTERS, 0)}
+
+def new_session_totals():
+    return {"count": 0, "seconds": 0.0, **dict.fromkeys(SESSION_COUNTERS, 0)}
+
+def _epoch(ts: str) -> float:
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+def fold(state, entry):
+    """Add one record to the rollups"""
+    kind = entry.get("type")
+    ts = entry.get("ts")
+    if entry.get("debug") or kind not in ("decision", "execution") or not ts:
+        return
+    day = state["days"].setdefault(ts[:10], new_day())
+    sid = entry.get("session_id", "unknown")
+    if sid not in state["sessions"]:
+        state["sessions"][sid] = new_session(ts)
+        day["sessions"] += 1
+    session = state["sessions"][sid]
+    session["first"] = min(session["first"], ts)
+    session["last"] = max(session["last"], ts)
+
+    if kind == "decision":
+        mode = entry.get("mode") or ("passthru" if entry.get("passthru") else "unknown")
+        day["decisions"] += 1
+        day["modes"][mode] = day["modes"].get(mode, 0) + 1
+        session["decisions"] += 1
+        if entry.get("passthru"):
+            day["passthru"] += 1
+        if entry.get("mode") == "rejected":
+            day["rejections"] += 1
+            session["rejections"] += 1
+        elif entry.get("fixes"):
+            day["corrections"] += 1
+            session["corrections"] += 1
+        for fix in entry.get("fixes", []):
+            day["fixes"][fix] = day["fixes"].get(fix, 0) + 1
+            rule = state["rules"].setdefault(fix, {"total": 0, "first": ts[:10], "last": ts[:10]})
+            rule["total"] += 1
+            rule["first"] = min(rule["first"], ts[:10])
+            rule["last"] = max(rule["last"], ts[:10])
+    elif entry.get("status") != "rejected":   # rejections also log an execution stub
+        day["executions"] += 1
+        session["executions"] += 1
+        if entry.get("returncode", 0) != 0:
+            day["errors"] += 1
+            session["errors"] += 1
+        duration = entry.get("duration_ms")
+        if duration is not None:
+            day["duration_ms"] += duration
+            session["duration_ms"] += duration
+            day["durations"].observe(duration)
+
+def close_sessions(state, idle_days: float = SESSION_IDLE_DAYS) -> int:
+    """Fold sessions idle for `idle_days` into the day they started; returns how many
+
+    Idleness is measured against the newest record seen, not the clock, so
+    a rebuild gives the same result however late it runs.
+    """
+    sessions = state["sessions"]
+    last = {sid: _epoch(s["last"]) for sid, s in sessions.items()}
+    cutoff = max(last.values(), default=0.0) - idle_days * 86400
+    closed = 0
+    for sid, session in list(sessions.items()):
+        if last[sid] >= cutoff:
+            continue
+        day = state["days"].setdefault(session["first"][:10], new_day())
+        totals = day.setdefault("closed_sessions", new_session_totals())
+        totals["count"] += 1
+        totals["seconds"] += max(last[sid] - _epoch(session["first"]), 0.0)
+        for key in SESSION_COUNTERS:
+            totals[key] += session[key]
+        del sessions[sid]
+        closed += 1
+    return closed
+
+def update(state):
+    count = 0
+    for entry in read_incremental(log_segments(), state["files"]):
+        fold(state, entry)
+        count += 1
+    close_sessions(state)
+    save_state(state)
+    return count
+
+def report(state, days=30):
+    dates = sorted(state["days"])[-days:]
+    if not dates:
+        print("No rollups yet – run `rollup-logs.py update` first")
+        return
+    print(f"{'day':<10} {'cmds':>6} {'fixed':>6} {'rej':>5} {'execs':>6} {'err%':>6} "
+          f"{'p50ms':>7} {'p90ms':>7}  top fix")
+    totals = Counter()
+    rules = Counter()
+    closed = Counter()
+    for date in dates:
+        d = state["days"][date]
+        hist = d["durations"]
+        err = 100.0 * d["errors"] / d["executions"] if d["executions"] else 0.0
+        p50, p90 = hist.quantile(0.5), hist.quantile(0.9)
+        top = max(d["fixes"].items(), key=lambda kv: kv[1])[0] if d["fixes"] else ""
+        print(f"{date:<10} {d['decisions']:>6} {d['corrections']:>6} {d['rejections']:>5} "
+              f"{d['executions']:>6} {err:>6.1f} {p50 or 0:>7.0f} {p90 or 0:>7.0f}  {top}")
+        for key in ("decisions", "corrections", "rejections", "executions", "errors", "duration_ms"):
+            totals[key] += d[key]
+        rules.update(d["fixes"])
+        closed.update(d.get("closed_sessions", {}))
+
+    print(f"\nLast {len(dates)} days: {totals['decisions']} commands, "
+          f"{totals['corrections']} corrected, {totals['rejections']} rejected, "
+          f"{totals['errors']}/{totals['executions']} failed, "
+          f"{totals['duration_ms'] / 1000:.0f}s executing")
+    if closed["count"]:
+        print(f"Closed sessions: {closed['count']}, on average {closed['decisions'] / closed['count']:.1f} "
+              f"commands over {closed['seconds'] / closed['count'] / 60:.0f} min")
+    if rules:
+        print("\nFixes by rule:")
+        for rule, count in rules.most_common():
+            print(f"  {rule}: {count}")
+
+def main():
+    args = sys.argv[1:]
+    cmd = args[0] if args else "update"
+    if cmd == "update":
+        state = load_state()
+        print(f"Folded {update(state)} new records into {ROLLUP_PATH}")
+    elif cmd == "rebuild":
+        state = empty_state()
+        print(f"Folded {update(state)} records into {ROLLUP_PATH}")
+    elif cmd == "report":
+        days = int(args[args.index("--days") + 1]) if "--days" in args else 30
+        state = load_state()
+        update(state)
+        report(state, days)
+    else:
+        print(__doc__.strip())
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Full-text search over ClauDEtour session transcripts
+
+Cleaned session text (recordings, *.clean.log from clean-transcript.py, or
+raw *.transcript / *.log cleaned on the fly) is split into short passages
+and indexed into ~/.claude_tour/index: an inverted index with token
+positions plus per-passage session, time and line metadata.
+
+Each segment is a small JSON header (<seg>.meta), a sorted term table
+(.terms: fixed-width entries plus a pool of the terms) and fixed-width doc
+records (.docs), both memory-mapped, so a query bisects for its terms and
+reads only the records of the passages it scores. Postings (.post) and the
+compressed passages (.text) are read by offset.
+
+The index is a list of immutable segments. Indexing only adds a segment for
+what is new: unseen sessions, and the chunks appended to a recording that is
+still being written. A transcript that changed otherwise is tombstoned and
+re-indexed. Segments are merged once there are more than MAX_SEGMENTS.
+
+Results are ranked with BM25 over the live passages (tombstoned ones
+count neither in the document frequencies nor in the average length);
+"quoted phrases" must match exactly.
+
+Usage:
+    search-sessions.py index                  # index new/changed sessions
+    search-sessions.py search [-n N] [--session ID] [--since YYYY-MM-DD] QUERY...
+                                              # (indexes first if a session changed)
+    search-sessions.py stats
+    search-sessions.py rebuild
+"""
+import os, re, sys, json, math, mmap, time, zlib, fcntl, heapq, struct, tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from claudetour_recording import RecordingReader, clean_ansi, is_recording
+
+SESSIONS_DIR = Path.home() / ".claude_tour" / "sessions"
+INDEX_DIR    = Path(os.getenv("CLAUDETOUR_INDEX", "~/.claude_tour/index")).expanduser()
+MAX_SEGMENTS = 8      # merge everything into one segment beyond this
+PASSAGE_LINES = 8     # lines per indexed passage ...
+PASSAGE_CHARS = 1200  # ... or fewer if they get long
+BM25_K1, BM25_B = 1.2, 0.75
+INDEX_VERSION = 2     # older indexes are rebuilt
+
+TERM = struct.Struct("<IIII")    # term offset in the pool, postings offset, length, df
+DOC  = struct.Struct("<dIIIIQI")  # ts, session, source, line, length, text offset, text length
+
+# Per session only the best available source is indexed
+SOURCE_SUFFIXES = (".rec", ".clean.log", ".transcript", ".log")
+SEGMENT_SUFFIXES = (".meta", ".terms", ".docs", ".post", ".text")
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(text.lower())
+
+###############################################################################
+# Varint-encoded postings: per doc  doc_delta, tf, position deltas...
+###############################################################################
+def _put_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def encode_postings(postings) -> bytes:
+    out = bytearray()
+    prev_doc = 0
+    for doc, positions in postings:
+        _put_varint(out, doc - prev_doc)
+        _put_varint(out, len(positions))
+        prev_pos = 0
+        for pos in positions:
+            _put_varint(out, pos - prev_pos)
+            prev_pos = pos
+        prev_doc = doc
+    return bytes(out)
+
+def decode_postings(data: bytes):
+    """Yield (doc, [positions])"""
+    i, doc, end = 0, 0, len(data)
+
+    def varint():
+        nonlocal i
+        n = shift = 0
+        while True:
+            b = data[i]
+            i += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    while i < end:
+        doc += varint()
+        positions, pos = [], 0
+        for _ in range(varint()):
+            pos += varint()
+            positions.append(pos)
+        yield doc, positions
+
+###############################################################################
+# Segments
+###############################################################################
+class SegmentWriter:
+    """Accumulate passages in memory, then write <name>.meta/.post/.text"""
+    def __init__(self, name: str):
+        self.name = name
+        self.terms = {}      # term -> [(doc, positions)]
+        self.docs = []       # (session, source, ts, line, length, text_offset, text_len)
+        self.text = bytearray()
+        self.total_len = 0
+
+    def add(self, session: str, source: str, ts: float, line: int, text: str) -> int:
+        doc = len(self.docs)
+        positions = {}
+        tokens = tokenize(text)
+        for pos, term in enumerate(tokens):
+            positions.setdefault(term, []).append(pos)
+        for term, pos in positions.items():
+            self.terms.setdefault(term, []).append((doc, pos))
+        blob = zlib.compress(text.encode(), 6)
+        self.docs.append((session, source, ts, line, len(tokens), len(self.text), len(blob)))
+        self.text += blob
+        self.total_len += len(tokens)
+        return doc
+
+    def write(self, directory: Path):
+        base = directory / self.name
+        names = sorted(self.terms)
+        pool = bytearray()
+        table = bytearray(struct.pack("<I", len(names)))
+        with open(base.with_suffix(".post"), "wb") as post:
+            offset = 0
+            for term in names:
+                data = encode_postings(self.terms[term])
+                table += TERM.pack(len(pool), offset, len(data), len(self.terms[term]))
+                pool += term.encode()
+                post.write(data)
+                offset += len(data)
+        base.with_suffix(".terms").write_bytes(table + pool)
+        base.with_suffix(".text").write_bytes(self.text)
+        sessions, sources = {}, {}
+        with open(base.with_suffix(".docs"), "wb") as fh:
+            for sid, source, ts, line, length, offset, size in self.docs:
+                fh.write(DOC.pack(ts, sessions.setdefault(sid, len(sessions)),
+                                  sources.setdefault(source, len(sources)), line, length, offset, size))
+        meta = {"docs": len(self.docs), "total_len": self.total_len,
+                "sessions": list(sessions), "sources": list(sources)}
+        base.with_suffix(".meta").write_text(json.dumps(meta))
+
+def _map(path: Path):
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+class Segment:
+    def __init__(self, directory: Path, name: str):
+        self.name = name
+        base = directory / name
+        meta = json.loads(base.with_suffix(".meta").read_text())
+        self.n_docs = meta["docs"]
+        self.total_len = meta["total_len"]
+        self.sessions = meta["sessions"]
+        self.sources = meta["sources"]
+        self._terms = _map(base.with_suffix(".terms"))
+        self._n_terms, = struct.unpack_from("<I", self._terms)
+        self._pool = 4 + self._n_terms * TERM.size
+        self._docs = _map(base.with_suffix(".docs"))
+        # opened now: a merge may unlink the files while we search
+        self._post = open(base.with_suffix(".post"), "rb")
+        self._text = open(base.with_suffix(".text"), "rb")
+
+    def _term_at(self, i: int) -> bytes:
+        start = self._pool + TERM.unpack_from(self._terms, 4 + i * TERM.size)[0]
+        end = self._pool + TERM.unpack_from(self._terms, 4 + (i + 1) * TERM.size)[0] \
+            if i + 1 < self._n_terms else len(self._terms)
+        return self._terms[start:end]
+
+    def term(self, term: str):
+        """(postings offset, length, df) of `term`, or None"""
+        key = term.encode()
+        lo, hi = 0, self._n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_terms and self._term_at(lo) == key:
+            return TERM.unpack_from(self._terms, 4 + lo * TERM.size)[1:]
+        return None
+
+    def postings(self, term: str):
+        entry = self.term(term)
+        if not entry:
+            return
+        self._post.seek(entry[0])
+        yield from decode_postings(self._post.read(entry[1]))
+
+    def doc(self, doc: int):
+        """(session, source, ts, line, length, text offset, text length)"""
+        ts, sid, source, line, length, offset, size = DOC.unpack_from(self._docs, doc * DOC.size)
+        return self.sessions[sid], self.sources[source], ts, line, length, offset, size
+
+    def dead_len(self, ranges) -> int:
+        """Total length of the docs in the tombstoned `ranges`"""
+        return sum(rec[4] for first, last in ranges
+                   for rec in DOC.iter_unpack(self._docs[first * DOC.size:(last + 1) * DOC.size]))
+
+    def text(self, doc: int) -> str:
+        _, _, _, _, _, offset, length = self.doc(doc)
+        self._text.seek(offset)
+        return zlib.decompress(self._text.read(length)).decode()
+
+    def close(self):
+        for fh in (self._post, self._text, self._terms, self._docs):
+            if fh:
+                fh.close()
+
+###############################################################################
+# Index: manifest + segments
+###############################################################################
+def empty_manifest():
+    return {"version": INDEX_VERSION, "next_seg": 0, "segments": [], "deleted": {}, "sources": {}}
+
+def load_manifest():
+    try:
+        manifest = json.loads((INDEX_DIR / "manifest.json").read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return empty_manifest()
+    return manifest if manifest.get("version") == INDEX_VERSION else empty_manifest()
+
+def save_manifest(manifest):
+    fd, tmp = tempfile.mkstemp(dir=INDEX_DIR, prefix=".manifest.")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, INDEX_DIR / "manifest.json")
+
+def session_sources():
+    """session id -> best transcript path for it"""
+    best = {}
+    if not SESSIONS_DIR.exists():
+        return best
+    for path in SESSIONS_DIR.iterdir():
+        for rank, suffix in enumerate(SOURCE_SUFFIXES):
+            if path.name.endswith(suffix):
+                sid = path.name[:-len(suffix)]
+                if sid not in best or rank < best[sid][0]:
+                    best[sid] = (rank, path)
+                break
+    return {sid: path for sid, (_, path) in best.items()}
+
+def changed_sources(manifest) -> bool:
+    """True if a session source was added, removed or changed since indexing"""
+    sources = session_sources()
+    if len(sources) != len(manifest["sources"]):
+        return True
+    for path in sources.values():
+        mark = manifest["sources"].get(str(path))
+        st = path.stat()
+        if not mark or mark["size"] != st.st_size or mark["mtime"] != st.st_mtime:
+            return True
+    return False
+
+def session_start(sid: str, path: Path) -> float:
+    """Start time of a session: its session_start record, else the file mtime"""
+    try:
+        with open(SESSIONS_DIR / f"{sid}.jsonl") as fh:
+            for line in fh:
+                entry = json.loads(line)
+                if entry.get("type") == "session_start":
+                    ts = entry["ts"].replace("Z", "+00:00")
+                    return datetime.fromisoformat(ts).timestamp()
+    except (OSError, ValueError, KeyError):
+        pass
+    return path.stat().st_mtime
+
+def passages(text: str, first_line: int = 1):
+    """Split text into (line_no, passage) of a few non-blank lines each"""
+    buf, start, size = [], first_line, 0
+    for n, line in enumerate(text.split("\n"), first_line):
+        if not line.strip():
+            if buf and len(buf) >= PASSAGE_LINES // 2:
+                yield start, "\n".join(buf)
+                buf, size = [], 0
+            continue
+        if not buf:
+            start = n
+        buf.append(line)
+        size += len(line)
+        if len(buf) >= PASSAGE_LINES or size >= PASSAGE_CHARS:
+            yield start, "\n".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield start, "\n".join(buf)
+
+def read_text(path: Path) -> str:
+    raw = path.read_bytes()
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+    return text if path.name.endswith(".clean.log") else clean_ansi(text)
+
+def index_source(writer, sid: str, path: Path, mark: dict):
+    """Add the new part of one source to `writer`; returns (first, last) doc ids"""
+    first = len(writer.docs)
+    if is_recording(path):
+        reader = RecordingReader(path)
+        started = reader.header.get("timestamp") or session_start(sid, path)
+        line = mark.get("lines", 0) + 1
+        for entry in reader.chunks[mark.get("chunks", 0):]:
+            text = zlib.decompress(reader._read_chunk(entry)[1]).decode()
+            for n, passage in passages(text, line):
+                writer.add(sid, path.name, started + entry[1], n, passage)
+            line += text.count("\n")
+        mark["chunks"] = len(reader.chunks)
+        mark["lines"] = line - 1
+        reader.close()
+    else:
+        started = session_start(sid, path)
+        for n, passage in passages(read_text(path)):
+            writer.add(sid, path.name, started, n, passage)
+    return first, len(writer.docs) - 1
+
+def update(manifest) -> int:
+    """Index new and changed sources into one new segment; returns passages added"""
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    writer = SegmentWriter(f"seg-{manifest['next_seg']:06d}")
+    seen = set()
+    for sid, path in sorted(session_sources().items()):
+        key = str(path)
+        seen.add(key)
+        st = path.stat()
+        mark = manifest["sources"].get(key)
+        if mark and mark["size"] == st.st_size and mark["mtime"] == st.st_mtime:
+            continue
+        appendable = mark and mark.get("chunks") is not None and st.st_size > mark["size"]
+        if mark and not appendable:
+            _tombstone(manifest, mark)
+            mark = None
+        mark = mark or {"session": sid, "ranges": []}
+        try:
+            first, last = index_source(writer, sid, path, mark)
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"skipping {path}: {e}", file=sys.stderr)
+            continue
+        if last >= first:
+            mark["ranges"].append([writer.name, first, last])
+        mark["size"], mark["mtime"] = st.st_size, st.st_mtime
+        manifest["sources"][key] = mark
+    for key in set(manifest["sources"]) - seen:
+        _tombstone(manifest, manifest["sources"].pop(key))
+
+    if writer.docs:
+        writer.write(INDEX_DIR)
+        manifest["segments"].append(writer.name)
+        manifest["next_seg"] += 1
+    if len(manifest["segments"]) > MAX_SEGMENTS:
+        merge_segments(manifest)
+    save_manifest(manifest)
+    return len(writer.docs)
+
+def _tombstone(manifest, mark):
+    for seg, first, last in mark.get("ranges", []):
+        dead = manifest["deleted"].setdefault(seg, [])
+        dead.append([first, last])
+
+def _deleted_set(manifest, seg: str):
+    return {d for first, last in manifest["deleted"].get(seg, []) for d in range(first, last + 1)}
+
+def merge_segments(manifest):
+    """Rewrite all live passages into a single segment, dropping tombstones"""
+    writer = SegmentWriter(f"seg-{manifest['next_seg']:06d}")
+    remap = {}
+    for name in manifest["segments"]:
+        seg = Segment(INDEX_DIR, name)
+        dead = _deleted_set(manifest, name)
+        for doc in range(seg.n_docs):
+            if doc not in dead:
+                sid, source, ts, line, _, _, _ = seg.doc(doc)
+                remap[name, doc] = writer.add(sid, source, ts, line, seg.text(doc))
+        seg.close()
+    writer.write(INDEX_DIR)
+    for mark in manifest["sources"].values():
+        mark["ranges"] = [[writer.name, remap[seg, first], remap[seg, last]]
+                          for seg, first, last in mark["ranges"] if (seg, first) in remap]
+    old = manifest["segments"]
+    manifest["segments"] = [writer.name]
+    manifest["deleted"] = {}
+    manifest["next_seg"] += 1
+    save_manifest(manifest)
+    for name in old:
+        for suffix in SEGMENT_SUFFIXES:
+            (INDEX_DIR / name).with_suffix(suffix).unlink(missing_ok=True)
+
+def locked(fn):
+    """Run fn(manifest) under the index lock"""
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_DIR / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_manifest()
+        if not manifest["segments"]:
+            for f in INDEX_DIR.glob("seg-*"):   # an older format's, or a crashed write's
+                f.unlink()
+        return fn(manifest)
+
+###############################################################################
+# Search
+###############################################################################
+def parse_query(query: str):
+    """Split into plain terms and "quoted phrases" (lists of terms)"""
+    phrases, terms = [], []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                phrases.append(tokens)
+            else:
+                terms.extend(tokens)
+        else:
+            terms.extend(tokenize(word))
+    return terms, phrases
+
+def _has_phrase(positions: dict, phrase) -> bool:
+    starts = set(positions.get(phrase[0], ()))
+    for offset, term in enumerate(phrase[1:], 1):
+        starts &= {p - offset for p in positions.get(term, ())}
+        if not starts:
+            return False
+    return True
+
+def open_segments(manifest) -> dict:
+    """The manifest's segments, opened; a merge replacing them meanwhile is
+    caught by re-reading the manifest"""
+    for _ in range(3):
+        segments = {}
+        try:
+            for name in manifest["segments"]:
+                segments[name] = Segment(INDEX_DIR, name)
+            return segments
+        except FileNotFoundError:
+            for seg in segments.values():
+                seg.close()
+            manifest.clear()
+            manifest.update(load_manifest())
+    raise RuntimeError("index keeps changing; try again")
+
+def search(manifest, query: str, limit: int = 10, session: str = None, since: float = None):
+    """Return [(score, segment, doc)] best first, plus the open segments"""
+    terms, phrases = parse_query(query)
+    wanted = set(terms) | {t for p in phrases for t in p}
+    if not wanted:
+        return [], {}
+    segments = open_segments(manifest)
+    dead = {name: _deleted_set(manifest, name) for name in segments}
+    n_live = sum(s.n_docs - len(dead[n]) for n, s in segments.items())
+    live_len = sum(s.total_len - s.dead_len(manifest["deleted"].get(n, [])) for n, s in segments.items())
+    n_docs = n_live or 1
+    avgdl = (live_len / max(n_live, 1)) or 1
+
+    # document frequencies from the live postings only
+    df = dict.fromkeys(wanted, 0)
+    matches = {}   # segment -> doc -> {term: positions}
+    for name, seg in segments.items():
+        docs = matches[name] = {}
+        for term in wanted:
+            for doc, positions in seg.postings(term):
+                if doc not in dead[name]:
+                    docs.setdefault(doc, {})[term] = positions
+                    df[term] += 1
+    idf = {t: math.log(1 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in wanted}
+
+    hits = []
+    for name, seg in segments.items():
+        for doc, positions in matches[name].items():
+            sid, _, ts, _, length, _, _ = seg.doc(doc)
+            if (session and sid != session) or (since and ts < since):
+                continue
+            if not all(_has_phrase(positions, p) for p in phrases):
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+            score = sum(idf[t] * len(p) * (BM25_K1 + 1) / (len(p) + norm)
+                        for t, p in positions.items())
+            hits.append((score, name, doc))
+    return heapq.nlargest(limit, hits), segments
+
+def context(text: str, wanted, width: int = 160, max_lines: int = 3):
+    """Lines of a passage that contain query terms, highlighted on a TTY"""
+    bold, off = ("\x1b[1m", "\x1b[0m") if sys.stdout.isatty() else ("", "")
+    pattern = re.compile(r"\b(" + "|".join(map(re.escape, sorted(wanted, key=len, reverse=True))) + r")\b",
+                         re.IGNORECASE)
+    lines = [l.strip() for l in text.split("\n") if pattern.search(l)] or text.split("\n")[:1]
+    return [pattern.sub(lambda m: bold + m.group(0) + off, l[:width]) for l in lines[:max_lines]]
+
+def print_results(hits, segments, query: str):
+    terms, phrases = parse_query(query)
+    wanted = set(terms) | {t for p in phrases for t in p}
+    for score, name, doc in hits:
+        seg = segments[name]
+        sid, source, ts, line, _, _, _ = seg.doc(doc)
+        when = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{score:6.2f}  {sid}  {when}  {source}:{line}")
+        for l in context(seg.text(doc), wanted):
+            print(f"        {l}")
+    for seg in segments.values():
+        seg.close()
+
+def main():
+    args = sys.argv[1:]
+    cmd = args.pop(0) if args else "index"
+    if cmd == "index":
+        added = locked(update)
+        print(f"Indexed {added} new passages into {INDEX_DIR}")
+    elif cmd == "rebuild":
+        def rebuild(_):
+            for f in INDEX_DIR.glob("seg-*"):
+                f.unlink()
+            return update(empty_manifest())
+        print(f"Indexed {locked(rebuild)} passages into {INDEX_DIR}")
+    elif cmd == "stats":
+        manifest = load_manifest()
+        segments = open_segments(manifest)
+        docs = sum(seg.n_docs for seg in segments.values())
+        for seg in segments.values():
+            seg.close()
+        dead = sum(len(_deleted_set(manifest, n)) for n in manifest["segments"])
+        size = sum(f.stat().st_size for f in INDEX_DIR.glob("seg-*"))
+        print(f"{len(manifest['sources'])} sessions, {docs - dead} passages "
+              f"({dead} deleted) in {len(manifest['segments'])} segments, "
+              f"{size / 1024:.1f} KiB")
+    elif cmd == "search" and args:
+        limit, session, since = 10, None, None
+        if "-n" in args:
+            i = args.index("-n")
+            limit = int(args[i + 1])
+            del args[i:i + 2]
+        if "--session" in args:
+            i = args.index("--session")
+            session = args[i + 1]
+            del args[i:i + 2]
+        if "--since" in args:
+            i = args.index("--since")
+            since = datetime.fromisoformat(args[i + 1]).replace(tzinfo=timezone.utc).timestamp()
+            del args[i:i + 2]
+        manifest = load_manifest()
+        if changed_sources(manifest):   # otherwise search without taking the lock
+            manifest = locked(lambda m: (update(m), m)[1])
+        query = " ".join(args)
+        started = time.perf_counter()
+        hits, segments = search(manifest, query, limit, session, since)
+        elapsed = (time.perf_counter() - started) * 1000
+        print_results(hits, segments, query)
+        print(f"{len(hits)} hits in {elapsed:.1f} ms", file=sys.stderr)
+    else:
+        print(__doc__.strip())
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
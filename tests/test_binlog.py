@@ -0,0 +1,74 @@
+"""Tests for the binary log format (run: python3 -m pytest tests)"""
+import json, sys, tempfile, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claudetour_binlog
+from claudetour_binlog import SYNC, append, header_bytes, read_header, search_frames
+from claudetour_logs import iter_files, latest_session_id, scan_file
+
+def records():
+    for i in range(60):
+        session = f"s{i % 3}"
+        yield {"v": 1, "type": "decision", "id": f"d{i}", "session_id": session,
+               "orig": "echo " + "x" * i, "fixes": [["rule", i]], "passthru": i % 2 == 0}
+        yield {"v": 1, "type": "execution", "decision_id": f"d{i}", "session_id": session,
+               "returncode": 0, "duration_ms": 1.5 * i, "stdout_blob": None, "extra": {"k": i}}
+
+class BinlogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.jsonl = Path(self.tmp.name) / "log.jsonl"
+        self.binary = Path(self.tmp.name) / "log.ctlog"
+        self.records = list(records())
+        self.jsonl.write_text("".join(json.dumps(r) + "\n" for r in self.records))
+        for r in self.records:
+            append(self.binary, r)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(list(iter_files([self.binary])), self.records)
+
+    def test_scans_match_jsonl(self):
+        for kwargs in ({"session_id": "s1"}, {"types": ("execution",)},
+                       {"session_id": "s2", "types": ("decision",)}):
+            stats = {}
+            self.assertEqual(list(scan_file(self.binary, stats=stats, **kwargs)),
+                             list(scan_file(self.jsonl, **kwargs)), kwargs)
+            self.assertEqual(stats["lines"], len(self.records))
+            self.assertLess(stats["decoded"], len(self.records))
+
+    def test_latest_session(self):
+        self.assertEqual(latest_session_id(self.binary), latest_session_id(self.jsonl))
+
+    def test_older_field_table_is_read_from_the_header(self):
+        old = Path(self.tmp.name) / "old.ctlog"
+        old.write_bytes(header_bytes(claudetour_binlog.FIELDS[:5]))
+        claudetour_binlog._formats.clear()
+        append(old, self.records[0])
+        self.assertEqual(list(iter_files([old])), self.records[:1])
+
+    def test_sync_inside_a_value_is_not_a_frame(self):
+        forged = {"type": "decision", "session_id": "s9",
+                  "orig": SYNC.decode("latin-1") + "\x01" + "s9"}
+        path = Path(self.tmp.name) / "forged.ctlog"
+        append(path, forged)
+        append(path, self.records[0])
+        buf = path.read_bytes()
+        _, pos = read_header(buf)
+        self.assertEqual(len(list(search_frames(buf, b"s9", pos))), 1)
+        self.assertEqual(list(scan_file(path, session_id="s9")), [forged])
+        self.assertEqual(list(scan_file(path, types=("decision",))), [forged, self.records[0]])
+
+    def test_partial_frame_is_ignored(self):
+        with open(self.binary, "ab") as fh:
+            fh.write(SYNC + b"\x01\xff\xff")
+        self.assertEqual(list(scan_file(self.binary, session_id="s0")),
+                         list(scan_file(self.jsonl, session_id="s0")))
+        self.assertEqual(len(list(iter_files([self.binary]))), len(self.records))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests for claudetour_cache probing (run: python3 -m pytest tests)"""
+import os, sys, tempfile, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claudetour_cache import probe
+
+class ProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = self.tmp.name
+        Path(self.cwd, "notes.txt").write_text("hello\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def tracked(self, cmd):
+        p = probe(cmd, self.cwd)
+        return None if p is None else sorted(p["tracked"])
+
+    def test_volatile_files_never_cached(self):
+        for cmd in ("cat /proc/uptime", "cat /proc/loadavg", "head -c 8 /dev/urandom",
+                    "ls /sys", "cat /dev/stdin"):
+            self.assertIsNone(self.tracked(cmd), cmd)
+
+    def test_stdin_never_cached(self):
+        for cmd in ("cat", "cat -", "head -c 8", "tail -n 2"):
+            self.assertIsNone(self.tracked(cmd), cmd)
+
+    def test_fifo_never_cached(self):
+        os.mkfifo(os.path.join(self.cwd, "pipe"))
+        self.assertIsNone(self.tracked("cat pipe"))
+
+    def test_option_values_are_not_paths(self):
+        notes = os.path.join(self.cwd, "notes.txt")
+        for cmd in ("head -c 8 notes.txt", "head -qn 3 notes.txt", "tail --lines 2 notes.txt"):
+            self.assertEqual(self.tracked(cmd), [notes], cmd)
+        self.assertEqual(self.tracked("ls -w 80"), [self.cwd])
+
+    def test_ls_showing_modes_or_types_never_cached(self):
+        for cmd in ("ls -F", "ls -aF", "ls -p", "ls --classify", "ls --color", "ls --color=always",
+                    "ls --color=auto", "ls --file-type", "ls -l --color"):
+            self.assertIsNone(self.tracked(cmd), cmd)
+        self.assertEqual(self.tracked("ls -a --color=never"), [self.cwd])
+
+    def test_snapshot_changes_with_the_file(self):
+        before = probe("cat notes.txt", self.cwd)
+        Path(self.cwd, "notes.txt").write_text("hello again\n")
+        after = probe("cat notes.txt", self.cwd)
+        self.assertEqual(before["key"], after["key"])
+        self.assertNotEqual(before["tracked"], after["tracked"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Tests for export-training.py (run: python3 -m pytest tests; needs numpy for most)"""
+import json, sys, tempfile, unittest, warnings
+import importlib.util
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+spec = importlib.util.spec_from_file_location("export_training", ROOT / "export-training.py")
+export_training = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(export_training)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class UtcIsoTest(unittest.TestCase):
+    def test_zone_suffix_dropped(self):
+        for ts, want in (("2026-01-01T00:00:00Z", "2026-01-01T00:00:00"),
+                         ("2026-01-01T00:00:00.5Z", "2026-01-01T00:00:00.5"),
+                         ("2026-01-01T02:00:00+02:00", "2026-01-01T00:00:00"),
+                         ("not a time", "1970-01-01T00:00:00")):
+            self.assertEqual(export_training.utc_iso(ts), want, ts)
+
+@unittest.skipIf(np is None, "needs numpy")
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.log = self.dir / "log.jsonl"
+        patches = [mock.patch.object(export_training, "EXPORT_DIR", self.dir / "training"),
+                   mock.patch.object(export_training, "log_segments", lambda: [self.log])]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, records):
+        with open(self.log, "a") as fh:
+            fh.write("".join(json.dumps(r) + "\n" for r in records))
+        state = export_training.empty_state()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")   # numpy deprecates zone suffixes
+            export_training.update(state)
+        return export_training.load_parts(self.dir / "training")
+
+    def test_timestamps_without_fraction(self):
+        cols = self.export([
+            {"type": "decision", "id": "d1", "session_id": "s", "ts": "2026-01-01T00:00:00Z",
+             "orig": "ls", "corr": "ls", "mode": "accepted", "fixes": []},
+            {"type": "execution", "decision_id": "d1", "session_id": "s", "ts": "2026-01-01T00:00:01Z",
+             "returncode": 0, "duration_ms": 5},
+        ])
+        self.assertEqual(str(cols["ts"][0]), "2026-01-01T00:00:00.000000")
+        self.assertEqual(cols["mode_names"][cols["mode"][0]], "accepted")
+        self.assertTrue(cols["has_execution"][0])
+
+    def test_parts_with_an_older_mode_order_are_remapped(self):
+        training = self.dir / "training"
+        training.mkdir()
+        old = ("passthru", "accepted", "edited", "rejected", "cache_hit", "unknown")
+        np.savez(training / "part-00000.npz", mode=np.array([4, 5], dtype=np.int8),
+                 mode_names=np.array(old), fix_names=np.array([""]), hash_bits=np.array(18))
+        cols = export_training.load_parts(training)
+        self.assertEqual([cols["mode_names"][m] for m in cols["mode"]], ["cache_hit", "unknown"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Tests for analyze-session.py --follow (run: python3 -m pytest tests)"""
+import io, json, sys, tempfile, unittest
+import importlib.util
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+spec = importlib.util.spec_from_file_location("analyze_session", ROOT / "analyze-session.py")
+analyze_session = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analyze_session)
+
+def decision(n, session="s1"):
+    return {"type": "decision", "id": f"d{n}", "session_id": session,
+            "ts": f"2026-01-01T00:00:{n:02d}.000000Z", "orig": "ls", "passthru": True}
+
+class FollowTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "segments").mkdir()
+        self.write("segments/log-20260101.jsonl", [decision(1), decision(2, "s2")])
+        self.write("log.jsonl", [decision(3), decision(4, "s2")])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, records):
+        with open(self.dir / name, "a") as fh:
+            fh.write("".join(json.dumps(r) + "\n" for r in records))
+
+    def follow(self, session_id, rounds=1, during=None):
+        """follow_session on the temp log dir; `during` runs at the first refresh"""
+        def sleep(_):
+            if during:
+                during()
+        with mock.patch.object(analyze_session.time, "sleep", sleep), \
+             mock.patch.object(sys, "stdout", io.StringIO()):
+            return analyze_session.follow_session(session_id, [str(self.dir)], rounds=rounds)
+
+    def test_session_backfill_includes_rotated_segments(self):
+        self.assertEqual(self.follow("s1").commands, 2)
+
+    def test_all_sessions_start_at_the_end(self):
+        agg = self.follow(None, rounds=2, during=lambda: self.write("log.jsonl", [decision(5)]))
+        self.assertEqual(agg.commands, 1)
+
+    def test_appended_records_counted_once(self):
+        agg = self.follow("s1", rounds=2, during=lambda: self.write("log.jsonl", [decision(6)]))
+        self.assertEqual(agg.commands, 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Regression tests for claudetour_lexer (run: python3 -m pytest tests)"""
+import sys, threading, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claudetour_lexer import ShellSyntaxError, extract_eval, parse
+
+def parse_within(text, seconds=2.0):
+    """parse() on a daemon thread, so a lexer that spins fails instead of hanging"""
+    result = {}
+    def run():
+        try:
+            result["parsed"] = parse(text)
+        except Exception as exc:   # re-raised in the test thread
+            result["error"] = exc
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(seconds)
+    if t.is_alive():
+        raise AssertionError(f"parse({text!r}) did not finish in {seconds}s")
+    if "error" in result:
+        raise result["error"]
+    return result["parsed"]
+
+def words(parsed):
+    return [[w.value for w in seg.words] for seg in parsed.segments]
+
+class WhitespaceTest(unittest.TestCase):
+    def test_crlf_terminated_command(self):
+        self.assertEqual(words(parse_within("ls\r")), [["ls"]])
+        self.assertEqual(words(parse_within("ls -la\r\n")), [["ls", "-la"]])
+
+    def test_vertical_tab_and_form_feed_separate_words(self):
+        self.assertEqual(words(parse_within("a\vb\fc")), [["a", "b", "c"]])
+
+    def test_blanks_after_redirect(self):
+        seg = parse_within("echo x >\r out").segments[0]
+        self.assertEqual(seg.redirects[0].target.value, "out")
+
+    def test_eval_wrapper_with_crlf(self):
+        self.assertEqual(extract_eval("eval 'ls'\r < /dev/null"), "ls")
+
+class StructureTest(unittest.TestCase):
+    def test_operators_split_segments(self):
+        parsed = parse_within('cd x && o3-pro "a b" | grep y; echo done')
+        self.assertEqual(words(parsed), [["cd", "x"], ["o3-pro", "a b"], ["grep", "y"], ["echo", "done"]])
+        self.assertEqual([s.op for s in parsed.segments], ["&&", "|", ";", ""])
+
+    def test_command_skips_assignments(self):
+        seg = parse_within("FOO=1 BAR=2 make -j4").segments[0]
+        self.assertEqual(seg.command.value, "make")
+        self.assertEqual([w.value for w in seg.args], ["-j4"])
+
+    def test_opaque_spans(self):
+        parsed = parse_within("echo 'q' $(date) `id` # note")
+        self.assertEqual([kind for _, _, kind in parsed.opaque], ["quote", "subst", "subst", "comment"])
+
+    def test_heredoc_body(self):
+        parsed = parse_within("cat <<'EOF'\n$HOME\nEOF\necho after")
+        self.assertEqual(parsed.heredocs[0].body, "$HOME\n")
+        self.assertFalse(parsed.heredocs[0].expand)
+        self.assertEqual(words(parsed), [["cat"], ["echo", "after"]])
+
+    def test_quote_removal(self):
+        seg = parse_within("""printf "a\\"b" 'c d' $'e\\tf'""").segments[0]
+        self.assertEqual([w.value for w in seg.args], ['a"b', "c d", "e\tf"])
+
+    def test_extract_eval_unescapes_payload(self):
+        full = "eval 'echo '\\''hi'\\''' < /dev/null && pwd -P >| /tmp/x"
+        self.assertEqual(extract_eval(full), "echo 'hi'")
+
+class ErrorTest(unittest.TestCase):
+    def test_unterminated_quotes(self):
+        for text in ("echo 'x", 'echo "x', "echo $(x", "echo `x", "echo $'x"):
+            with self.assertRaises(ShellSyntaxError):
+                parse_within(text)
+
+    def test_redirect_without_target(self):
+        with self.assertRaises(ShellSyntaxError):
+            parse_within("echo >")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Tests for merging logs in claudetour_logs (run: python3 -m pytest tests)"""
+import io, json, os, sys, tempfile, unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claudetour_logs
+from claudetour_logs import iter_log, latest_session, merge_sources, pop_log_args
+
+def ts(sec):
+    return f"2026-01-01T00:00:{sec:02d}.000000Z"
+
+class MergeSourcesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, records):
+        path = Path(self.tmp.name) / name
+        path.write_text("".join(json.dumps(r) + "\n" for r in records))
+        return str(path)
+
+    def test_same_id_in_different_sessions_is_kept(self):
+        a = self.write("a.jsonl", [{"type": "decision", "id": "deadbeef", "session_id": "s1", "ts": ts(1)}])
+        b = self.write("b.jsonl", [{"type": "decision", "id": "deadbeef", "session_id": "s2", "ts": ts(2)}])
+        self.assertEqual(len(list(merge_sources([a, b]))), 2)
+
+    def test_copies_of_one_log_are_deduplicated(self):
+        records = [{"type": "decision", "id": "deadbeef", "session_id": "s1", "ts": ts(1)}]
+        a, b = self.write("a.jsonl", records), self.write("b.jsonl", records)
+        merged = list(merge_sources([f"box1={a}", f"box2={b}"]))
+        self.assertEqual([r["host"] for r in merged], ["box1"])
+
+    def test_decision_written_after_later_records_is_reordered(self):
+        a = self.write("a.jsonl", [
+            {"type": "execution", "decision_id": "x", "session_id": "s1", "ts": ts(5)},
+            {"type": "decision", "id": "y", "session_id": "s1", "ts": ts(3)},   # waited for approval
+        ])
+        b = self.write("b.jsonl", [{"type": "decision", "id": "z", "session_id": "s2", "ts": ts(4)}])
+        self.assertEqual([r["ts"] for r in merge_sources([a, b])], [ts(3), ts(4), ts(5)])
+
+class DefaultLogsTest(unittest.TestCase):
+    def test_rotated_segments_come_first(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "segments").mkdir()
+            for name, sec, session in (("segments/log-20260101T000002000000Z.jsonl", 2, "s2"),
+                                       ("segments/log-20260101T000001000000Z.jsonl", 1, "s1"),
+                                       ("log.jsonl", 3, "s3")):
+                (root / name).write_text(json.dumps({"type": "session_start", "session_id": session,
+                                                     "ts": ts(sec)}) + "\n")
+            with mock.patch.object(claudetour_logs, "DEFAULT_LOG", root / "log.jsonl"):
+                self.assertEqual([r["session_id"] for r in iter_log()], ["s1", "s2", "s3"])
+                self.assertEqual([r["session_id"] for r in iter_log(session_id="s1")], ["s1"])
+                os.remove(root / "log.jsonl")   # just rotated
+                self.assertEqual(latest_session(), "s2")
+
+class PopLogArgsTest(unittest.TestCase):
+    def test_specs_removed(self):
+        args = ["--log", "a.jsonl", "SESSION", "--log", "box=b"]
+        self.assertEqual(pop_log_args(args), ["a.jsonl", "box=b"])
+        self.assertEqual(args, ["SESSION"])
+
+    def test_trailing_log_is_a_usage_error(self):
+        with redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit) as exit:
+            pop_log_args(["SESSION", "--log"])
+        self.assertEqual(exit.exception.code, 2)
+        self.assertIn("--log", err.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
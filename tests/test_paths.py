@@ -0,0 +1,119 @@
+"""Tests for claudetour_paths resolution (run: python3 -m pytest tests)"""
+import os, sys, tempfile, unittest
+from functools import partial
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claudetour
+from claudetour_paths import PathIndex, PathLookup, fix_paths
+
+class FixPathsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.root = os.path.realpath(self.tmp.name)
+        for d in ("proj", "other/sub"):
+            os.makedirs(os.path.join(root, d))
+        for f in ("other/notes.txt", "other/sub/train.py"):
+            open(os.path.join(root, f), "w").close()
+        self.cwd = os.path.join(root, "proj")
+        self.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self):
+        state = Path(self.root) / "state" / "paths.pickle"
+        builder = PathIndex.load(state, [self.root])
+        builder.refresh(None)
+        builder.save(state)
+        self.index = PathLookup.open(state.with_suffix(".idx"))
+
+    def fix(self, cmd):
+        return fix_paths(cmd, self.cwd, self.index)[0]
+
+    def test_destructive_commands_untouched(self):
+        for cmd in ("rm other/notes.txt", "shred -u other/notes.txt", "python3 sub/train.py",
+                    "git checkout other/notes.txt", "mv sub/train.py x.py"):
+            self.assertEqual(self.fix(cmd), cmd)
+
+    def test_cd_before_a_writing_command_untouched(self):
+        os.makedirs(os.path.join(self.root, "other/data/build"))
+        self.build()
+        for cmd in ("cd data/build && rm -rf *", "cd data/build; rm -rf .",
+                    "cd data/build && ls && make clean"):
+            self.assertEqual(self.fix(cmd), cmd)
+        self.assertEqual(self.fix("cd data/build && ls"), f"cd {self.root}/other/data/build && ls")
+
+    def test_bare_names_never_resolved(self):
+        self.assertEqual(self.fix("cat notes.txt"), "cat notes.txt")
+
+    def test_read_only_command_resolved(self):
+        self.assertEqual(self.fix("cat other/notes.txt"), f"cat {self.root}/other/notes.txt")
+
+    def test_grep_pattern_is_not_a_path(self):
+        self.assertEqual(self.fix("grep -n sub/x sub/train.py"),
+                         f"grep -n sub/x {self.root}/other/sub/train.py")
+
+    def test_ambiguous_match_left_alone(self):
+        os.makedirs(os.path.join(self.root, "proj/other"))
+        open(os.path.join(self.root, "proj/other/notes.txt"), "w").close()
+        self.build()
+        self.assertEqual(self.fix("cat x/other/notes.txt"), "cat x/other/notes.txt")
+
+class ApplyFixesTest(FixPathsTest):
+    """The same index, through the interceptor's fast path and apply_fixes"""
+    def fix(self, cmd):
+        with mock.patch.object(claudetour, "fix_paths", partial(fix_paths, cwd=self.cwd, index=self.index)), \
+             mock.patch.object(claudetour, "PATH_FIX", True), \
+             mock.patch.object(claudetour, "PREFLIGHT", False):
+            if claudetour.safe_passthrough(cmd):
+                return cmd
+            return claudetour.apply_fixes(cmd)[0]
+
+    def test_passthrough_command_with_missing_path_is_fixed(self):
+        with mock.patch.object(claudetour, "fix_paths", partial(fix_paths, cwd=self.cwd, index=self.index)):
+            self.assertFalse(claudetour.safe_passthrough("cat other/notes.txt"))
+            self.assertTrue(claudetour.safe_passthrough("cat /etc/hostname"))
+
+class PathIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        for d in ("a/b/c", "a/d", "e"):
+            os.makedirs(os.path.join(self.root, d))
+        self.index = PathIndex([self.root])
+        self.index.refresh(None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_removed_directory_dropped_with_its_subtree(self):
+        os.rename(os.path.join(self.root, "a"), os.path.join(self.root, "z"))
+        self.index.refresh(None)
+        self.assertNotIn(os.path.join(self.root, "a/b/c"), self.index.dirs)
+        self.assertIn(os.path.join(self.root, "z/b/c"), self.index.dirs)
+
+    def test_root_depth_limit(self):
+        index = PathIndex({self.root: 1})   # as configured for a slow mount
+        index.refresh(None)
+        self.assertIn(os.path.join(self.root, "a"), index.dirs)
+        self.assertNotIn(os.path.join(self.root, "a/b"), index.dirs)
+
+    def test_lookup_paths_round_trip(self):
+        lookup = PathLookup(self.index.encode())
+        self.assertEqual(lookup.candidates(["a", "b", "c"]), (3, [os.path.join(self.root, "a/b/c")]))
+        self.assertEqual(lookup.candidates(["b", "d"]), (1, [os.path.join(self.root, "a/d")]))
+        self.assertEqual(lookup.containing("missing"), ())
+
+    def test_lookup_gives_up_after_budget(self):
+        for n in range(100):
+            os.makedirs(os.path.join(self.root, f"many/{n}/x"))
+        self.index.refresh(None)
+        lookup = PathLookup(self.index.encode())
+        self.assertEqual(lookup.candidates(["5", "x"])[0], 2)
+        self.assertEqual(lookup.candidates(["5", "x"], budget=-1), (0, []))
+
+if __name__ == "__main__":
+    unittest.main()
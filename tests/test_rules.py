@@ -0,0 +1,61 @@
+"""Tests for the FIX_RULES stage of claudetour (run: python3 -m pytest tests)"""
+import sys, time, unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claudetour
+
+WIN = "/mnt/c/Users/me/ml_research"
+LINUX = "/home/zerohimself/src/ml_research"
+
+class ApplyRulesTest(unittest.TestCase):
+    def test_command_rule_in_every_segment(self):
+        fixed, notes = claudetour.apply_rules('cd x && o3-pro "q"')
+        self.assertIn("ask_tools/ask o3_pro", fixed)
+        self.assertEqual(notes, ["o3-pro command correction with cd"])
+
+    def test_word_rule_rewrites_quoted_arguments(self):
+        fixed, _ = claudetour.apply_rules(f'ls "{WIN}/x"')
+        self.assertEqual(fixed, f'ls "{LINUX}/x"')
+
+    def test_word_rule_leaves_comments_and_substitutions(self):
+        cmd = f"echo $(cat {WIN}/a) `ls {WIN}` # {WIN}"
+        fixed, notes = claudetour.apply_rules(cmd)
+        self.assertEqual(fixed, cmd)
+        self.assertEqual(notes, [])
+
+    def test_heredoc_body_untouched(self):
+        cmd = f"cat <<EOF\npython x.py {WIN}\nEOF\n"
+        self.assertEqual(claudetour.apply_rules(cmd)[0], cmd)
+
+    def test_large_command_is_linear(self):
+        def timed(n):
+            cmd = " && ".join(f'echo "a{i}" {WIN}/f{i}' for i in range(n))
+            t = time.perf_counter()
+            fixed, _ = claudetour.apply_rules(cmd)
+            self.assertNotIn("/mnt/c/", fixed)
+            return time.perf_counter() - t
+        small, large = timed(1000), timed(8000)
+        # quadratic masking took ~64x; allow generous noise around 8x
+        self.assertLess(large, small * 30)
+
+    def test_crlf_command_does_not_hang(self):
+        self.assertEqual(claudetour.apply_rules("python train.py\r\n")[0], "python3 train.py\r\n")
+
+class ApplyFixesTest(unittest.TestCase):
+    def test_paths_checked_once(self):
+        calls = []
+        def preflight(cmd):
+            calls.append(cmd)
+            return {"missing": ["nowhere/x.txt"], "unchecked": [], "status": {}}
+        with mock.patch.object(claudetour, "preflight", preflight), \
+             mock.patch.object(claudetour, "PREFLIGHT", True), \
+             mock.patch.object(claudetour, "fix_paths", lambda cmd, exists: (cmd, [])):
+            fixed, _, checked = claudetour.apply_fixes("python nowhere/x.py && cat nowhere/x.txt")
+        self.assertEqual(calls, [fixed])
+        self.assertEqual(checked["missing"], ["nowhere/x.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
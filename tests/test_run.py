@@ -0,0 +1,92 @@
+"""Tests for command limits and run_real_bash (run: python3 -m pytest tests)"""
+import io, sys, time, signal, tempfile, unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claudetour
+import claudetour_metrics
+from claudetour_blobs import BlobStore
+
+class SlowSink(io.BytesIO):
+    """Our stdout with a reader that keeps us waiting on every write"""
+    def write(self, data):
+        time.sleep(0.1)
+        return super().write(data)
+
+class ClosedSink(io.BytesIO):
+    """Our stdout after the reader went away"""
+    def write(self, data):
+        raise BrokenPipeError(32, "Broken pipe")
+
+class CommandLimitsTest(unittest.TestCase):
+    LIMITS = [(r"^pytest\b", {"timeout": 900}), (r"^find\s+/(\s|$)", {"timeout": 120})]
+
+    def limits(self, cmd):
+        with mock.patch.object(claudetour, "COMMAND_LIMITS", self.LIMITS):
+            return claudetour.command_limits(cmd)["timeout"]
+
+    def test_matches_command_words_of_every_segment(self):
+        self.assertEqual(self.limits("cd repo && FOO=1 pytest -x"), 900)
+        self.assertEqual(self.limits("find / -name x 2>/dev/null"), 120)
+
+    def test_quoted_text_is_not_a_command(self):
+        self.assertEqual(self.limits("echo 'pytest'; grep -r 'find /' ."), claudetour.COMMAND_TIMEOUT)
+
+class RunRealBashTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records = []
+        patches = [mock.patch.object(claudetour, "log", self.records.append),
+                   mock.patch.object(claudetour, "default_store", lambda: BlobStore(Path(self.tmp.name))),
+                   mock.patch.dict("os.environ", {"HOME": self.tmp.name}),   # bash -l: no slow profile
+                   mock.patch.object(claudetour_metrics, "METRICS_ENABLED", False)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_bash(self, cmd, timeout=10, stdout=None):
+        handlers = [signal.getsignal(s) for s in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)]
+        with mock.patch.object(claudetour, "COMMAND_TIMEOUT", timeout), \
+             mock.patch.object(claudetour, "KILL_GRACE_SEC", 0.5), \
+             mock.patch.object(claudetour, "PIPE_DRAIN_SEC", 0.05), \
+             mock.patch.object(sys, "stdout", mock.Mock(buffer=stdout or io.BytesIO())):
+            started = time.monotonic()
+            rc = claudetour.run_real_bash(cmd, "d1", "s1")
+            elapsed = time.monotonic() - started
+        self.assertEqual([signal.getsignal(s) for s in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)],
+                         handlers)
+        return rc, elapsed, self.records[-1]
+
+    def test_background_job_does_not_time_out(self):
+        rc, elapsed, result = self.run_bash("sleep 3 & echo bg", timeout=1)
+        self.assertEqual(rc, 0)
+        self.assertLess(elapsed, 1)
+        self.assertNotIn("timed_out", result)
+        self.assertEqual(result["stdout_lines"], 1)
+
+    def test_bash_outliving_the_limit_times_out(self):
+        rc, elapsed, result = self.run_bash("sleep 5", timeout=0.3)
+        self.assertEqual(rc, 124)
+        self.assertLess(elapsed, 2)
+        self.assertTrue(result["timed_out"])
+
+    def test_slow_reader_gets_all_output(self):
+        sink = SlowSink()
+        rc, _, result = self.run_bash("head -c 300001 /dev/zero", stdout=sink)
+        self.assertEqual(rc, 0)
+        self.assertEqual(len(sink.getvalue()), 300001)
+        self.assertEqual(result["stdout_blob"]["size"], 300001)
+
+    def test_closed_reader_still_captured(self):
+        rc, _, result = self.run_bash("seq 1000", stdout=ClosedSink())
+        self.assertEqual(rc, 0)
+        self.assertEqual(result["stdout_lines"], 1000)
+        self.assertEqual(result["stdout_blob"]["size"], len("".join(f"{i}\n" for i in range(1, 1001))))
+
+if __name__ == "__main__":
+    unittest.main()